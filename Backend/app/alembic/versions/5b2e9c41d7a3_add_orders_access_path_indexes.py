@@ -0,0 +1,59 @@
+"""add Orders access path indexes
+
+Revision ID: 5b2e9c41d7a3
+Revises: c36b1ee71396
+Create Date: 2025-06-20 10:12:44.381205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b2e9c41d7a3'
+down_revision: Union[str, None] = 'c36b1ee71396'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 一覧系は「絞り込みカラム + created_at BETWEEN」、ページ送りは (created_at, order_id) の降順。
+# order_id を末尾に含めて、キーセットのページ送りもインデックス順で読めるようにする。
+ORDERS_INDEXES = [
+    ("ix_orders_shop_name_created_at", ["shop_name", "created_at", "order_id"], None),
+    ("ix_orders_username_created_at", ["username", "created_at", "order_id"], None),
+    ("ix_orders_company_id_created_at", ["company_id", "created_at", "order_id"], None),
+    ("ix_orders_created_at", ["created_at", "order_id"], None),
+    # 二重注文チェック（当日・未キャンセル）用の部分インデックス
+    # 条件は OrderFilter(canceled=False) が生成する "canceled IS NOT true" と一致させる
+    ("ix_orders_username_created_at_active", ["username", "created_at"], "canceled IS NOT true"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY はトランザクション内で実行できないため autocommit で流す
+    with op.get_context().autocommit_block():
+        for name, columns, where in ORDERS_INDEXES:
+            op.create_index(
+                name,
+                'Orders',
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(ORDERS_INDEXES):
+            op.drop_index(
+                name,
+                table_name='Orders',
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,57 @@
+"""add daily_order_rollup
+
+Revision ID: 9d41c2a7e6b8
+Revises: 5b2e9c41d7a3
+Create Date: 2025-06-27 09:41:18.602114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d41c2a7e6b8'
+down_revision: Union[str, None] = '5b2e9c41d7a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# 日別の注文集計。注文の登録・キャンセル・チェック・削除と同じトランザクションで増減させる（models/order_rollup.py）
+# 既存の注文は、適用後に python rebuild_daily_order_rollup.py で取り込む。
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "daily_order_rollup" not in inspector.get_table_names():
+        op.create_table(
+            'daily_order_rollup',
+            sa.Column('order_date', sa.Date(), nullable=False),
+            sa.Column('shop_name', sa.String(), nullable=False),
+            sa.Column('company_id', sa.Integer(), nullable=False),
+            sa.Column('menu_id', sa.Integer(), nullable=False),
+            sa.Column('ordered_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('ordered_amount', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('canceled_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('canceled_amount', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('checked_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('order_date', 'shop_name', 'company_id', 'menu_id'),
+        )
+    op.create_index(
+        'ix_daily_order_rollup_shop_name_order_date', 'daily_order_rollup', ['shop_name', 'order_date'],
+        unique=False, if_not_exists=True,
+    )
+    op.create_index(
+        'ix_daily_order_rollup_company_id_order_date', 'daily_order_rollup', ['company_id', 'order_date'],
+        unique=False, if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_daily_order_rollup_company_id_order_date', table_name='daily_order_rollup', if_exists=True)
+    op.drop_index('ix_daily_order_rollup_shop_name_order_date', table_name='daily_order_rollup', if_exists=True)
+    op.drop_table('daily_order_rollup')
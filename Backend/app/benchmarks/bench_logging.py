@@ -0,0 +1,127 @@
+# benchmarks/bench_logging.py
+# ログ出力方式ごとのリクエスト遅延のベンチマーク
+'''
+    1リクエストあたり --lines 行のログを出すエンドポイントに、--concurrency 並列で --requests 回リクエストし、
+    遅延（p50 / p95 / p99）とスループットを比較する。
+        off  : ログ無効（logger.disabled）
+        sync : 旧実装。リクエスト処理中にファイルハンドラへ直接書き込む
+        queue: create_logger()。キューに積むだけで、書き込みは QueueListener のスレッド
+
+    実行例（app ディレクトリで）:
+        python -m benchmarks.bench_logging
+        python -m benchmarks.bench_logging --requests 2000 --lines 50 --concurrency 20
+        python -m benchmarks.bench_logging --console 2> /dev/null   # コンソール出力ありの場合
+        python -m benchmarks.bench_logging --io-delay-ms 0.2         # 書き込みが遅い環境（Docker のバインドマウント等）の想定
+
+    ログファイルは一時ディレクトリに書き、終了時に削除する。
+    ローカルのページキャッシュへの書き込みは速いため、--io-delay-ms 0 では sync の方が速いこともある
+    （queue はスレッド間の受け渡しと GIL の取り合いの分だけ余計にかかる）。差が出るのは書き込みが待たされるとき。
+'''
+import argparse
+import asyncio
+import logging
+import shutil
+import statistics
+import tempfile
+import time as _time
+
+import httpx
+from fastapi import FastAPI
+
+from log_unified import _log_listeners, build_log_handlers, create_logger, stop_log_listeners
+
+
+def make_app(bench_logger: logging.Logger, lines: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/orders")
+    async def orders():
+        for i in range(lines):
+            bench_logger.debug(f"select_orders() - 行 {i} を変換しました")
+        await asyncio.sleep(0)
+        return {"ok": True}
+
+    return app
+
+
+def slow_down(handler: logging.Handler, delay: float) -> logging.Handler:
+    """emit() のたびに delay 秒待たせる（書き込みが I/O で待たされる状況の再現。time.sleep は GIL を手放す）"""
+    if delay > 0:
+        emit = handler.emit
+
+        def slow_emit(record):
+            _time.sleep(delay)
+            emit(record)
+
+        handler.emit = slow_emit
+    return handler
+
+
+def make_logger(mode: str, log_dir: str, console: bool, delay: float) -> logging.Logger:
+    name = f"bench_{mode}"
+    if mode == "queue":
+        bench_logger = create_logger(name, log_dir, console=console)
+        for handler in _log_listeners[name].handlers:
+            slow_down(handler, delay)
+        return bench_logger
+
+    bench_logger = logging.getLogger(name)
+    bench_logger.setLevel(logging.DEBUG)
+    bench_logger.propagate = False
+    if mode == "sync":
+        for handler in build_log_handlers(log_dir, console):
+            bench_logger.addHandler(slow_down(handler, delay))
+    else:
+        bench_logger.disabled = True
+    return bench_logger
+
+
+async def run(app: FastAPI, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                begin = _time.perf_counter()
+                response = await client.get("/orders")
+                latencies.append(_time.perf_counter() - begin)
+                assert response.status_code == 200
+
+        begin = _time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        elapsed = _time.perf_counter() - begin
+
+    return latencies, elapsed
+
+
+def percentile(values, p: float) -> float:
+    return statistics.quantiles(values, n=100)[int(p) - 1]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="ログ出力方式ごとのリクエスト遅延ベンチマーク")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--lines", type=int, default=20, help="1リクエストあたりのログ行数")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--console", action="store_true", help="コンソール（標準エラー）にも出力する")
+    parser.add_argument("--io-delay-ms", type=float, default=0.0, help="1行書き込むごとの待ち時間（ms）")
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix="bench_logging_")
+    try:
+        for mode in ("off", "sync", "queue"):
+            app = make_app(make_logger(mode, log_dir, args.console, args.io_delay_ms / 1000), args.lines)
+            await run(app, 20, args.concurrency)  # ウォームアップ
+            latencies, elapsed = await run(app, args.requests, args.concurrency)
+            print(f"{mode:<6} p50 {percentile(latencies, 50) * 1000:7.2f} ms  "
+                  f"p95 {percentile(latencies, 95) * 1000:7.2f} ms  "
+                  f"p99 {percentile(latencies, 99) * 1000:7.2f} ms  "
+                  f"{args.requests / elapsed:8.1f} req/s")
+    finally:
+        stop_log_listeners()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
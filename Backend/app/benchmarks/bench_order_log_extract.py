@@ -0,0 +1,145 @@
+# benchmarks/bench_order_log_extract.py
+# 店舗別の結合ログ出力（月末の全店舗分）のベンチマーク
+'''
+    合成した注文ログ（--days 日分・合計 --size-mb MB・--shops 店舗）に対して、全店舗分の結合ログを書き出す時間を比較する。
+        legacy     : 旧 order_log_filter_config.py と同じ処理（1店舗ずつ全ファイルを読む）。
+                     --legacy-shops 店舗分だけ実行し、全店舗分に換算する
+        single-pass: run_extraction(workers=1)。各ファイルを1回だけ読んで全店舗に振り分ける
+        pool       : run_extraction(workers=--workers)。日付ごとにプロセスを分ける
+        unchanged  : 変更なしで再実行（mtime・サイズの比較だけ）
+        appended   : 1日分のファイルに追記して再実行（その日だけ読み直す）
+
+    実行例（app ディレクトリで）:
+        python -m benchmarks.bench_order_log_extract                       # 2GB（数分かかる）
+        python -m benchmarks.bench_order_log_extract --size-mb 200 --workers 4
+        python -m benchmarks.bench_order_log_extract --dir /data/bench_logs --keep   # 生成したログを残して再利用
+
+    ログは --dir（省略時は一時ディレクトリ）に生成し、--keep がなければ終了時に削除する。
+    pool の効果は CPU 数に依存する（1 CPU では single-pass とほぼ同じ）。
+'''
+import argparse
+import glob
+import os
+import random
+import shutil
+import tempfile
+import time as _time
+from collections import defaultdict
+
+from utils.order_log_extractor import run_extraction
+
+
+def generate_corpus(log_dir: str, size_mb: int, days: int, shops: int) -> None:
+    """1日あたり size_mb / days MB の注文ログを作る（1割は取消行）"""
+    random.seed(0)
+    per_day = size_mb * 1024 * 1024 // days
+    order_id = 0
+    for day in range(days):
+        date = f"2025-05-{day + 1:02d}"
+        with open(os.path.join(log_dir, f"{date}.log"), "w", encoding="utf-8") as f:
+            written = 0
+            while written < per_day:
+                block = []
+                for _ in range(1000):
+                    order_id += 1
+                    shop = f"shop{random.randrange(shops):03d}"
+                    user = f"user{random.randrange(5000):04d}"
+                    block.append(
+                        f"{date} 10:{order_id % 60:02d}:00 - INFO     - ORDER : 注文完了 - order_id:{order_id:>4} - "
+                        f"company_id:1, username:{user}, shop_name:{shop}, menu_id:{order_id % 5 + 1}, amount:1\n"
+                    )
+                    if order_id % 10 == 0:
+                        block.append(
+                            f"{date} 11:{order_id % 60:02d}:00 - INFO     - CANCEL: 注文取消 - order_id: {order_id} - username: {user}\n"
+                        )
+                text = "".join(block)
+                f.write(text)
+                written += len(text.encode("utf-8"))
+
+
+def legacy_extract(log_dir: str, shop_name: str) -> None:
+    """旧 order_log_filter_config.py の処理（1店舗分）"""
+    for file in glob.glob(os.path.join(log_dir, f"combined_{shop_name}_*.log")):
+        os.remove(file)
+    lines_by_date = defaultdict(list)
+    for log_file in sorted(glob.glob(os.path.join(log_dir, "*.log"))):
+        if os.path.basename(log_file).startswith("combined_"):
+            continue
+        file_date = os.path.splitext(os.path.basename(log_file))[0]
+        with open(log_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if shop_name in line:
+                    lines_by_date[file_date].append(line)
+    for file_date, lines in lines_by_date.items():
+        with open(os.path.join(log_dir, f"combined_{shop_name}_{file_date}.log"), "w", encoding="utf-8") as out_f:
+            out_f.writelines(lines)
+
+
+def clear_outputs(log_dir: str) -> None:
+    for path in glob.glob(os.path.join(log_dir, "combined_*")) + glob.glob(os.path.join(log_dir, ".combined_state.json")):
+        os.remove(path)
+
+
+def timed(label: str, func, *args, **kwargs):
+    begin = _time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = _time.perf_counter() - begin
+    return label, elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=int, default=2048)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--shops", type=int, default=50)
+    parser.add_argument("--legacy-shops", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--dir", default=None)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    log_dir = args.dir or tempfile.mkdtemp(prefix="bench_order_logs_")
+    os.makedirs(log_dir, exist_ok=True)
+    try:
+        if not glob.glob(os.path.join(log_dir, "2025-05-*.log")):
+            label, elapsed, _ = timed("generate", generate_corpus, log_dir, args.size_mb, args.days, args.shops)
+            print(f"生成: {elapsed:.1f} s")
+        total = sum(os.path.getsize(p) for p in glob.glob(os.path.join(log_dir, "2025-05-*.log")))
+        print(f"注文ログ: {total / 1024 / 1024:,.0f} MB, {args.days} 日, {args.shops} 店舗, CPU {os.cpu_count()}\n")
+
+        rows = []
+        clear_outputs(log_dir)
+        begin = _time.perf_counter()
+        for i in range(args.legacy_shops):
+            legacy_extract(log_dir, f"shop{i:03d}")
+        per_shop = (_time.perf_counter() - begin) / args.legacy_shops
+        rows.append((f"legacy（{args.legacy_shops} 店舗から換算）", per_shop * args.shops, total * args.shops))
+
+        clear_outputs(log_dir)
+        _, elapsed, result = timed("single-pass", run_extraction, log_dir, workers=1)
+        rows.append(("single-pass", elapsed, result["read_bytes"]))
+
+        clear_outputs(log_dir)
+        _, elapsed, result = timed("pool", run_extraction, log_dir, workers=args.workers)
+        rows.append((f"pool（{args.workers} workers）", elapsed, result["read_bytes"]))
+
+        _, elapsed, result = timed("unchanged", run_extraction, log_dir, workers=args.workers)
+        rows.append(("unchanged", elapsed, result["read_bytes"]))
+
+        with open(os.path.join(log_dir, "2025-05-01.log"), "a", encoding="utf-8") as f:
+            f.write("2025-05-01 12:00:00 - INFO     - ORDER : 注文完了 - order_id:   1 - company_id:1, username:user0000, shop_name:shop000, menu_id:1, amount:1\n")
+        _, elapsed, result = timed("appended", run_extraction, log_dir, workers=args.workers)
+        rows.append(("appended（1日分に追記）", elapsed, result["read_bytes"]))
+
+        print(f"{'mode':<28}{'秒':>10}{'読み込み MB':>14}")
+        for label, elapsed, read_bytes in rows:
+            print(f"{label:<28}{elapsed:>10.2f}{read_bytes / 1024 / 1024:>14,.0f}")
+    finally:
+        if args.keep:
+            print(f"\nログ: {log_dir}")
+        else:
+            shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# benchmarks/bench_order_materialize.py
+# 注文行 → OrderModel 変換（マテリアライズ）のベンチマーク
+'''
+    同じ SELECT 結果（Row のリスト）を次の3通りで変換し、CPU 時間とメモリを比較する。
+        validate : 旧実装。dict(row._mapping) → checked を bool に → OrderModel(**row_dict)
+        construct: order_model_from_row()。model_construct で検証を省く
+        record   : rows_to_order_records()。Pydantic を使わない OrderRecord（タプル）
+
+    実行例（app ディレクトリで）:
+        python -m benchmarks.bench_order_materialize
+        python -m benchmarks.bench_order_materialize --rows 10000 100000 --repeat 5
+
+    メモリは tracemalloc で「変換中のピーク」と「結果リストが保持するサイズ」を測る。
+'''
+import argparse
+import gc
+import time as _time
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from database.local_postgresql_database import Base
+from models.company import Company
+from models.menu import Menu
+from models.order import (
+    Order, OrderFilter, get_order_stmt,
+    rows_to_order_models, rows_to_order_records
+)
+from schemas.order_schemas import OrderModel
+
+
+def rows_to_order_models_validate(rows):
+    """旧実装と同じ変換（Pydantic の検証あり）"""
+    order_models = []
+    for row in rows:
+        row_dict = dict(row._mapping)
+        row_dict["checked"] = bool(row_dict.get("checked", False))
+        order_models.append(OrderModel(**row_dict))
+    return order_models
+
+
+MATERIALIZERS = [
+    ("validate", rows_to_order_models_validate),
+    ("construct", rows_to_order_models),
+    ("record", rows_to_order_records),
+]
+
+
+def fetch_rows(count: int):
+    """インメモリ SQLite に count 件の注文を入れ、select_orders() と同じ SELECT の結果を返す"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Company.__table__, Menu.__table__, Order.__table__])
+
+    now = datetime.now()
+    with Session(engine) as session:
+        session.add(Company(company_id=1, name="bench_company"))
+        session.add(Menu(menu_id=1, shop_name="shop01", name="bench_menu", price=500))
+        session.execute(insert(Order), [
+            {
+                "order_id": i + 1,
+                "company_id": 1,
+                "user_id": i % 50 + 1,
+                "username": f"user{i % 50}",
+                "shop_name": "shop01",
+                "menu_id": 1,
+                "amount": 1,
+                "created_at": now - timedelta(seconds=i),
+                "expected_delivery_date": date.today(),
+                "checked": i % 2,
+                "canceled": False,
+            }
+            for i in range(count)
+        ])
+        session.commit()
+
+        stmt, params = get_order_stmt(OrderFilter("shop", "shop01"))
+        rows = session.execute(stmt, params).all()
+
+    engine.dispose()
+    return rows
+
+
+def measure(fn, rows, repeat: int):
+    # CPU: repeat 回の最短
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        begin = _time.perf_counter()
+        fn(rows)
+        best = min(best, _time.perf_counter() - begin)
+
+    # メモリ: 変換中のピークと、結果が保持しているサイズ
+    gc.collect()
+    tracemalloc.start()
+    result = fn(rows)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return best, peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description="注文マテリアライズのベンチマーク")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for count in args.rows:
+        rows = fetch_rows(count)
+
+        # 変換結果が旧実装と同じであることを確認
+        expected = [m.model_dump() for m in rows_to_order_models_validate(rows[:100])]
+        assert [m.model_dump() for m in rows_to_order_models(rows[:100])] == expected
+
+        print(f"--- {count} rows ---")
+        baseline = None
+        for label, fn in MATERIALIZERS:
+            sec, peak, retained = measure(fn, rows, args.repeat)
+            baseline = baseline or sec
+            print(f"{label:<10} {sec * 1000:9.1f} ms  x{baseline / sec:5.2f}  "
+                  f"peak {peak / 2**20:7.1f} MiB  retained {retained / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/bench_order_query.py
+# 注文クエリエンジン（文キャッシュ）のベンチマーク
+'''
+    旧実装（呼び出しごとに select() を組み立てる）と、
+    select_orders() が使うキャッシュ済みのパラメータ化 SELECT を比較する。
+
+    実行例（app ディレクトリで）:
+        python -m benchmarks.bench_order_query --orders 5000 --calls 2000
+
+    DB への往復を除いた「文の構築 + キャッシュキー生成 + コンパイル + 実行」のコストを見るため、
+    インメモリ SQLite（同期エンジン）を使う。
+'''
+import argparse
+import time as _time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from database.local_postgresql_database import Base
+from models.company import Company
+from models.menu import Menu
+from models.order import Order, OrderFilter, get_order_stmt
+
+
+def build_legacy_stmt(shop_name: str, start: datetime, end: datetime):
+    """旧 select_orders_by_shop_at_date_range と同じ文を毎回組み立てる"""
+    return (
+        select(
+            Order.order_id,
+            Company.name.label("company_name"),
+            Order.user_id,
+            Order.username,
+            Order.shop_name,
+            Menu.name.label("menu_name"),
+            Order.amount,
+            Order.created_at,
+            Order.expected_delivery_date,
+            Order.checked
+        )
+        .select_from(Order)
+        .join(Company, Order.company_id == Company.company_id)
+        .join(Menu, Order.menu_id == Menu.menu_id)
+        .where(
+            Order.shop_name == shop_name,
+            Order.created_at.between(start, end)
+        )
+    )
+
+
+def seed(session: Session, orders: int, shops: int):
+    session.add(Company(company_id=1, name="bench_company"))
+    for i in range(shops):
+        session.add(Menu(menu_id=i + 1, shop_name=f"shop{i:02d}", name=f"menu{i}", price=500))
+
+    now = datetime.now()
+    session.add_all([
+        Order(
+            order_id=i + 1,
+            company_id=1,
+            user_id=1,
+            username=f"user{i % 50}",
+            shop_name=f"shop{i % shops:02d}",
+            menu_id=(i % shops) + 1,
+            amount=1,
+            created_at=now - timedelta(minutes=i),
+            checked=0,
+            canceled=False,
+        )
+        for i in range(orders)
+    ])
+    session.commit()
+
+
+def run(label: str, calls: int, fn):
+    begin = _time.perf_counter()
+    rows = 0
+    for i in range(calls):
+        rows += fn(i)
+    elapsed = _time.perf_counter() - begin
+    print(f"{label:<10} {calls} calls  {elapsed * 1000:9.1f} ms  "
+          f"{elapsed / calls * 1e6:8.1f} us/call  rows={rows}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="注文クエリ（文キャッシュ）ベンチマーク")
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--shops", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    tables = [Company.__table__, Menu.__table__, Order.__table__]
+    Base.metadata.create_all(engine, tables=tables)
+
+    end = datetime.now()
+    start = end - timedelta(days=1)
+
+    with Session(engine) as session:
+        seed(session, args.orders, args.shops)
+
+        def legacy(i):
+            stmt = build_legacy_stmt(f"shop{i % args.shops:02d}", start, end)
+            return len(session.execute(stmt).all())
+
+        def cached(i):
+            stmt, params = get_order_stmt(OrderFilter("shop", f"shop{i % args.shops:02d}", start, end))
+            return len(session.execute(stmt, params).all())
+
+        # ウォームアップ（コンパイル済みキャッシュを温める）
+        legacy(0)
+        cached(0)
+
+        legacy_sec = run("legacy", args.calls, legacy)
+        cached_sec = run("cached", args.calls, cached)
+
+    print(f"speedup    x{legacy_sec / cached_sec:.2f}")
+
+
+if __name__ == "__main__":
+    main()
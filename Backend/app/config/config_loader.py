@@ -3,6 +3,11 @@
     1. load_permission_map(path: str = "config/redirect_main_by_permission_map.json")
     2. load_holiday_map(path: str = "config/holidays_map.json") -> dict:
     3. search_delivery_date(start_date: datetime) -> datetime:
+
+    # 配達予定日カレンダー（起動時に1回だけ作成）
+    4. build_delivery_calendar(holiday_map: dict = None) -> DeliveryCalendar:
+    5. get_delivery_date(order_date: date) -> date:
+    6. get_delivery_dates(begin: date, end: date) -> List[Tuple[date, date]]:
 '''
 import json
 import os
@@ -43,7 +48,8 @@ def load_holiday_map(path: str = "config/holidays_map.json") -> dict:
 '''------------------------------------------------------------'''
 from log_unified import logger
 from pprint import pprint
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple, Optional, Tuple
 
 # 配達可能曜日決定辞書
 delivery_mapping = {
@@ -56,34 +62,99 @@ delivery_mapping = {
     6: 0   # 日 -> 月
 }
 
-# @log_decorator
-async def search_delivery_date(start_date: datetime) -> datetime:
-
-    init_date = start_date.strftime('%Y-%m-%d')
-    # print(f"初回 start_date: {start_date}")
-    # print(f"注文日: {init_date}")
-
-    holiday_map = load_holiday_map()
+def walk_delivery_date(start_date: date, holiday_map: dict = None) -> date:
+    """
+    注文日から配達予定日を1日ずつ進めて求める（カレンダー作成用・範囲外の日付用）。
+    注文日の曜日から delivery_mapping の曜日まで進め、祝日ならその翌日から同じ判定を繰り返す。
+    holiday_map を省略した場合は holidays_map.json を使う。
+    """
+    if holiday_map is None:
+        holiday_map = load_holiday_map()
 
     while True:
         # 現在の日付の曜日を取得
-        weekday = start_date.weekday()  # 0: 月 ~ 6: 日
-        target_weekday = delivery_mapping.get(weekday)
+        target_weekday = delivery_mapping.get(start_date.weekday())  # 0: 月 ~ 6: 日
 
         # 曜日が一致するまで日付を進める
         while start_date.weekday() != target_weekday:
             start_date += timedelta(days=1)
 
-        # 日付文字列を "YYYY/M/D" 形式に変換
-        date_str = f"{start_date.year}/{start_date.month}/{start_date.day}"
-        # print(f"判定対象の日付: {date_str}")
-
-        # 祝日でなければ採用
-        if holiday_map.get(date_str) is None:
-            # print(f"非祝日として確定: {start_date}")
-            logger.debug(f"search_delivery_date() 注文日: {init_date} 配達予定日: {start_date.strftime('%Y-%m-%d')}")
-
-            return start_date.date()
+        # 祝日でなければ採用（祝日マップのキーは "YYYY/M/D" 形式）
+        if holiday_map.get(f"{start_date.year}/{start_date.month}/{start_date.day}") is None:
+            return start_date
 
         # 祝日なら翌日に進めて再判定
         start_date += timedelta(days=1)
+
+
+class DeliveryCalendar(NamedTuple):
+    """注文日の序数（date.toordinal()）- first_ordinal を添字として配達予定日を引く配列"""
+    first_ordinal: int
+    delivery_dates: List[date]
+    holiday_map: dict  # 作成に使った祝日マップ（範囲外の日付もこれで求める）
+
+    @property
+    def first_date(self) -> date:
+        return date.fromordinal(self.first_ordinal)
+
+    @property
+    def last_date(self) -> date:
+        return date.fromordinal(self.first_ordinal + len(self.delivery_dates) - 1)
+
+
+_delivery_calendar: Optional[DeliveryCalendar] = None
+
+def build_delivery_calendar(holiday_map: dict = None) -> DeliveryCalendar:
+    """
+    holidays_map.json の年（と今年・来年）の全日について配達予定日を前計算する。
+    サーバ起動時に1回呼ぶ。祝日マップを差し替えた場合も呼び直すこと。
+    """
+    global _delivery_calendar
+
+    holiday_map = holiday_map if holiday_map is not None else load_holiday_map()
+    years = {int(key.split("/")[0]) for key in holiday_map}
+    years.add(date.today().year)
+
+    first = date(min(years), 1, 1)
+    last = date(max(years) + 1, 12, 31)
+    delivery_dates = [
+        walk_delivery_date(date.fromordinal(ordinal), holiday_map)
+        for ordinal in range(first.toordinal(), last.toordinal() + 1)
+    ]
+
+    _delivery_calendar = DeliveryCalendar(first.toordinal(), delivery_dates, holiday_map)
+    logger.info(f"配達予定日カレンダーを作成しました: {first} ～ {last}（{len(delivery_dates)}日）")
+    return _delivery_calendar
+
+
+def get_delivery_date(order_date: date) -> date:
+    """注文日（date / datetime）の配達予定日を返す。カレンダー範囲外は walk_delivery_date() で求める"""
+    if isinstance(order_date, datetime):
+        order_date = order_date.date()
+
+    calendar = _delivery_calendar or build_delivery_calendar()
+    index = order_date.toordinal() - calendar.first_ordinal
+    if 0 <= index < len(calendar.delivery_dates):
+        return calendar.delivery_dates[index]
+
+    return walk_delivery_date(order_date, calendar.holiday_map)
+
+
+def get_delivery_dates(begin: date, end: date) -> List[Tuple[date, date]]:
+    """begin ～ end の各注文日と配達予定日の組を返す（店舗カレンダー表示用）"""
+    return [
+        (order_date, get_delivery_date(order_date))
+        for order_date in (
+            date.fromordinal(ordinal)
+            for ordinal in range(begin.toordinal(), end.toordinal() + 1)
+        )
+    ]
+
+
+# @log_decorator
+async def search_delivery_date(start_date: datetime) -> datetime:
+    """注文日から配達予定日（date）を返す。前計算したカレンダーを引くだけ"""
+    delivery_date = get_delivery_date(start_date)
+    logger.debug(f"search_delivery_date() 注文日: {start_date.strftime('%Y-%m-%d')} 配達予定日: {delivery_date.strftime('%Y-%m-%d')}")
+
+    return delivery_date
@@ -1,10 +1,15 @@
 # log_unified.py
 '''
-    1. class FixedWidthFormatter(logging.Formatter):
-    2. def create_logger(name: str, log_dir: str) -> logging.Logger:
-    3. logger = create_logger("app_logger", "logs")
-    4. order_logger = create_logger("order_logger", "order_logs")
-    5. def log_order(log_type: str, message: str):
+     1. class FixedWidthFormatter(logging.Formatter):
+     2. class BoundedQueueHandler(QueueHandler):
+     3. def build_log_handlers(log_dir: str, console: bool = False) -> List[logging.Handler]:
+     4. def create_logger(name: str, log_dir: str, queue_size: int, overflow: str, console: bool = False) -> logging.Logger:
+     5. def flush_log_listeners(): / stop_log_listeners():
+     6. def get_log_queue_stats() -> Dict[str, dict]:
+     7. logger = create_logger("app_logger", "logs")
+     8. order_logger = create_logger("order_logger", "order_logs", overflow="block", console=True)
+     9. def log_order(log_type: str, message: str):
+    10. def log_order_batch(log_type: str, messages: List[str]):
 '''
 import logging
 
@@ -15,46 +20,169 @@ class FixedWidthFormatter(logging.Formatter):
         return super().format(record)
 
 import os
-from logging.handlers import TimedRotatingFileHandler
+import queue
+import atexit
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
+from typing import Dict, List
 from utils.date_utils import get_today_datetime
 
-# 共通のロガー作成関数
-def create_logger(name: str, log_dir: str) -> logging.Logger:
+# ログはキューに積むだけにして、ファイル・コンソールへの書き込みはバックグラウンドスレッド（QueueListener）で行う。
+# これでリクエスト処理中（イベントループ上）の logger.debug() がディスク・コンソール I/O を待たなくなる。
+# キューがあふれたときの方針:
+#   block    : 空くまで待つ（1件も落とさない。注文ログはこれ）
+#   drop_new : 新しいレコードを捨てる
+#   drop_old : いちばん古いレコードを捨てて積む
+LOG_QUEUE_MAXSIZE = int(os.environ.get("LOG_QUEUE_MAXSIZE", "10000"))
+LOG_QUEUE_OVERFLOW = os.environ.get("LOG_QUEUE_OVERFLOW", "drop_new")
+LOG_OVERFLOW_POLICIES = ("block", "drop_new", "drop_old")
+
+_log_listeners: Dict[str, QueueListener] = {}
+_exception_formatter = logging.Formatter()
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    上限つきキューに積む QueueHandler。あふれたときは overflow の方針に従い、捨てた件数を dropped に数える。
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "drop_new"):
+        if overflow not in LOG_OVERFLOW_POLICIES:
+            raise ValueError(f"overflow は {LOG_OVERFLOW_POLICIES} のいずれかを指定してください: {overflow}")
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        メッセージと例外の文字列化だけ呼び出し側で済ませる（引数オブジェクトを別スレッドへ持ち越さない）。
+        ロガーのハンドラはこれ1つなので、標準の QueueHandler と違ってレコードはコピーしない。
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block":
+            self.queue.put(record)
+            return
+
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                self.dropped += 1
+                if self.overflow == "drop_new":
+                    return
+                try:
+                    self.queue.get_nowait()  # drop_old: 古いものを1件捨てて積み直す
+                except queue.Empty:
+                    pass
+
+
+# ファイル・コンソールのハンドラ（実際に書き込む側）
+# 備考：以前は isinstance(h, logging.StreamHandler) の判定がファイルハンドラにも当たり、
+#       コンソールには出ていなかった。その挙動に合わせ、コンソール出力は console=True のときだけ付ける。
+def build_log_handlers(log_dir: str, console: bool = False) -> List[logging.Handler]:
     os.makedirs(log_dir, exist_ok=True)
-    
-    current_date = current_date = get_today_datetime().strftime("%Y-%m-%d") 
-    
-    log_file = os.path.join(log_dir, f"{current_date}.log")
 
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-    logger.propagate = False  # 他のloggerに伝播しない
+    current_date = get_today_datetime().strftime("%Y-%m-%d")
+    log_file = os.path.join(log_dir, f"{current_date}.log")
 
     formatter = FixedWidthFormatter("%(asctime)s - %(levelname)s - %(message)s", "%Y-%m-%d %H:%M:%S")
 
-    if not any(isinstance(h, TimedRotatingFileHandler) for h in logger.handlers):
-        file_handler = TimedRotatingFileHandler(
-            log_file, when="midnight", interval=1, encoding="utf-8", backupCount=7
-        )
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
+    file_handler = TimedRotatingFileHandler(
+        log_file, when="midnight", interval=1, encoding="utf-8", backupCount=7
+    )
+    file_handler.setFormatter(formatter)
+    handlers: List[logging.Handler] = [file_handler]
 
-    if not any(isinstance(h, logging.StreamHandler) for h in logger.handlers):
+    if console:
         console_handler = logging.StreamHandler()
         console_handler.setLevel(logging.DEBUG)
         console_handler.setFormatter(formatter)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
 
+    return handlers
+
+# 共通のロガー作成関数
+def create_logger(
+    name: str,
+    log_dir: str,
+    queue_size: int = LOG_QUEUE_MAXSIZE,
+    overflow: str = LOG_QUEUE_OVERFLOW,
+    console: bool = False
+) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False  # 他のloggerに伝播しない
+
+    if any(isinstance(h, QueueHandler) for h in logger.handlers):
+        return logger
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    listener = QueueListener(log_queue, *build_log_handlers(log_dir, console), respect_handler_level=True)
+    listener.start()
+    _log_listeners[name] = listener
+
+    logger.addHandler(BoundedQueueHandler(log_queue, overflow))
     return logger
 
+# キューに残っているログをすべて書き出す（lifespan 終了時）。リスナーは再開するので、その後のログも失われない
+def flush_log_listeners():
+    for listener in _log_listeners.values():
+        listener.stop()  # キューを最後まで処理してからスレッドを止める
+        for handler in listener.handlers:
+            handler.flush()
+        listener.start()
+
+# キューに残っているログをすべて書き出してからリスナーを止める（プロセス終了時）
+def stop_log_listeners():
+    for name in list(_log_listeners):
+        listener = _log_listeners.pop(name)
+        listener.stop()
+        for handler in listener.handlers:
+            try:
+                handler.flush()
+                handler.close()
+            except (OSError, ValueError):
+                pass  # 終了処理中に出力先（標準エラーなど）が既に閉じられている場合
+
+atexit.register(stop_log_listeners)
+
+# キューの状態（件数・捨てた件数）
+def get_log_queue_stats() -> Dict[str, dict]:
+    stats = {}
+    for name in ("app_logger", "order_logger"):
+        for handler in logging.getLogger(name).handlers:
+            if isinstance(handler, BoundedQueueHandler):
+                stats[name] = {
+                    "size": handler.queue.qsize(),
+                    "maxsize": handler.queue.maxsize,
+                    "overflow": handler.overflow,
+                    "dropped": handler.dropped,
+                }
+    return stats
+
 # === ロガーの定義 ===
 logger = create_logger("app_logger", "logs")  # 通常ログ
-order_logger = create_logger("order_logger", "order_logs")  # 注文ログ
+order_logger = create_logger("order_logger", "order_logs", overflow="block", console=True)  # 注文ログ（落とさない・コンソールにも出す）
 
 # 注文ログ専用関数
 def log_order(log_type: str, message: str):
     # "CANCEL" に合わせて6文字右詰めにし、足りなければスペースで埋める
     aligned_type = log_type.upper().ljust(6)
     formatted = f"{aligned_type}: {message}"
-    order_logger.info(formatted)
-    print(formatted)
+    order_logger.info(formatted)  # コンソールへはリスナーの StreamHandler が出力する
+
+# 注文ログ（複数件）：1件1行のまま書き出す
+def log_order_batch(log_type: str, messages: List[str]):
+    if not messages:
+        return
+    aligned_type = log_type.upper().ljust(6)
+    formatted = [f"{aligned_type}: {message}" for message in messages]
+    for line in formatted:
+        order_logger.info(line)
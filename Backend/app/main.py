@@ -10,14 +10,15 @@
     5. login_get(request: Request):
     6. login_post(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
 
-    7. clear_cookie(response: Response):
-    8. logout():
+    7. clear_cookie(request: Request):
+    8. logout(request: Request):
 
     9. update_check_status(update: CancelUpdate):
     10. favicon():
     11. debug_routes():
 
     12. cancel_root(request: Request):
+    13. metrics():
 '''
 from fastapi import Depends, FastAPI, Response, HTTPException, Request, requests, Form, status
 from fastapi.responses import FileResponse, HTMLResponse, RedirectResponse
@@ -30,11 +31,15 @@ from utils.helper import create_auth_response, get_main_url, redirect_error
 from utils.decorator import log_decorator
 
 from sqlalchemy.exc import DatabaseError
-from log_unified import logger, log_order
+from log_unified import logger, log_order, flush_log_listeners
 
 # サーバ起動時のみ初期化する
+import asyncio
 from contextlib import asynccontextmanager
 from models.admin import init_database
+from config.config_loader import build_delivery_calendar
+from models.order import warm_today_order_index, run_today_order_index_refresher
+from utils.check_coalescer import check_coalescer
 
 # app未使用の警告はエディタの静的解析によるもので、FastAPIでは問題ありません。
 @asynccontextmanager
@@ -43,7 +48,14 @@ async def lifespan(_app: FastAPI):
     # await init_database() # コメントアウトしないと、毎回データを初期化する。
     print("このappはBackend versionです。ローカル環境のDockerコンテナで実行してください。")
     await init_database()
+    build_delivery_calendar()  # 配達予定日カレンダーを前計算
+    await warm_today_order_index()  # 二重注文チェック用の本日の注文インデックス
+    refresher = asyncio.create_task(run_today_order_index_refresher())  # JST 0時に読み込み直す
     yield
+    refresher.cancel()
+    await check_coalescer.flush()  # 書き込み待ちの注文チェックを保存する
+    shutdown_password_hasher()
+    flush_log_listeners()  # キューに残ったログを書き出す
 
 app = FastAPI(lifespan=lifespan)
 templates = Jinja2Templates(directory="templates")
@@ -60,6 +72,17 @@ app.add_middleware(
     allow_headers=["*"],  # すべてのヘッダーを許可
 )
 
+# SQL の計測（リクエストごとのクエリ数・DB 時間、遅い SQL・N+1 のログ）
+from utils.query_stats import QueryStatsMiddleware, instrument_engine
+from database.local_postgresql_database import engine
+app.add_middleware(QueryStatsMiddleware)
+instrument_engine(engine)
+
+# メトリクス収集（ルートごとの処理時間）。一番外側で計測するため最後に追加する
+from utils.metrics import MetricsMiddleware, instrument_pool, render_metrics
+app.add_middleware(MetricsMiddleware)
+instrument_pool(engine)
+
 from routers.router import account_router
 from routers.admin import admin_router
 from routers.manager import manager_router
@@ -79,9 +102,8 @@ app.include_router(order_api_router)
 # app.include_router(order_api_router, prefix="/api/v1/order")　＃これで表示されていないので保留にしている。
 app.include_router(log_router)
 
-# tracemallocを有効にする
-import tracemalloc
-tracemalloc.start()
+# tracemalloc は常時は有効にしない（すべてのメモリ確保が遅くなるため）
+# 調査するときは管理者 API（/admin/me/tracemalloc/...）で開始・スナップショット・比較を行う
 
 from core.constants import (
     ERROR_TOKEN_EXPIRED,
@@ -95,7 +117,8 @@ import jwt
 import requests
 from requests.exceptions import ConnectionError
 
-from core.security import decode_jwt_token
+# 同じトークンの署名検証を繰り返さないよう、デコード結果をトークンの exp までキャッシュする
+from utils.token_cache import decode_jwt_token_cached, evict_token
 from models.admin import init_database
 from utils.helper import redirect_login_failure, redirect_login_success
 from utils.cookie_helper import get_token_expires, compare_expire_date, delete_all_cookies
@@ -142,7 +165,7 @@ async def root(request: Request):
             logger.debug("token is not expired.") # expires 有効
 
 
-        payload = decode_jwt_token(token) # token 解読
+        payload = decode_jwt_token_cached(token) # token 解読
         username = payload['sub']
         permission = payload['permission']
 
@@ -326,7 +349,8 @@ async def login_get(request: Request):
         return await redirect_login_failure(request, ERROR_LOGIN_FAILURE, e)
 
 
-from core.security import authenticate_user
+# bcrypt の照合はスレッドプールで行う（core.security.authenticate_user はループ上で照合するため使わない）
+from utils.password_hasher import authenticate_user, shutdown_password_hasher
 from models.user import get_user
 from sqlalchemy.exc import SQLAlchemyError
 
@@ -425,12 +449,13 @@ async def login_post(request: Request,
     tags=["login"]
 )
 @log_decorator
-async def clear_cookie(response: Response):
+async def clear_cookie(request: Request):
     # /clear で cookie を削除しているが、response: Response 引数の上書きで削除が効いていない
     # または、リダイレクト先 / が再度クッキー依存処理を実行してしまう設計の問題
     # response = RedirectResponse(url="/")
     response = RedirectResponse(url="/login")
 
+    evict_token(request.cookies.get("token"))  # デコード済みトークンのキャッシュからも外す
     delete_all_cookies(response)
 
     return response
@@ -443,8 +468,9 @@ from fastapi.responses import RedirectResponse
     tags=["login"]
 )
 @log_decorator
-def logout():
+def logout(request: Request):
     response = RedirectResponse(url="/login")
+    evict_token(request.cookies.get("token"))  # デコード済みトークンのキャッシュからも外す
     delete_all_cookies(response)
     return response
 
@@ -588,7 +614,7 @@ async def cancel_root(request: Request):
             else:
                 logger.debug("token is not expired.")
 
-            payload = decode_jwt_token(token) # token 解読
+            payload = decode_jwt_token_cached(token) # token 解読
 
         except jwt.ExpiredSignatureError:
             return redirect_login_failure(request, "トークンの有効期限が切れています")
@@ -643,3 +669,17 @@ async def cancel_root(request: Request):
         redirect_url = f"/user/{user_id}/order_cancel_complete/"
         logger.info(f"ユーザー認証成功: {username}, キャンセル画面にリダイレクト → {redirect_url}")
         return RedirectResponse(url=redirect_url, status_code=303)
+
+
+from fastapi.responses import PlainTextResponse
+
+# Prometheus 形式のメトリクス
+@app.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="メトリクス（Prometheus 形式）",
+    description="ルートごとの処理時間（p50/p95/p99）、DB 接続プールの使用状況、注文・キャンセル・二重注文の件数を返す。",
+    tags=["util"]
+)
+async def metrics():
+    return PlainTextResponse(render_metrics(engine), media_type="text/plain; version=0.0.4; charset=utf-8")
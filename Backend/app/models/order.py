@@ -6,43 +6,63 @@
      1. class Order(Base):
      2. create_orders_table():
 
+    # 注文クエリエンジン（以下の select_* はすべてこのラッパー）
+     3. class OrderFilter(NamedTuple):
+     4. get_order_stmt(spec: OrderFilter) -> Tuple[Select, Dict[str, Any]]:
+     5. select_orders(spec: OrderFilter, as_records: bool = False) -> Optional[List[OrderModel]]:
+     6. select_orders_page(spec: OrderFilter, limit: int = ORDER_PAGE_SIZE) -> Optional[OrderPage]:
+        select_order_counts(spec: OrderFilter) -> Optional[OrderCounts]:  ※会社ごとの GROUP BY で1文
+     7. encode_order_cursor(cursor) -> Optional[str] / decode_order_cursor(token: str) -> Tuple[datetime, int]:
+     8. stream_orders(spec: OrderFilter, batch_size: int = ORDER_STREAM_BATCH_SIZE) -> AsyncIterator[OrderModel]:
+     9. order_model_from_row(row) -> OrderModel:  ※検証なし（model_construct）
+    10. class OrderRecord(NamedTuple):  ※Pydantic を使わない軽量レコード
+
     # 一般ユーザー(username) を指定して、注文を取得する
-     3. select_orders_by_user_all(username: str) -> Optional[List[OrderModel]]:
-     4. select_orders_by_user_at_date(username: str, target_date: date) -> Optional[List[OrderModel]]:
-     5. select_orders_by_user_at_date_range(username: str, start: datetime, end: datetime) -> Optional
-     6. select_orders_by_user_ago(username: str, days_ago: int = 0) -> Optional[List[OrderModel]]:
+    11. select_orders_by_user_all(username: str) -> Optional[List[OrderModel]]:
+    12. select_orders_by_user_at_date(username: str, target_date: date) -> Optional[List[OrderModel]]:
+    13. select_orders_by_user_at_date_range(username: str, start: datetime, end: datetime) -> Optional
+    14. select_orders_by_user_ago(username: str, days_ago: int = 0) -> Optional[List[OrderModel]]:
 
     # 契約企業(company_id) を指定して、注文を取得する
-     7. select_orders_by_company_all(company_id: int) -> Optional[List[OrderModel]]:
-     8. select_orders_by_company_at_date(company_id: int, target_date: date) -> Optional[List[OrderModel]]:
-     9. select_orders_by_company_at_date_range(company_id: int, start_date: date, end_date: date) -> Optional[List[OrderModel]]:
-    10. select_orders_by_company_ago(company_id: int, days_ago_str: str = None) -> Optional[List[OrderModel]]:
+    15. select_orders_by_company_all(company_id: int) -> Optional[List[OrderModel]]:
+    16. select_orders_by_company_at_date(company_id: int, target_date: date) -> Optional[List[OrderModel]]:
+    17. select_orders_by_company_at_date_range(company_id: int, start_date: date, end_date: date) -> Optional[List[OrderModel]]:
+    18. select_orders_by_company_ago(company_id: int, days_ago_str: str = None) -> Optional[List[OrderModel]]:
 
     # 店舗(shop_name) を指定して、注文を取得する
-    11. select_orders_by_shop_all(shop_name: str) -> Optional[List[OrderModel]]:
-    12. select_orders_by_shop_company(shop_name: str, company_id: int) -> Optional[List[OrderModel]]:
-    13. select_orders_by_shop_at_date(shop_name: str, target_date: date) -> Optional[List[OrderModel]]:
-    14. select_orders_by_shop_at_date_range(shop_name: str, start_date: date, end_date: date) -> Optional[List[OrderModel]]:
-    15. select_orders_by_shop_ago(shop_name: str, days_ago_str: str) -> Optional[List[OrderModel]]:
+    19. select_orders_by_shop_all(shop_name: str) -> Optional[List[OrderModel]]:
+    20. select_orders_by_shop_company(shop_name: str, company_id: int) -> Optional[List[OrderModel]]:
+    21. select_orders_by_shop_at_date(shop_name: str, target_date: date) -> Optional[List[OrderModel]]:
+    22. select_orders_by_shop_at_date_range(shop_name: str, start_date: date, end_date: date) -> Optional[List[OrderModel]]:
+    23. select_orders_by_shop_ago(shop_name: str, days_ago_str: str) -> Optional[List[OrderModel]]:
 
     # 管理者(admin)用に注文を取得する
-    16. select_single_order(order_id: int) -> OrderModel:
-    17. select_all_orders() -> Optional[List[OrderModel]]:
-    18. select_orders_by_admin_at_date(target_date: date) -> Optional[List[OrderModel]]:
-    19. select_orders_by_admin_at_date_range(start_date: date, end_date: date) -> Optional[List[OrderModel]]:
-    20. select_orders_by_admin_ago(days_ago: int = 0) -> Optional[List[OrderModel]]:
-
-    21. insert_order(company_id: int, username: str, shop_name: str, menu_id: int, amount: int, created_at: Optional[str] = None) -> int:
-    22. update_order(order_id: int, key: str, value: str) -> bool:
-    23. update_order_on_checked(order_id: int, company_id: int, username: str, shop_name: str, menu_id: int, amount: int, updated_at: Optional[str] = None) -> bool:
-    24. delete_order(order_id: int) -> bool:
-    25. delete_all_orders():
-
-    26. get_datetime_range_for_date(target_date) -> start_dt, end_dt
-    27. select_order_summary(conditions: Dict) -> Dict:
-    28. cancel_orders(order_ids: List[int], user_id: int, session: AsyncSession):
+    24. select_single_order(order_id: int) -> OrderModel:
+    25. select_all_orders() -> Optional[List[OrderModel]]:
+    26. select_orders_by_admin_at_date(target_date: date) -> Optional[List[OrderModel]]:
+    27. select_orders_by_admin_at_date_range(start_date: date, end_date: date) -> Optional[List[OrderModel]]:
+    28. select_orders_by_admin_ago(days_ago: int = 0) -> Optional[List[OrderModel]]:
+
+    29. insert_order(company_id: int, username: str, shop_name: str, menu_id: int, amount: int, created_at: Optional[str] = None) -> int:
+    30. update_order(order_id: int, key: str, value: str) -> bool:
+    31. update_order_on_checked(order_id: int, company_id: int, username: str, shop_name: str, menu_id: int, amount: int, updated_at: Optional[str] = None) -> bool:
+        update_orders_checked(updates: List[Dict[str, Any]]) -> Tuple[List[int], List[int]]:  ※checked ごとに1文
+        set_orders_checked(shop_name: str, checked_by_id: Dict[int, bool]) -> Optional[Dict[int, bool]]:  ※CASE で1文
+    32. delete_order(order_id: int) -> bool:
+    33. delete_all_orders():
+
+    34. get_datetime_range_for_date(target_date) -> start_dt, end_dt
+    35. select_order_summary(conditions: Dict) -> Dict:  ※日別集計（models.order_rollup）から読む
+    36. cancel_orders(order_ids: List[int], username: str, session: AsyncSession) -> List[int]:
+
+    # 本日の注文インデックス（二重注文チェック用）
+    37. class TodayOrderIndex:
+    38. warm_today_order_index(target_date: Optional[date] = None) -> int:
+    39. has_ordered_today(username: str) -> bool:
+    40. get_today_order_index_stats() -> Dict[str, Any]:
+    41. run_today_order_index_refresher() -> None:
 '''
-from sqlalchemy import Boolean, Column, Integer, String, DateTime, Date, func
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Date, Index, func, text
 from database.local_postgresql_database import Base, engine
 
 # SELECT * FROM public."Orders"
@@ -65,6 +85,18 @@ class Order(Base):
     checked = Column(Integer, default=0)
     canceled = Column(Boolean, default=False)
 
+    # 一覧・二重注文チェック用のインデックス（alembic: 5b2e9c41d7a3）
+    __table_args__ = (
+        Index("ix_orders_shop_name_created_at", "shop_name", "created_at", "order_id"),
+        Index("ix_orders_username_created_at", "username", "created_at", "order_id"),
+        Index("ix_orders_company_id_created_at", "company_id", "created_at", "order_id"),
+        Index("ix_orders_created_at", "created_at", "order_id"),
+        Index(
+            "ix_orders_username_created_at_active", "username", "created_at",
+            postgresql_where=text("canceled IS NOT true")
+        ),
+    )
+
     def as_dict(self):
         """SQLAlchemyモデルを辞書に変換"""
         return {column.name: getattr(self, column.name) for column in self.__table__.columns}
@@ -97,211 +129,470 @@ async def create_orders_table():
 
 
 '''-----------------------------------------------------------'''
-from datetime import date, datetime, timedelta
-from typing import List, Optional
+# 注文クエリエンジン
+# 旧 select_orders_by_* はすべて select_orders() の薄いラッパーになっている。
+# 条件の「形」ごとにバインドパラメータ付きの SELECT を一度だけ組み立ててキャッシュし、
+# 呼び出しごとの文構築・キャッシュキー生成・コンパイルを省く。
+import base64
+import binascii
+from datetime import date, datetime, time, timedelta
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import bindparam, case, or_, select, tuple_
+from sqlalchemy.sql import Select
+
 from schemas.order_schemas import OrderModel
 from database.local_postgresql_database import AsyncSessionLocal
+from models.company import Company
+from models.menu import Menu
 
-# 選択（一般ユーザー:全件）
-@log_decorator
-async def select_orders_by_user_all(username: str) -> Optional[List[OrderModel]]:
+
+class OrderFilter(NamedTuple):
     """
-    指定された username の全 Orders レコードを取得し、
-    CompanyおよびMenuテーブルとJOINして必要な情報（company_name, menu_nameなど）を取得、
-    その結果をpydanticの OrderModel オブジェクトのリストとして返します。
-    注文が存在しなければ [] を返します。
+    注文クエリエンジンの検索条件。
+    scope:      "user"(username) / "company"(company_id) / "shop"(shop_name) / "order"(order_id) / "admin"(全件)
+    key:        scope に対応する値（admin の場合は None）
+    start, end: created_at の期間（両方指定した場合のみ絞り込む）
+    company_id: scope に加えて契約企業で絞り込む場合に指定
+    canceled, checked: None の場合は条件なし
+    limit:      取得件数の上限
+    cursor:     (created_at, order_id)。指定するとそれより古い注文だけを返す
+    newest_first: True の場合 created_at, order_id の降順で返す（limit/cursor 指定時は常に降順）
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.username == username)
+    scope: str = "admin"
+    key: Any = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    company_id: Optional[int] = None
+    canceled: Optional[bool] = None
+    checked: Optional[bool] = None
+    limit: Optional[int] = None
+    cursor: Optional[Tuple[datetime, int]] = None
+    newest_first: bool = False
+
+
+# scope ごとの絞り込みカラム
+ORDER_SCOPE_COLUMNS = {
+    "user": Order.username,
+    "company": Order.company_id,
+    "shop": Order.shop_name,
+    "order": Order.order_id,
+    "admin": None,
+}
+
+# 条件の形 → 組み立て済み SELECT
+_order_stmt_cache: Dict[tuple, Select] = {}
+
+
+def get_order_stmt_shape(spec: OrderFilter) -> tuple:
+    """
+    キャッシュキーとなる条件の「形」を返す。
+    値そのものはバインドパラメータで渡すため含めないが、
+    canceled / checked は部分インデックスに一致させるため値ごと形に含める。
+    """
+    if spec.scope not in ORDER_SCOPE_COLUMNS:
+        raise ValueError(f"未対応の scope です: {spec.scope}")
+
+    paginated = spec.limit is not None or spec.cursor is not None
+    return (
+        spec.scope,
+        spec.start is not None and spec.end is not None,
+        spec.company_id is not None,
+        spec.canceled,
+        spec.checked,
+        spec.limit is not None,
+        spec.cursor is not None,
+        spec.newest_first or paginated,
+    )
+
+
+def apply_order_filter(stmt: Select, shape: tuple) -> Select:
+    """条件の形のうち、絞り込み（scope・期間・会社・canceled・checked）の WHERE を stmt に加える"""
+    scope, has_period, has_company, canceled, checked = shape[:5]
+
+    column = ORDER_SCOPE_COLUMNS[scope]
+    if column is not None:
+        stmt = stmt.where(column == bindparam("key"))
+    if has_period:
+        stmt = stmt.where(Order.created_at.between(bindparam("start"), bindparam("end")))
+    if has_company:
+        stmt = stmt.where(Order.company_id == bindparam("company_id"))
+
+    # canceled は NULL 許容のため IS TRUE / IS NOT TRUE で判定する
+    if canceled is True:
+        stmt = stmt.where(Order.canceled.is_(True))
+    elif canceled is False:
+        stmt = stmt.where(Order.canceled.isnot(True))
+
+    # checked は 0/1 の Integer カラム
+    if checked is True:
+        stmt = stmt.where(Order.checked != 0)
+    elif checked is False:
+        stmt = stmt.where(or_(Order.checked.is_(None), Order.checked == 0))
+
+    return stmt
+
+
+def build_order_stmt(shape: tuple) -> Select:
+    """条件の形から、Order⋈Company⋈Menu のパラメータ化された SELECT を組み立てる"""
+    has_limit, has_cursor, newest_first = shape[5:]
+
+    stmt = (
+        select(
+            Order.order_id,
+            Company.name.label("company_name"),
+            Order.user_id,
+            Order.username,
+            Order.shop_name,
+            Menu.name.label("menu_name"),
+            Order.amount,
+            Order.created_at,
+            Order.expected_delivery_date,
+            Order.checked
+        )
+        .select_from(Order)
+        .join(Company, Order.company_id == Company.company_id)
+        .join(Menu, Order.menu_id == Menu.menu_id)
+    )
+
+    stmt = apply_order_filter(stmt, shape)
+
+    if has_cursor:
+        stmt = stmt.where(
+            tuple_(Order.created_at, Order.order_id)
+            < tuple_(
+                bindparam("cursor_created_at", type_=Order.created_at.type),
+                bindparam("cursor_order_id", type_=Order.order_id.type)
             )
-            logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
-            rows = result.all()
-            
-            if not rows:
-                logger.warning(f"No order found for user: {username}")
-                return []# return None
-
-            # order_list: List[OrderModel] = []
-            # for row in rows:
-            #     # Rowオブジェクトは _mapping 属性で辞書のように変換可能です
-            #     row_dict = dict(row._mapping)
-            #     # checkedカラムは整数型の場合があるため、bool型に変換します
-            #     row_dict["checked"] = bool(row_dict.get("checked", False))
-            #     order_model = OrderModel(**row_dict)
-            #     order_list.append(order_model)
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
+        )
+    if newest_first:
+        stmt = stmt.order_by(Order.created_at.desc(), Order.order_id.desc())
+    if has_limit:
+        stmt = stmt.limit(bindparam("limit", type_=Integer))
+
+    return stmt
+
+
+def get_order_stmt(spec: OrderFilter) -> Tuple[Select, Dict[str, Any]]:
+    """キャッシュ済みの SELECT と、それに渡すパラメータを返す"""
+    shape = get_order_stmt_shape(spec)
+    stmt = _order_stmt_cache.get(shape)
+    if stmt is None:
+        stmt = build_order_stmt(shape)
+        _order_stmt_cache[shape] = stmt
+
+    return stmt, get_order_stmt_params(spec)
+
+
+def get_order_stmt_params(spec: OrderFilter) -> Dict[str, Any]:
+    """spec の値から、SELECT に渡すバインドパラメータを作る"""
+    params: Dict[str, Any] = {}
+    if ORDER_SCOPE_COLUMNS[spec.scope] is not None:
+        params["key"] = spec.key
+    if spec.start is not None and spec.end is not None:
+        params["start"] = spec.start
+        params["end"] = spec.end
+    if spec.company_id is not None:
+        params["company_id"] = spec.company_id
+    if spec.cursor is not None:
+        params["cursor_created_at"], params["cursor_order_id"] = spec.cursor
+    if spec.limit is not None:
+        params["limit"] = spec.limit
+
+    return params
+
+
+# build_order_stmt() の SELECT 列順
+ORDER_ROW_FIELDS = (
+    "order_id", "company_name", "user_id", "username", "shop_name",
+    "menu_name", "amount", "created_at", "expected_delivery_date", "checked",
+)
+
+
+class OrderRecord(NamedTuple):
+    """
+    Pydantic を通さない軽量な注文レコード（タプル）。
+    大量件数を内部で集計・走査するとき用。checked は bool、
+    expected_delivery_date は DB の値のまま（date）です。
+    """
+    order_id: int
+    company_name: str
+    user_id: Optional[int]
+    username: str
+    shop_name: str
+    menu_name: str
+    amount: int
+    created_at: Optional[datetime]
+    expected_delivery_date: Optional[date]
+    checked: bool
+
+    def to_model(self) -> OrderModel:
+        """OrderModel に変換する（検証なし）"""
+        return order_model_from_row(self)
+
+
+_construct_order_model = OrderModel.model_construct
+
+
+def order_model_from_row(row) -> OrderModel:
+    """
+    DB から取得した1行（ORDER_ROW_FIELDS の順）を OrderModel にする。
+    DB の値は型が確定しているため Pydantic の検証は行わず model_construct で組み立てる。
+    検証した場合と同じ値になるよう checked は bool、配達予定日は datetime にそろえる。
+    """
+    (order_id, company_name, user_id, username, shop_name,
+     menu_name, amount, created_at, expected_delivery_date, checked) = row
+
+    if expected_delivery_date is not None and not isinstance(expected_delivery_date, datetime):
+        expected_delivery_date = datetime.combine(expected_delivery_date, time.min)
+
+    return _construct_order_model(
+        order_id=order_id,
+        company_name=company_name,
+        user_id=user_id,
+        username=username,
+        shop_name=shop_name,
+        menu_name=menu_name,
+        amount=amount,
+        created_at=created_at,
+        expected_delivery_date=expected_delivery_date,
+        checked=bool(checked),  # checked は整数型のため bool に変換
+    )
+
+
+def rows_to_order_models(rows) -> List[OrderModel]:
+    """SELECT 結果の Row を OrderModel のリストに変換する"""
+    return [order_model_from_row(row) for row in rows]
+
+
+def rows_to_order_records(rows) -> List[OrderRecord]:
+    """SELECT 結果の Row を OrderRecord のリストに変換する（Pydantic を使わない）"""
+    return [OrderRecord(*row[:-1], bool(row[-1])) for row in rows]
 
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-    else:
-        return order_models#order_list
 
-# 選択（一般ユーザー: 日付指定）
 @log_decorator
-async def select_orders_by_user_at_date(username: str, target_date: date) -> Optional[List[OrderModel]]:
+async def select_orders(spec: OrderFilter, as_records: bool = False) -> Optional[List[OrderModel]]:
     """
-    指定された username と target_date に該当する注文レコードを取得します。
-    target_date は datetime.date 型で渡され、Orders.created_at がその日付の
-    00:00:00～23:59:59 の範囲の注文を対象とします。
-    CompanyおよびMenuテーブルとJOINして、company_name や menu_name など必要な情報を取得し、
-    結果を pydantic の OrderModel オブジェクトのリストとして返します。
-    注文が存在しなければ [] を返します。
+    OrderFilter に該当する注文を、Company および Menu テーブルとJOINして取得し、
+    pydantic の OrderModel オブジェクトのリストとして返します。
+    as_records=True の場合は Pydantic を使わず OrderRecord のリストを返します。
+    注文が存在しなければ [] を、DBエラー時は None を返します。
     """
-    # from datetime import time
+    stmt, params = get_order_stmt(spec)
     try:
         async with AsyncSessionLocal() as session:
-            start_dt, end_dt = get_datetime_range_for_date(target_date)
-            
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(
-                    Order.username == username,
-                    Order.created_at.between(start_dt, end_dt)
-                )
-            )
-
-            logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
+            result = await session.execute(stmt, params)
             rows = result.all()
-            
+
             if not rows:
-                logger.warning(f"No order found for user: {username} on {target_date.isoformat()}")
-                return []# return None
+                logger.warning(f"No order found: {spec}")
+                return []
 
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
+            if as_records:
+                order_models = rows_to_order_records(rows)
+            else:
+                order_models = rows_to_order_models(rows)
 
     except IntegrityError as e:
         await session.rollback()
         logger.error(f"IntegrityError: {e}")
+        logger.debug(f"{spec=}")
     except OperationalError as e:
         await session.rollback()
         logger.error(f"OperationalError: {e}")
+        logger.debug(f"{spec=}")
     except DatabaseError as e:
         await session.rollback()
         logger.error(f"SQL実行中にエラーが発生しました:{e}")
+        logger.debug(f"{spec=}")
     except Exception as e:
         await session.rollback()
         logger.error(f"Unexpected error: {e}")
+        logger.debug(f"{spec=}")
     else:
         return order_models
 
-# 選択（一般ユーザー:開始日から終了日まで）
+
+# ページ送り（created_at, order_id のキーセット）
+ORDER_PAGE_SIZE = 100       # 1ページの既定件数
+ORDER_PAGE_SIZE_MAX = 500   # 1ページの上限件数
+
+
+class OrderPage(NamedTuple):
+    """select_orders_page() の結果。next_cursor が None なら最終ページ"""
+    orders: List[OrderModel]
+    next_cursor: Optional[Tuple[datetime, int]]
+
+
+def encode_order_cursor(cursor: Optional[Tuple[datetime, int]]) -> Optional[str]:
+    """(created_at, order_id) を URL に載せられる文字列にする"""
+    if cursor is None:
+        return None
+    created_at, order_id = cursor
+    raw = f"{created_at.isoformat()}|{order_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_order_cursor(token: str) -> Tuple[datetime, int]:
+    """encode_order_cursor() の逆変換。不正な値の場合は ValueError"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, order_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), int(order_id)
+    except (UnicodeError, binascii.Error, ValueError) as e:
+        raise ValueError(f"不正なカーソルです: {token}") from e
+
+
 @log_decorator
-async def select_orders_by_user_at_date_range(username: str, start: datetime, end: datetime) -> Optional[List[OrderModel]]:
+async def select_orders_page(spec: OrderFilter, limit: int = ORDER_PAGE_SIZE) -> Optional[OrderPage]:
     """
-    指定された username と start ~ end 期間に該当する注文レコードを取得します。
-    CompanyおよびMenuテーブルとJOINして、company_name や menu_name など必要な情報を取得し、
-    結果を pydantic の OrderModel オブジェクトのリストとして返します。
-    注文が存在しなければ [] を返します。
+    spec に該当する注文を新しい順に limit 件取得します。
+    spec.cursor を指定すると、そのカーソルより古い注文から取得します。
+    履歴の件数に関係なく、1ページのコストは一定です。DBエラー時は None を返します。
+    """
+    # 1件多く取得して次ページの有無を判定する
+    orders = await select_orders(spec._replace(limit=limit + 1))
+    if orders is None:
+        return None
+
+    if len(orders) <= limit:
+        return OrderPage(orders, None)
+
+    orders = orders[:limit]
+    last = orders[-1]
+    return OrderPage(orders, (last.created_at, last.order_id))
+
+
+# 件数の集計（注文一覧の「会社別の件数」「チェック済みの件数」）
+class OrderCounts(NamedTuple):
+    """select_order_counts() の結果。by_company は [(会社名, 件数)]（新しい注文がある会社から順）"""
+    order_count: int
+    checked_count: int
+    by_company: List[Tuple[str, int]]
+
+
+# 条件の形 → 組み立て済みの集計 SELECT
+_order_counts_stmt_cache: Dict[tuple, Select] = {}
+
+
+def build_order_counts_stmt(shape: tuple) -> Select:
+    """
+    条件の形から、会社ごとの件数・チェック済み件数を返す GROUP BY を組み立てる。
+    一覧（build_order_stmt）と同じ結合・絞り込みにして、件数を一覧と一致させる。
+    """
+    checked = func.sum(case((Order.checked != 0, 1), else_=0))
+    stmt = (
+        select(Company.name.label("company_name"), func.count().label("order_count"), checked.label("checked_count"))
+        .select_from(Order)
+        .join(Company, Order.company_id == Company.company_id)
+        .join(Menu, Order.menu_id == Menu.menu_id)
+    )
+    stmt = apply_order_filter(stmt, shape)
+    # 会社の並びは、一覧（新しい順）で先に出てくる会社から
+    return stmt.group_by(Company.name).order_by(func.max(Order.order_id).desc())
+
+
+def get_order_counts_stmt(spec: OrderFilter) -> Tuple[Select, Dict[str, Any]]:
+    """キャッシュ済みの集計 SELECT と、それに渡すパラメータを返す（limit / cursor は使わない）"""
+    spec = spec._replace(limit=None, cursor=None, newest_first=False)
+    shape = get_order_stmt_shape(spec)
+    stmt = _order_counts_stmt_cache.get(shape)
+    if stmt is None:
+        stmt = build_order_counts_stmt(shape)
+        _order_counts_stmt_cache[shape] = stmt
+
+    return stmt, get_order_stmt_params(spec)
+
+
+@log_decorator
+async def select_order_counts(spec: OrderFilter) -> Optional[OrderCounts]:
+    """
+    spec に該当する注文（ページ送りの全体）の件数を、会社ごとの GROUP BY 1文で取得します。
+    注文の行は取得しないため、一覧は select_orders_page() で表示する分だけ取得すれば足ります。
+    合計は会社ごとの行（会社数）を足して求めます。DBエラー時は None を返します。
     """
+    stmt, params = get_order_counts_stmt(spec)
     try:
-        start_datetime = datetime.combine(start, time.min)
-        end_datetime = datetime.combine(end, time.max)
-        
         async with AsyncSessionLocal() as session:
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(
-                    Order.username == username,
-                    Order.created_at.between(start_datetime, end_datetime)
-                )
-            )
+            rows = (await session.execute(stmt, params)).all()
 
-            logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
-            rows = result.all()
+    except (IntegrityError, OperationalError, DatabaseError) as e:
+        logger.error(f"select_order_counts() - SQL実行中にエラーが発生しました: {e}")
+        logger.debug(f"{spec=}")
+    except Exception as e:
+        logger.error(f"select_order_counts() - Unexpected error: {e}")
+        logger.debug(f"{spec=}")
+    else:
+        return OrderCounts(
+            order_count=sum(row.order_count for row in rows),
+            checked_count=sum(int(row.checked_count or 0) for row in rows),
+            by_company=[(row.company_name, row.order_count) for row in rows],
+        )
 
-            if not rows:
-                logger.warning(f"No order found for user: {username} between {start} and {end}")
-                return []
 
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
+# ストリーミング取得（サーバーサイドカーソル）
+ORDER_STREAM_BATCH_SIZE = 500   # 1回のフェッチで取り出す件数
+
+
+async def stream_orders(spec: OrderFilter, batch_size: int = ORDER_STREAM_BATCH_SIZE) -> AsyncIterator[OrderModel]:
+    """
+    spec に該当する注文をサーバーサイドカーソル（session.stream）で batch_size 件ずつ取り出し、
+    OrderModel を1件ずつ yield します。取得期間が長くてもメモリ使用量は batch_size 件分で一定です。
+    DBエラーはログを出して呼び出し側へ送出します（途中で切れた結果を、正常な終わりに見せないため）。
+    """
+    stmt, params = get_order_stmt(spec)
+    try:
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                stmt, params, execution_options={"yield_per": batch_size}
+            )
+            async for partition in result.partitions():
+                for order in rows_to_order_models(partition):
+                    yield order
 
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
     except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
+        logger.error(f"stream_orders() - OperationalError: {e}")
+        logger.debug(f"{spec=}")
+        raise
     except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました: {e}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-    else:
-        return order_models
+        logger.error(f"stream_orders() - SQL実行中にエラーが発生しました:{e}")
+        logger.debug(f"{spec=}")
+        raise
+
 
+'''-----------------------------------------------------------'''
 from utils.date_utils import get_datetime_range
-from datetime import time
+
+# 選択（一般ユーザー:全件）
+@log_decorator
+async def select_orders_by_user_all(username: str) -> Optional[List[OrderModel]]:
+    """
+    指定された username の全注文を取得します。
+    注文が存在しなければ [] を返します。
+    """
+    return await select_orders(OrderFilter("user", username))
+
+# 選択（一般ユーザー: 日付指定）
+@log_decorator
+async def select_orders_by_user_at_date(username: str, target_date: date) -> Optional[List[OrderModel]]:
+    """
+    指定された username の target_date（00:00:00～23:59:59）の注文を取得します。
+    注文が存在しなければ [] を返します。
+    """
+    start_dt, end_dt = get_datetime_range_for_date(target_date)
+    return await select_orders(OrderFilter("user", username, start_dt, end_dt))
+
+# 選択（一般ユーザー:開始日から終了日まで）
+@log_decorator
+async def select_orders_by_user_at_date_range(username: str, start: datetime, end: datetime) -> Optional[List[OrderModel]]:
+    """
+    指定された username の start ~ end 期間の注文を取得します。
+    注文が存在しなければ [] を返します。
+    """
+    start_datetime = datetime.combine(start, time.min)
+    end_datetime = datetime.combine(end, time.max)
+    return await select_orders(OrderFilter("user", username, start_datetime, end_datetime))
 
 # 選択（一般ユーザー:日付遡及）
 @log_decorator
@@ -320,282 +611,43 @@ async def select_orders_by_user_ago(username: str, days_ago: int = 0) -> Optiona
 @log_decorator
 async def select_orders_by_user_ago_old(username: str, days_ago: int = 0) -> Optional[List[OrderModel]]:
     """
-    指定された username の注文レコードを、本日から指定日数前から本日までの期間に絞り込んで取得します。
+    指定された username の注文を、本日から指定日数前から本日までの期間に絞り込んで取得します。
     例）days_ago=3 → 本日から３日前～本日の期間の注文を取得する。
-    CompanyおよびMenuテーブルとJOINして、必要な情報（company_name, menu_nameなど）を取得し、
-    その結果を pydantic の OrderModel オブジェクトのリストとして返します。
-    注文が存在しなければ [] を返します。
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            # 基本クエリ：username でフィルタし、必要な項目をJOINで取得
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.username == username)
-            )
-
-            start_dt, end_dt = await get_datetime_range(days_ago)
-            stmt = stmt.where(Order.created_at.between(start_dt, end_dt))
-
-            logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
-            rows = result.all()
-
-            if not rows:
-                logger.warning(f"No order found for user: {username} within the specified period days_ago: {days_ago}")
-                return []# return None
-
-            order_models: List[OrderModel] = []
-            for row in rows:
-                # Rowオブジェクトは _mapping 属性で辞書のように変換可能です
-                row_dict = dict(row._mapping)
-                # checked カラムが整数型の場合があるので、明示的に bool() に変換
-                row_dict["checked"] = bool(row_dict.get("checked", False))
-                order_model = OrderModel(**row_dict)
-                order_models.append(order_model)
-
-            return order_models
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
+    start_dt, end_dt = await get_datetime_range(days_ago)
+    return await select_orders(OrderFilter("user", username, start_dt, end_dt))
 
 
 '''-----------------------------------------------------------'''
-from models.company import Company
-from models.menu import Menu
-
 # 選択（契約企業ユーザー:全件）
 @log_decorator
 async def select_orders_by_company_all(company_id: int) -> Optional[List[OrderModel]]:
     """
-    指定された company_id の注文レコードを、Company および Menu テーブルとJOINして取得します。
-    取得結果を pydantic の OrderModel オブジェクトのリストとして返します。
+    指定された company_id の全注文を取得します。
     注文が存在しなければ [] を返します。
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.company_id == company_id)
-            )
-
-            logger.debug(f"{stmt=}")
-
-            result = await session.execute(stmt)
-            rows = result.all()
-
-            if not rows:
-                logger.warning(f"No order found for the given company_id: {company_id}")
-                return []# return None
-
-            # order_models: List[OrderModel] = []
-            # for row in rows:
-            #     row_dict = dict(row._mapping) # _mapping 属性で変換
-            #     # checked カラムは整数型の場合があるので bool 型に変換します
-            #     row_dict["checked"] = bool(row_dict.get("checked", False))
-            #     order_model = OrderModel(**row_dict)
-            #     order_models.append(order_model)
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-    else:
-        logger.debug(f"- {order_models=}")
-        return order_models
+    return await select_orders(OrderFilter("company", company_id))
 
 # 選択（契約企業ユーザー: 日付指定）
 @log_decorator
 async def select_orders_by_company_at_date(company_id: int, target_date: date) -> Optional[List[OrderModel]]:
     """
-    指定された company_id と target_date に該当する注文レコードを、
-    Company および Menu テーブルとJOINして取得します。
-    
-    target_date は datetime.date 型で渡され、Orders.created_at がその日付の
-    00:00:00～23:59:59 の範囲の注文を対象とします。
-    
-    取得結果は pydantic の OrderModel オブジェクトのリストとして返し、
-    該当する注文が存在しなければ [] を返します。
+    指定された company_id の target_date（00:00:00～23:59:59）の注文を取得します。
+    注文が存在しなければ [] を返します。
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            # target_date をもとに期間文字列を生成
-            start_dt, end_dt = get_datetime_range_for_date(target_date)
-
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.company_id == company_id)
-                .where(Order.created_at.between(start_dt, end_dt))
-            )
-            
-            logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
-            rows = result.all()
-            
-            if not rows:
-                logger.warning(f"No order found for the given company_id:{company_id} and target_date: {target_date}")
-                return []# return None
-            
-            # order_models: List[OrderModel] = []
-            # for row in rows:
-            #     # Rowオブジェクトは _mapping 属性で辞書として変換可能です
-            #     row_dict = dict(row._mapping)
-            #     # checked カラムは整数型の場合があるので、bool型に変換
-            #     row_dict["checked"] = bool(row_dict.get("checked", False))
-            #     order_model = OrderModel(**row_dict)
-            #     order_models.append(order_model)
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-    else:
-        logger.debug(f"{order_models=}")
-        return order_models
+    start_dt, end_dt = get_datetime_range_for_date(target_date)
+    return await select_orders(OrderFilter("company", company_id, start_dt, end_dt))
 
 
 # 選択（契約企業ユーザー:開始日から終了日まで）
 @log_decorator
 async def select_orders_by_company_at_date_range(company_id: int, start_date: date, end_date: date) -> Optional[List[OrderModel]]:
     """
-    指定された company_id と日付範囲（start_date ~ end_date）の注文レコードを取得します。
+    指定された company_id と日付範囲（start_date ~ end_date）の注文を取得します。
     """
     start_datetime = datetime.combine(start_date, time.min)
     end_datetime = datetime.combine(end_date, time.max)
-
-    try:
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.company_id == company_id)
-                .where(Order.created_at.between(start_datetime, end_datetime))
-            )
-            
-            logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
-            rows = result.all()
-            
-            if not rows:
-                logger.warning(f"No order found for company_id: {company_id} between {start_date} and {end_date}")
-                return []
-
-            # order_models: List[OrderModel] = []
-            # for row in rows:
-            #     row_dict = dict(row._mapping)
-            #     row_dict["checked"] = bool(row_dict.get("checked", False))
-            #     order_models.append(OrderModel(**row_dict))
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"DatabaseError: {e}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-    else:
-        return order_models
+    return await select_orders(OrderFilter("company", company_id, start_datetime, end_datetime))
 
 
 # 選択（契約企業ユーザー:日付遡及）
@@ -613,306 +665,42 @@ async def select_orders_by_company_ago(company_id: int, days_ago: int = 0) -> Op
 @log_decorator
 async def select_orders_by_company_ago_old(company_id: int, days_ago: int = 0) -> Optional[List[OrderModel]]:
     """
-    指定された company_id の注文レコードを、Company および Menu テーブルとJOINして取得します。
-    days_ago が指定されている場合、created_at が指定期間内の注文に絞り込みます。
-    取得結果は pydantic の OrderModel オブジェクトのリストとして返し、
-    注文が存在しなければ [] を返します。
+    指定された company_id の注文を、days_ago日前の 00:00:00 から本日 23:59:59 までの期間で取得します。
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            # 基本クエリ: Company, Menu とJOINして必要項目を取得
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.company_id == company_id)
-            )
-
-
-            # 期間指定: days_ago日前から本日までの期間を取得
-            start_dt, end_dt = await get_datetime_range(days_ago)
-            stmt = stmt.where(Order.created_at.between(start_dt, end_dt))
-            logger.debug(f"{stmt=}")
-
-            result = await session.execute(stmt)
-            rows = result.all()
-            
-            if not rows:
-                logger.warning(f"No order found for the given company_id: {company_id}")
-                return []# return None
-
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
-
-            logger.debug(f"select_orders_by_company_ago() - order_models: {order_models}")
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-    else:
-        return order_models
+    start_dt, end_dt = await get_datetime_range(days_ago)
+    return await select_orders(OrderFilter("company", company_id, start_dt, end_dt))
 
 
 '''-----------------------------------------------------------'''
-from typing import Optional, List
-
-from sqlalchemy import select
-
-from schemas.order_schemas import OrderModel
-
-
 # 選択（店舗ユーザー:全件）
 @log_decorator
 async def select_orders_by_shop_all(shop_name: str) -> Optional[List[OrderModel]]:
     """
-    指定された shop_name に該当する全注文情報を、Company および Menu テーブルとJOINして取得し、
-    pydantic の OrderModel オブジェクトのリストとして返します。
+    指定された shop_name の全注文を取得します。
     注文が存在しなければ [] を返します。
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.shop_name == shop_name)
-            )
-            
-            result = await session.execute(stmt)
-            rows = result.all()
-            
-            if not rows:
-                logger.warning(f"No order found with the given shop_name: {shop_name}")
-                return []# return None
-            
-            order_models: List[OrderModel] = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-
-                # DEBUG: created_at の型確認
-                # logger.debug(f"[DEBUG] created_at type: {type(row_dict.get('created_at'))}, value: {row_dict.get('created_at')}")
-
-                # created_at を文字列から datetime に変換（必要な場合のみ）
-                created_at_val = row_dict.get("created_at")
-                if isinstance(created_at_val, str):
-                    try:
-                        row_dict["created_at"] = datetime.fromisoformat(created_at_val)
-                    except ValueError:
-                        row_dict["created_at"] = datetime.strptime(created_at_val, "%Y-%m-%d %H:%M:%S.%f%z")
-
-                # checked を bool に明示変換
-                row_dict["checked"] = bool(row_dict.get("checked", False))
-
-                # OrderModel へ変換
-                # order_model = OrderModel(**row_dict)
-                # order_models.append(order_model)
-                order_models = []
-                for row in rows:
-                    row_dict = dict(row._mapping)
-                    row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                    order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-        logger.debug(f"{stmt=}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-        logger.debug(f"{stmt=}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-        logger.debug(f"{stmt=}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-        logger.debug(f"{stmt=}")
-    else:
-        logger.debug(f"select_orders_by_shop_all() - order_models: {order_models}")
-        return order_models
+    return await select_orders(OrderFilter("shop", shop_name))
 
 
 # 選択（店舗ユーザー:店舗・契約企業指定）
 @log_decorator
 async def select_orders_by_shop_company(shop_name: str, company_id: int) -> Optional[List[OrderModel]]:
     """
-    指定された shop_name と company_id に該当する注文情報を、
-    Company および Menu テーブルとJOINして取得します。
-    取得結果は pydantic の OrderModel オブジェクトのリストとして返し、
+    指定された shop_name と company_id に該当する注文を取得します。
     注文が存在しなければ [] を返します。
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.shop_name == shop_name, Order.company_id == company_id)
-            )
-            
-            result = await session.execute(stmt)
-            rows = result.all()
-            
-            if not rows:
-                logger.warning(f"No order found for shop: {shop_name} and company_id: {company_id}")
-                return []# return None
-
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
-            # order_models: List[OrderModel] = []
-            # for row in rows:
-            #     # Rowオブジェクトは _mapping 属性で辞書に変換可能です
-            #     row_dict = dict(row._mapping)
-            #     # 必要に応じた型変換
-            #     row_dict["order_id"] = int(row_dict["order_id"])
-            #     row_dict["amount"] = int(row_dict["amount"])
-            #     row_dict["checked"] = bool(row_dict.get("checked", False))
-            #     # 辞書から pydantic モデル OrderModel を生成
-            #     order_model = OrderModel(**row_dict)
-            #     order_models.append(order_model)
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-        logger.debug(f"{stmt=}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-        logger.debug(f"{stmt=}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-        logger.debug(f"{stmt=}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-        logger.debug(f"{stmt=}")
-    else:
-        logger.debug(f"select_orders_by_shop_company() - order_models: {order_models}")
-        return order_models
+    return await select_orders(OrderFilter("shop", shop_name, company_id=company_id))
 
 
 # 選択（店舗ユーザー:日付指定）
 @log_decorator
 async def select_orders_by_shop_at_date(shop_name: str, target_date: date) -> Optional[List[OrderModel]]:
     """
-    指定された shop_name と target_date に該当する注文レコードを取得します。
-    
-    target_date は datetime.date 型で渡され、Orders.created_at がその日付の
-    00:00:00～23:59:59 の範囲内の注文を対象とします。
-    
-    取得結果は pydantic の OrderModel オブジェクトのリストとして返し、
-    該当する注文が存在しなければ [] を返します。
+    指定された shop_name の target_date（00:00:00～23:59:59）の注文を取得します。
+    注文が存在しなければ [] を返します。
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            # target_dateから期間文字列を生成
-            start_dt, end_dt = get_datetime_range_for_date(target_date)
-            print(f"{start_dt=},{end_dt=}")
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.shop_name == shop_name)
-                .where(Order.created_at.between(start_dt, end_dt))
-            )
-
-            result = await session.execute(stmt)
-            rows = result.all()
-            
-            if not rows:
-                logger.warning(f"No order found for the given shop_name: {shop_name} and target_date: {target_date}")
-                return []# return None
-
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-        logger.debug(f"{stmt=}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-        logger.debug(f"{stmt=}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-        logger.debug(f"{stmt=}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-        logger.debug(f"{stmt=}")
-    else:
-        logger.debug(f"select_orders_by_shop_at_date() - order_models: {order_models}")
-        return order_models
+    start_dt, end_dt = get_datetime_range_for_date(target_date)
+    return await select_orders(OrderFilter("shop", shop_name, start_dt, end_dt))
 
 
 # 選択（店舗ユーザー:開始日から終了日まで）
@@ -923,61 +711,7 @@ async def select_orders_by_shop_at_date_range(shop_name: str, start_date: date,
     """
     start_datetime = datetime.combine(start_date, time.min)
     end_datetime = datetime.combine(end_date, time.max)
-    try:
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.shop_name == shop_name)
-                .where(Order.created_at.between(start_datetime, end_datetime))
-            )
-            
-            logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
-            rows = result.all()
-            
-            if not rows:
-                logger.warning(f"No orders found for shop: {shop_name} between {start_date} and {end_date}")
-                return []
-
-            # order_models: List[OrderModel] = []
-            # for row in rows:
-            #     row_dict = dict(row._mapping)
-            #     row_dict["checked"] = bool(row_dict.get("checked", False))
-            #     order_models.append(OrderModel(**row_dict))
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"DatabaseError: {e}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-    else:
-        return order_models
+    return await select_orders(OrderFilter("shop", shop_name, start_datetime, end_datetime))
 
 
 # 選択（店舗ユーザー:日付遡及）
@@ -996,91 +730,13 @@ async def select_orders_by_shop_ago(shop_name: str, days_ago: int = 0) -> Option
 @log_decorator
 async def select_orders_by_shop_ago_old(shop_name: str, days_ago: int = 0) -> Optional[List[OrderModel]]:
     """
-    指定された shop_name の注文レコードを、Company および Menu テーブルとJOINして取得します。
-    days_ago が指定されている場合、本日から指定日数前（例：days_ago=3 → 3日前）の開始日から本日までの
-    Orders.created_at の範囲内の注文に絞り込みます。
-    
-    取得結果は pydantic の OrderModel オブジェクトのリストとして返し、
-    該当する注文が存在しなければ [] を返します。
+    指定された shop_name の注文を、本日から指定日数前（例：days_ago=3 → 3日前）の開始日から
+    本日までの期間で取得します。days_ago=0 の場合は本日 00:00:00 から翌日 00:00:00 まで。
     """
-    print(f"{shop_name=}, {days_ago=}")
-    try:
-        async with AsyncSessionLocal() as session:
-            # JOINして基本クエリを構築
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.shop_name == shop_name)
-            )
-
-            # 指定日数前から本日までの期間を取得
-            start_dt, end_dt = await get_datetime_range(days_ago)
-
-            # 期間条件を追加
-            if days_ago == 0:
-                stmt = stmt.where(
-                    Order.created_at >= start_dt,
-                    Order.created_at <= start_dt + timedelta(days=1)
-                )
-            else:
-                stmt = stmt.where(
-                    Order.created_at >= start_dt,
-                    Order.created_at <= end_dt  # ここは `<=` にするのが素直で安全
-                )
-
-            result = await session.execute(stmt)
-            rows = result.all()
-
-            if not rows:
-                logger.warning(f"No order found for the given shop_name: {shop_name} with the specified start_dt: {start_dt}, end_dt: {end_dt}")
-                return []# return None
-
-            print(f"rows count: {len(rows)}")
-
-            order_models: List[OrderModel] = []
-            for row in rows:
-                # Rowオブジェクトは _mapping 属性で辞書に変換可能
-                row_dict = dict(row._mapping)
-                # 必要に応じた型変換
-                row_dict["order_id"] = int(row_dict["order_id"])
-                row_dict["amount"] = int(row_dict["amount"])
-                row_dict["checked"] = bool(row_dict.get("checked", False))
-                order_model = OrderModel(**row_dict)
-                order_models.append(order_model)
-
-            logger.debug(f"{order_models=}")
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-        logger.error(f"{stmt=}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-        logger.error(f"{stmt=}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-        logger.error(f"{stmt=}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-        logger.error(f"{stmt=}")
-    else:
-        return order_models
+    start_dt, end_dt = await get_datetime_range(days_ago)
+    if days_ago == 0:
+        end_dt = start_dt + timedelta(days=1)
+    return await select_orders(OrderFilter("shop", shop_name, start_dt, end_dt))
 
 
 '''-----------------------------------------------------------'''
@@ -1089,124 +745,21 @@ async def select_orders_by_shop_ago_old(shop_name: str, days_ago: int = 0) -> Op
 @log_decorator
 async def select_single_order(order_id: int) -> Optional[OrderModel]:
     """
-    指定されたorder_idに該当するOrdersレコードを、
-    Company、MenuテーブルとJOINして必要な情報を取得し、pydanticのOrderModelオブジェクトとして返します。
+    指定されたorder_idに該当する注文を OrderModel として返します。
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.order_id == order_id)
-            )
-            logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
-            row = result.first()
-
-            if row is None:
-                logger.warning("No order found")
-                return []
-
-            # Rowオブジェクトは _mapping 属性で辞書のように変換可能です
-            row_dict = dict(row._mapping)
-            # checkedは整数型の場合があるので、明示的にbool型に変換
-            row_dict["checked"] = bool(row_dict["checked"])
-            order_model = OrderModel(**row_dict)
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-    else:
-        return order_model
+    order_models = await select_orders(OrderFilter("order", order_id))
+    if not order_models:
+        return order_models
+    return order_models[0]
 
 # 選択（管理者ユーザー:全件）
 @log_decorator
 async def select_all_orders() -> Optional[List[OrderModel]]:
     """
-    全てのOrdersレコードを取得し、pydanticのOrderModelのリストとして返します。
+    全ての注文を取得し、pydanticのOrderModelのリストとして返します。
     (注文が存在しない場合は [] を返します)
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            # CompanyおよびMenuテーブルとJOINして、必要なカラムを取得します
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-            )
-            logger.debug(f"{stmt=}")
-
-            result = await session.execute(stmt)
-            rows = result.all()
-
-            if not rows:
-                logger.warning("No order found")
-                return []# return None
-
-
-            # order_models: List[OrderModel] = []
-            # for row in rows:
-            #     # SQLAlchemyのRowオブジェクトは _mapping 属性で辞書のようにアクセス可能です
-            #     row_dict = dict(row._mapping)
-            #     # checkedは整数型になっている場合があるため、bool型に変換
-            #     row_dict["checked"] = bool(row_dict["checked"])
-            #     # 取得した辞書データをもとに、pydanticモデルOrderModelを生成します
-            #     order_model = OrderModel(**row_dict)
-            #     order_models.append(order_model)
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-    else:
-        return order_models
+    return await select_orders(OrderFilter())
 
 
 # 選択（管理者ユーザー:日付指定）
@@ -1216,48 +769,7 @@ async def select_orders_by_admin_at_date(target_date: date) -> Optional[List[Ord
     管理者用。指定日の全注文を取得。
     """
     start_dt, end_dt = get_datetime_range_for_date(target_date)
-
-    try:
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.created_at.between(start_dt, end_dt))
-            )
-            
-            logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
-            rows = result.all()
-            
-            if not rows:
-                logger.warning(f"No orders found on {target_date}")
-                return []
-
-            # order_models = [OrderModel(**dict(row._mapping), checked=bool(dict(row._mapping).get("checked", False))) for row in rows]
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
-
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-    else:
-        return order_models
+    return await select_orders(OrderFilter(start=start_dt, end=end_dt))
 
 
 # 選択（管理者ユーザー:開始日から終了日まで）
@@ -1268,48 +780,7 @@ async def select_orders_by_admin_at_date_range(start_date: date, end_date: date)
     """
     start_datetime = datetime.combine(start_date, time.min)
     end_datetime = datetime.combine(end_date, time.max)
-    
-    try:
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-                .where(Order.created_at.between(start_datetime, end_datetime))
-            )
-            
-            logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
-            rows = result.all()
-            
-            if not rows:
-                logger.warning(f"No orders found between {start_date} and {end_date}")
-                return []
-
-            # order_models = [OrderModel(**dict(row._mapping), checked=bool(dict(row._mapping).get("checked", False))) for row in rows]
-            order_models = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))  # ここで変換
-                order_models.append(OrderModel(**row_dict))  # ここでは重複指定しない
-
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
-    else:
-        return order_models
+    return await select_orders(OrderFilter(start=start_datetime, end=end_datetime))
 
 
 # 選択（管理者ユーザー:日付遡及）
@@ -1328,70 +799,23 @@ async def select_orders_ago(days_ago: int = 0) -> Optional[List[OrderModel]]:
 @log_decorator
 async def select_orders_by_admin_ago_old(days_ago: int = 0) -> Optional[List[OrderModel]]:
     """
-    管理者用。usernameフィルタを行わず、指定日数前から本日までの全注文レコードを取得します。
-    CompanyおよびMenuテーブルとJOINして、必要な情報を取得し、
-    pydantic の OrderModel オブジェクトのリストとして返します。
-    注文が存在しなければ [] を返します。
+    管理者用。指定日数前から本日までの全注文を取得します。
     """
-    try:
-        async with AsyncSessionLocal() as session:
-            # username フィルタ無し
-            stmt = (
-                select(
-                    Order.order_id,
-                    Company.name.label("company_name"),
-                    Order.user_id,
-                    Order.username,
-                    Order.shop_name,
-                    Menu.name.label("menu_name"),
-                    Order.amount,
-                    Order.created_at,
-                    Order.expected_delivery_date,
-                    Order.checked
-                )
-                .select_from(Order)
-                .join(Company, Order.company_id == Company.company_id)
-                .join(Menu, Order.menu_id == Menu.menu_id)
-            )
-
-            # 日付範囲フィルタのみ適用
-            start_dt, end_dt = await get_datetime_range(days_ago)
-            stmt = stmt.where(Order.created_at.between(start_dt, end_dt))
-
-            logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
-            rows = result.all()
-
-            if not rows:
-                logger.warning(f"No orders found within the specified period days_ago: {days_ago}")
-                return []
-
-            order_models: List[OrderModel] = []
-            for row in rows:
-                row_dict = dict(row._mapping)
-                row_dict["checked"] = bool(row_dict.get("checked", False))
-                order_model = OrderModel(**row_dict)
-                order_models.append(order_model)
-
-            return order_models
-
-    except IntegrityError as e:
-        await session.rollback()
-        logger.error(f"IntegrityError: {e}")
-    except OperationalError as e:
-        await session.rollback()
-        logger.error(f"OperationalError: {e}")
-    except DatabaseError as e:
-        await session.rollback()
-        logger.error(f"SQL実行中にエラーが発生しました:{e}")
-    except Exception as e:
-        await session.rollback()
-        logger.error(f"Unexpected error: {e}")
+    start_dt, end_dt = await get_datetime_range(days_ago)
+    return await select_orders(OrderFilter(start=start_dt, end=end_dt))
 
 '''-------------------------------------------------------------'''
 # 追加
 from utils.date_utils import get_naive_jst_now
 from config.config_loader import search_delivery_date
+from utils.metrics import ORDERS_INSERTED, ORDERS_CANCELED
+from utils.order_events import publish_order_event
+from models.order_rollup import RollupDeltas, apply_rollup_deltas
+
+# 日別集計（daily_order_rollup）の差分計算に使うカラム。注文を書き換える関数は、同じトランザクションで集計も増減させる
+ROLLUP_SOURCE_COLUMNS = (
+    Order.created_at, Order.shop_name, Order.company_id, Order.menu_id, Order.amount, Order.canceled, Order.checked
+)
 
 @log_decorator
 async def insert_order(
@@ -1447,6 +871,7 @@ async def insert_order(
                 checked=0
             )
             session.add(new_order)
+            await apply_rollup_deltas(session, RollupDeltas().add_order(new_order))
             await session.commit()
             await session.refresh(new_order)
 
@@ -1470,6 +895,17 @@ async def insert_order(
             "ORDER",
             f"注文完了 - order_id:{order_id:>4} - company_id:{company_id}, username:{username}, shop_name:{shop_name}, menu_id:{menu_id}, amount:{amount}"
         )
+        today_order_index.add(order_id, username, created_at)
+        ORDERS_INSERTED.inc()
+        publish_order_event(shop_name, "order_created", {
+            "order_id": order_id,
+            "company_id": company_id,
+            "username": username,
+            "menu_id": menu_id,
+            "amount": amount,
+            "created_at": created_at,
+            "expected_delivery_date": delivery_date,
+        })
         logger.debug(f"logger.handlers: {logger.handlers}")
         logger.info(f"insert_order(): 完了 - order_id:{order_id:>4}")
         return order_id
@@ -1515,12 +951,25 @@ async def update_order(order_id: int, key: str, value: str) -> bool:
 
             updated_time = get_naive_jst_now()
 
+            # 日別集計の差分と、店舗へのイベント配信（と本日の注文インデックスへの戻し）のために変更前の行を取得する
+            before = (await session.execute(
+                select(Order.username, *ROLLUP_SOURCE_COLUMNS).where(Order.order_id == order_id).with_for_update()
+            )).first()
+
             stmt = (
                 update(Order)
                 .where(Order.order_id == order_id)
                 .values({key: parsed_value, "updated_at": updated_time})
             )
             result = await session.execute(stmt)
+
+            restored = before if key in ("canceled", "checked") else None
+            if before is not None and key in before._fields:
+                rollup_value = parsed_value
+                if key == "created_at" and isinstance(parsed_value, str):
+                    rollup_value = datetime.fromisoformat(parsed_value)
+                await apply_rollup_deltas(session, RollupDeltas().change(before, **{key: rollup_value}))
+
             await session.commit()
 
     except IntegrityError as e:
@@ -1549,6 +998,16 @@ async def update_order(order_id: int, key: str, value: str) -> bool:
             logger.error(f"{stmt=}")
             return False
         else:
+            if key == "canceled":
+                if parsed_value is True:
+                    # 既にキャンセル済みの注文を再度キャンセルした場合は数えない
+                    if restored is not None and not restored.canceled:
+                        today_order_index.discard(order_id)
+                        ORDERS_CANCELED.inc()
+                elif restored is not None:
+                    today_order_index.add(order_id, restored.username, restored.created_at)
+            if key in ("canceled", "checked") and restored is not None:
+                publish_order_event(restored.shop_name, f"order_{key}", {"order_id": order_id, key: bool(parsed_value)})
             logger.info(f"注文更新成功: order_id {order_id}, {key}={parsed_value}")
             logger.debug(f"update_order() - SQL: {stmt}")
             return True
@@ -1565,12 +1024,17 @@ async def update_order_on_checked(order_id: int, checked: bool):
             await session.execute(text("SET TIME ZONE 'Asia/Tokyo'"))  # タイムゾーン設定
 
             updated_time = get_naive_jst_now()
+            before = (await session.execute(
+                select(*ROLLUP_SOURCE_COLUMNS).where(Order.order_id == order_id).with_for_update()
+            )).first()
             stmt = (
                 update(Order)
                 .where(Order.order_id == order_id)
                 .values(checked=checked, updated_at=updated_time)
             )
             result = await session.execute(stmt)
+            if before is not None:
+                await apply_rollup_deltas(session, RollupDeltas().change(before, checked=checked))
             await session.commit()
 
     except IntegrityError as e:
@@ -1597,6 +1061,159 @@ async def update_order_on_checked(order_id: int, checked: bool):
             logger.info(f"注文更新成功: order_id {order_id}")
             logger.debug(f"update_order_on_checked() - SQL: {stmt}")
 
+
+# 更新（チェックフラグ・一括）
+# checked の値ごとに1文で更新する（1,000件でも最大2文。日別集計のため、変更前の行の取得と集計の upsert が1文ずつ加わる）
+# UPDATE "Orders" SET checked = :b_checked, updated_at = :b_updated_at
+#  WHERE order_id IN (:order_ids) RETURNING order_id, shop_name
+_update_orders_checked_stmt = (
+    update(Order)
+    .where(Order.order_id.in_(bindparam("order_ids", expanding=True)))
+    .values(
+        checked=bindparam("b_checked", type_=Integer),
+        updated_at=bindparam("b_updated_at", type_=DateTime)
+    )
+    .returning(Order.order_id, Order.shop_name)
+    .execution_options(synchronize_session=False)
+)
+
+# 日別集計のチェック数の差分用に、変更前の行を取得する（更新が終わるまで行をロックする）
+_lock_orders_for_rollup_stmt = (
+    select(Order.order_id, *ROLLUP_SOURCE_COLUMNS)
+    .where(Order.order_id.in_(bindparam("order_ids", expanding=True)))
+    .with_for_update()
+)
+
+async def _checked_rollup_deltas(session, order_ids: List[int]):
+    """変更前の行を取得し、{order_id: 変更後の checked} から日別集計の差分を作る関数を返す"""
+    before = {row.order_id: row for row in await session.execute(_lock_orders_for_rollup_stmt, {"order_ids": order_ids})}
+
+    def deltas_for(committed: Dict[int, bool]) -> RollupDeltas:
+        deltas = RollupDeltas()
+        for order_id, checked in committed.items():
+            row = before.get(order_id)
+            if row is not None and bool(row.checked) != bool(checked):
+                deltas.change(row, checked=checked)
+        return deltas
+
+    return deltas_for
+
+def group_order_ids_by_checked(updates: List[Dict[str, Any]]) -> Dict[bool, List[int]]:
+    """
+    [{"order_id": 1, "checked": True}, ...] を {True: [1, ...], False: [...]} にまとめる。
+    同じ order_id が複数あれば後のものを優先する（1件ずつ更新していた頃と同じ結果）。
+    """
+    checked_by_id = {int(u["order_id"]): bool(u["checked"]) for u in updates}
+    grouped: Dict[bool, List[int]] = {}
+    for order_id, checked in checked_by_id.items():
+        grouped.setdefault(checked, []).append(order_id)
+    return grouped
+
+@log_decorator
+async def update_orders_checked(updates: List[Dict[str, Any]]) -> Tuple[List[int], List[int]]:
+    """
+    複数注文の checked フラグと updated_at を一括更新する。
+    (更新できた order_id, 失敗した order_id) を返す。
+    存在しない order_id は失敗に含める。checked の値ごとに SAVEPOINT を切るため、
+    片方の文が失敗しても、もう片方の更新は確定する。
+    """
+    updated: List[int] = []
+    failed: List[int] = []
+    events: List[Tuple[str, int, bool]] = []
+    updated_time = get_naive_jst_now()
+
+    async with AsyncSessionLocal() as session:
+        for checked, order_ids in group_order_ids_by_checked(updates).items():
+            try:
+                async with session.begin_nested():
+                    deltas_for = await _checked_rollup_deltas(session, order_ids)
+                    result = await session.execute(
+                        _update_orders_checked_stmt,
+                        {"order_ids": order_ids, "b_checked": int(checked), "b_updated_at": updated_time}
+                    )
+                    done = dict(result.all())
+                    await apply_rollup_deltas(session, deltas_for({oid: checked for oid in done}))
+
+            except (IntegrityError, OperationalError, DatabaseError) as e:
+                logger.error(f"注文の一括更新失敗 checked={checked} order_ids={order_ids}: {e}")
+                failed.extend(order_ids)
+            except Exception as e:
+                logger.error(f"注文の一括更新で予期せぬエラー checked={checked} order_ids={order_ids}: {e}")
+                failed.extend(order_ids)
+            else:
+                updated.extend(oid for oid in order_ids if oid in done)
+                events.extend((done[oid], oid, checked) for oid in order_ids if oid in done)
+                missing = [oid for oid in order_ids if oid not in done]
+                if missing:
+                    logger.warning(f"注文更新失敗: order_id {missing} の注文が見つかりませんでした。")
+                    failed.extend(missing)
+
+        await session.commit()
+
+    for shop_name, order_id, checked in events:
+        publish_order_event(shop_name, "order_checked", {"order_id": order_id, "checked": checked})
+    logger.info(f"update_orders_checked() - 更新: {len(updated)}件, 失敗: {failed}")
+    return updated, failed
+
+
+# 更新（チェックフラグ・店舗ごとにまとめた最新状態）
+# チェックの WebSocket（utils.check_coalescer）が数百ミリ秒ごとに呼ぶ。checked の値によらず1文で更新する
+# UPDATE "Orders" SET checked = CASE WHEN order_id IN (:checked_ids) THEN 1 ELSE 0 END, updated_at = :b_updated_at
+#  WHERE order_id IN (:order_ids) AND shop_name = :b_shop_name RETURNING order_id, checked
+_set_orders_checked_stmt = (
+    update(Order)
+    .where(
+        Order.order_id.in_(bindparam("order_ids", expanding=True)),
+        Order.shop_name == bindparam("b_shop_name", type_=String)
+    )
+    .values(
+        checked=case((Order.order_id.in_(bindparam("checked_ids", expanding=True)), 1), else_=0),
+        updated_at=bindparam("b_updated_at", type_=DateTime)
+    )
+    .returning(Order.order_id, Order.checked)
+    .execution_options(synchronize_session=False)
+)
+
+@log_decorator
+async def set_orders_checked(shop_name: str, checked_by_id: Dict[int, bool]) -> Optional[Dict[int, bool]]:
+    """
+    shop_name の注文の checked を {order_id: checked} の状態にする（1文・1トランザクション）。
+    コミットした {order_id: checked} を返す。他店舗の注文・存在しない order_id は含まれない。
+    失敗した場合は None を返す。
+    """
+    if not checked_by_id:
+        return {}
+
+    try:
+        async with AsyncSessionLocal() as session:
+            deltas_for = await _checked_rollup_deltas(session, list(checked_by_id))
+            result = await session.execute(
+                _set_orders_checked_stmt,
+                {
+                    "order_ids": list(checked_by_id),
+                    "checked_ids": [oid for oid, checked in checked_by_id.items() if checked],
+                    "b_shop_name": shop_name,
+                    "b_updated_at": get_naive_jst_now(),
+                }
+            )
+            committed = {order_id: bool(checked) for order_id, checked in result.all()}
+            await apply_rollup_deltas(session, deltas_for(committed))
+            await session.commit()
+
+    except (IntegrityError, OperationalError, DatabaseError) as e:
+        await session.rollback()
+        logger.error(f"set_orders_checked() - shop_name: {shop_name}, order_ids: {list(checked_by_id)}: {e}")
+        return None
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"set_orders_checked() - Unexpected error: {e}")
+        return None
+    else:
+        for order_id, checked in committed.items():
+            publish_order_event(shop_name, "order_checked", {"order_id": order_id, "checked": checked})
+        logger.info(f"set_orders_checked() - shop_name: {shop_name}, 更新: {len(committed)}件 / {len(checked_by_id)}件")
+        return committed
+
 '''-------------------------------------------------------------'''
 from sqlalchemy import delete
 
@@ -1609,12 +1226,14 @@ async def delete_order(order_id: int) -> bool:
     """
     try:
         async with AsyncSessionLocal() as session:
-            stmt = delete(Order).where(Order.order_id == order_id)
+            stmt = delete(Order).where(Order.order_id == order_id).returning(*ROLLUP_SOURCE_COLUMNS)
             logger.debug(f"{stmt=}")
-            result = await session.execute(stmt)
+            deleted = (await session.execute(stmt)).first()
+            if deleted is not None:
+                await apply_rollup_deltas(session, RollupDeltas().add_order(deleted, -1))
             await session.commit()
 
-            if result.rowcount == 0:
+            if deleted is None:
                 logger.warning(f"Order with order_id {order_id} not found.")
                 return False
 
@@ -1637,6 +1256,7 @@ async def delete_order(order_id: int) -> bool:
         logger.error(f"Unexpected error: {e}")
         logger.error(f"{stmt=}")
     else:
+        today_order_index.discard(order_id)
         logger.info(f"Order with order_id {order_id} deleted successfully.")
         return True
 
@@ -1668,6 +1288,7 @@ async def delete_all_orders():
         logger.error(f"Unexpected error: {e}")
         logger.error(f"{stmt=}")
     else:
+        today_order_index.invalidate()
         logger.info("All orders deleted successfully.")
         log_order(
             "ORDER",
@@ -1689,40 +1310,59 @@ def get_datetime_range_for_date(target_date: date) -> Tuple[datetime, datetime]:
     return start_datetime, end_datetime
 
 
-# 概要出力：本日の注文件数を返す
+# 概要出力：期間の注文件数を返す
+# 店舗・会社・全体は日別集計（daily_order_rollup）から読む。一般ユーザーは集計のキーにないため Orders から数える
 from typing import Dict
+from models.order_rollup import select_rollup_summary
+
+def _as_date(value) -> date:
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
 @log_decorator
 async def select_order_summary(conditions: Dict) -> Dict:
     """
-    今日の注文合計数を返す。
-    条件に基づいて user_id, company_id, shop_id, is_admin で絞り込み。
+    begin_date ~ end_date の注文の概要（total_orders: キャンセルを含む注文数 ほか）を返す。
+    条件に基づいて username, company_id, shop_name で絞り込む（is_admin は全件）。
     """
     try:
-        async with AsyncSessionLocal() as session:
-            # 基本クエリ：注文件数をカウント
-            stmt = select(func.count()).select_from(Order)
-
-            # 日付範囲絞り込み
-            begin_date = conditions.get("begin_date")
-            end_date = conditions.get("end_date")
-            if begin_date and end_date:
-                stmt = stmt.where(Order.created_at.between(f"{begin_date} 00:00:00", f"{end_date} 23:59:59"))
-
-            # 各種条件追加
-            if conditions.get("user_id"):
-                stmt = stmt.where(Order.username == conditions["user_id"])
-            if conditions.get("company_id"):
-                stmt = stmt.where(Order.company_id == conditions["company_id"])
-            if conditions.get("shop_id"):
-                stmt = stmt.where(Order.shop_name == conditions["shop_id"])
-            # is_admin は全件なので条件追加なし
-
-            logger.debug(f"Order Summary SQL: {stmt}")
+        today = get_naive_jst_now().date()
+        begin_date = _as_date(conditions.get("begin_date") or today)
+        end_date = _as_date(conditions.get("end_date") or begin_date)
+
+        username = conditions.get("username")
+        if not username:
+            return await select_rollup_summary(
+                begin_date, end_date,
+                shop_name=conditions.get("shop_name"),
+                company_id=conditions.get("company_id")
+            )
 
-            result = await session.execute(stmt)
-            total_orders = result.scalar() or 0
+        start_dt, _ = get_datetime_range_for_date(begin_date)
+        _, end_dt = get_datetime_range_for_date(end_date)
+        canceled = Order.canceled.is_(True)
+        stmt = (
+            select(
+                func.count(),
+                func.coalesce(func.sum(case((canceled, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((func.coalesce(Order.checked, 0) != 0, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((canceled, 0), else_=func.coalesce(Order.amount, 0))), 0),
+            )
+            .where(Order.username == username, Order.created_at.between(start_dt, end_dt))
+        )
+        if conditions.get("company_id"):
+            stmt = stmt.where(Order.company_id == conditions["company_id"])
+        logger.debug(f"Order Summary SQL: {stmt}")
 
-            return {"total_orders": total_orders}
+        async with AsyncSessionLocal() as session:
+            total, canceled_count, checked_count, amount = (await session.execute(stmt)).one()
+
+        return {
+            "total_orders": int(total),
+            "canceled_orders": int(canceled_count),
+            "active_orders": int(total - canceled_count),
+            "checked_orders": int(checked_count),
+            "total_amount": int(amount),
+        }
 
     except Exception as e:
         logger.exception(f"select_order_summary error: {e}")
@@ -1731,26 +1371,226 @@ async def select_order_summary(conditions: Dict) -> Dict:
 '''-------------------------------------------------------------'''
 # 注文キャンセル
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from datetime import datetime
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import any_
 from typing import List
+from log_unified import log_order_batch
+
+# 1文で更新する（id の件数によらず同じ SQL になるので、プリペアドステートメントが使い回される）
+# UPDATE "Orders" SET canceled = true, updated_at = :b_updated_at
+#  WHERE order_id = ANY(:order_ids) AND username = :b_username AND canceled IS NOT true
+#  RETURNING order_id, created_at, shop_name, company_id, menu_id, amount, canceled, checked
+_cancel_orders_stmt = (
+    update(Order)
+    .where(
+        Order.order_id == any_(bindparam("order_ids", type_=ARRAY(Integer))),
+        Order.username == bindparam("b_username", type_=String),
+        Order.canceled.isnot(True)
+    )
+    .values(canceled=True, updated_at=bindparam("b_updated_at", type_=DateTime))
+    .returning(Order.order_id, *ROLLUP_SOURCE_COLUMNS)
+    .execution_options(synchronize_session=False)
+)
 
 @log_decorator
 async def cancel_orders(order_ids: List[int], username: str, session: AsyncSession):
+    """
+    username の注文のうち、order_ids に含まれ、まだキャンセルされていないものをキャンセルする。
+    キャンセルした order_id のリストを order_ids の順で返す（該当がなければ []）。
+    """
+    if not order_ids:
+        return []
+
+    result = await session.execute(
+        _cancel_orders_stmt,
+        {"order_ids": list(order_ids), "b_username": username, "b_updated_at": get_naive_jst_now()}
+    )
+    updated = {row.order_id: row for row in result.all()}
+    # 取消前はキャンセルされていない行（WHERE canceled IS NOT true）なので、キャンセル数・数量を足すだけ
+    deltas = RollupDeltas()
+    for row in updated.values():
+        deltas.add_order(row, -1, canceled=False).add_order(row)
+    await apply_rollup_deltas(session, deltas)
+    await session.commit()
+
+    canceled = [oid for oid in dict.fromkeys(order_ids) if oid in updated]
+    for oid in canceled:
+        today_order_index.discard(oid)
+        publish_order_event(updated[oid].shop_name, "order_canceled", {"order_id": oid, "canceled": True})
+    ORDERS_CANCELED.inc(len(canceled))
+
+    logger.info(f"cancel_orders() - username: {username}, 対象: {order_ids}, キャンセル: {canceled}")
+    log_order_batch(
+        "CANCEL",
+        [f"注文取消 - order_id: {oid} - username: {username}" for oid in canceled]
+    )
+    return canceled
+
+'''-------------------------------------------------------------'''
+# 本日の注文インデックス（二重注文チェック用）
+# 一般ユーザーは / と /login のたびに二重注文チェックが走るため、
+# 当日（JST）に有効な注文を持つユーザーをメモリ上に持ち、DB へ問い合わせずに判定する。
+# 注文を書き換える関数（insert_order / cancel_orders / update_order の canceled / delete_*）は必ずこれを更新すること。
+# 備考：uvicorn 1ワーカー（1プロセス）前提。複数ワーカーにする場合は共有ストアに置き換える。
+import asyncio
+from typing import Iterable, Set
+
+class TodayOrderIndex:
+    """
+    day（JST の日付）に作成された、キャンセルされていない注文の索引。
+    username -> order_id の集合 と order_id -> username を持つ。
+    ウォーム中（DB 読み込み中）の追加・削除は記録しておき、読み込み完了時に反映する。
+    """
+
+    def __init__(self):
+        self.day: Optional[date] = None
+        self._orders_by_user: Dict[str, Set[int]] = {}
+        self._user_by_order: Dict[int, str] = {}
+        self._pending: Optional[List[Tuple[str, int, Optional[str], Optional[date]]]] = None
+
+    def is_current(self, day: date) -> bool:
+        return self.day == day
+
+    def begin_warm(self) -> None:
+        self._pending = []
+
+    def reset(self, day: date, rows: Iterable[Tuple[int, str]]) -> None:
+        """day の注文 (order_id, username) で索引を作り直す"""
+        pending, self._pending = self._pending or [], None
+        self.day = day
+        self._orders_by_user = {}
+        self._user_by_order = {}
+        for order_id, username in rows:
+            self._add(order_id, username)
+        for op, order_id, username, created_on in pending:
+            if op == "add":
+                if created_on == day:
+                    self._add(order_id, username)
+            else:
+                self._discard(order_id)
+
+    def invalidate(self) -> None:
+        """次回の判定で DB から読み直させる"""
+        self.day = None
+        self._pending = None
+
+    def add(self, order_id: int, username: str, created_at: datetime) -> None:
+        if self._pending is not None:
+            self._pending.append(("add", order_id, username, created_at.date()))
+        elif self.day is not None and created_at.date() == self.day:
+            self._add(order_id, username)
+
+    def discard(self, order_id: int) -> None:
+        if self._pending is not None:
+            self._pending.append(("discard", order_id, None, None))
+        self._discard(order_id)
 
-    canceled = []
+    def has_user(self, username: str) -> bool:
+        return username in self._orders_by_user
 
-    for oid in order_ids:
-        result = await session.execute(
-            select(Order).where(Order.order_id == oid, Order.username == username)
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "day": self.day.isoformat() if self.day else None,
+            "users": len(self._orders_by_user),
+            "orders": len(self._user_by_order),
+        }
+
+    def _add(self, order_id: int, username: str) -> None:
+        self._orders_by_user.setdefault(username, set()).add(order_id)
+        self._user_by_order[order_id] = username
+
+    def _discard(self, order_id: int) -> None:
+        username = self._user_by_order.pop(order_id, None)
+        if username is None:
+            return
+        order_ids = self._orders_by_user.get(username)
+        if order_ids is not None:
+            order_ids.discard(order_id)
+            if not order_ids:
+                del self._orders_by_user[username]
+
+
+today_order_index = TodayOrderIndex()
+
+# ウォームは1つずつ行う。
+# 重なると、後のウォームの begin_warm() が先のウォーム中の記録（_pending）を捨て、
+# 最後に reset() したウォームの古い読み込み結果で、その間の注文が索引から消えてしまう。
+_today_order_index_warm_lock = asyncio.Lock()
+
+
+@log_decorator
+async def warm_today_order_index(target_date: Optional[date] = None) -> int:
+    """
+    target_date（省略時は本日 JST）の有効な注文を DB から読み込み、索引を作り直す。
+    読み込んだ注文件数を返す。失敗時は索引を無効化して -1 を返す。
+    実行中のウォームがあれば、それが終わってから読み込む。
+    """
+    async with _today_order_index_warm_lock:
+        return await _warm_today_order_index(target_date)
+
+
+async def _warm_today_order_index(target_date: Optional[date] = None) -> int:
+    """warm_today_order_index() の本体。_today_order_index_warm_lock を取ってから呼ぶこと"""
+    target_date = target_date or get_naive_jst_now().date()
+    start_dt, end_dt = get_datetime_range_for_date(target_date)
+    stmt = (
+        select(Order.order_id, Order.username)
+        .where(
+            Order.created_at >= start_dt,
+            Order.created_at <= end_dt,
+            Order.canceled.isnot(True)
         )
-        order = result.scalar_one_or_none()
-        print(f"cancel_orders() - order: {order}, order_id: {oid}, username: {username}")
-        if order and not order.canceled:
-            order.canceled = True
-            order.updated_at = datetime.now()
-            canceled.append(oid)
+    )
+    today_order_index.begin_warm()
+    try:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(stmt)
+            rows = result.all()
+
+    except (OperationalError, DatabaseError) as e:
+        today_order_index.invalidate()
+        logger.error(f"warm_today_order_index() - SQL実行中にエラーが発生しました: {e}")
+        return -1
+    except Exception as e:
+        today_order_index.invalidate()
+        logger.error(f"warm_today_order_index() - Unexpected error: {e}")
+        return -1
+    else:
+        today_order_index.reset(target_date, rows)
+        logger.info(f"本日の注文インデックスを更新しました - {today_order_index.stats()}")
+        return len(rows)
+
+
+@log_decorator
+async def has_ordered_today(username: str) -> bool:
+    """
+    username が本日（JST）キャンセルされていない注文を持つかを返す。
+    索引が本日分でなければ（起動直後・日付変更直後など）読み込み直してから判定する。
+    """
+    today = get_naive_jst_now().date()
+    if not today_order_index.is_current(today):
+        async with _today_order_index_warm_lock:
+            # 待っている間に、他のログインや 0 時の更新が読み込み終えていれば、読み込み直さない
+            warmed = 0 if today_order_index.is_current(today) else await _warm_today_order_index(today)
+        if warmed < 0:
+            # 索引が作れない場合は従来どおり DB で判定する
+            start_dt, end_dt = get_datetime_range_for_date(today)
+            orders = await select_orders(OrderFilter("user", username, start_dt, end_dt, canceled=False))
+            return bool(orders)
+
+    return today_order_index.has_user(username)
 
-    await session.commit()
-    return canceled
 
+def get_today_order_index_stats() -> Dict[str, Any]:
+    return today_order_index.stats()
+
+
+async def run_today_order_index_refresher() -> None:
+    """
+    JST の 0 時ごとに本日の注文インデックスを読み込み直す（lifespan でタスクとして起動する）。
+    """
+    while True:
+        now = get_naive_jst_now()
+        next_midnight = datetime.combine(now.date() + timedelta(days=1), time.min)
+        await asyncio.sleep((next_midnight - now).total_seconds() + 1)
+        await warm_today_order_index()
@@ -0,0 +1,272 @@
+# models/order_rollup.py
+'''
+    日別の注文集計（daily_order_rollup）
+    1. class DailyOrderRollup(Base):
+    2. create_daily_order_rollup_table():
+
+    # 注文の書き込みと同じトランザクションで差分を反映する（models.order から呼ぶ）
+    3. class RollupDeltas:
+    4. apply_rollup_deltas(session: AsyncSession, deltas: RollupDeltas) -> int:
+
+    5. select_rollup_summary(begin_date: date, end_date: date, shop_name: Optional[str] = None, company_id: Optional[int] = None) -> Dict[str, int]:
+    6. rebuild_daily_order_rollup(begin_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+'''
+# 注文概要（FAX送信用）は、呼ばれるたびに Orders を count(*) していた。
+# (注文日, 店舗, 会社, メニュー) ごとの件数・数量を持ち、注文の登録・キャンセル・チェック・削除と同じトランザクションで増減させる。
+# 注文日は created_at（JST のナイーブな日時）の日付。company_id / menu_id が NULL の注文は 0 として数える。
+# 既存のデータ・ずれた場合は rebuild_daily_order_rollup()（python rebuild_daily_order_rollup.py）で作り直す。
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, Date, DateTime, Index, Integer, String, bindparam, case, delete, func, literal_column, select
+from sqlalchemy.exc import DatabaseError, IntegrityError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.local_postgresql_database import Base, engine, AsyncSessionLocal
+from log_unified import logger
+from utils.decorator import log_decorator
+
+
+class DailyOrderRollup(Base):
+    __tablename__ = "daily_order_rollup"
+
+    order_date = Column(Date, primary_key=True)
+    shop_name = Column(String, primary_key=True)
+    company_id = Column(Integer, primary_key=True)
+    menu_id = Column(Integer, primary_key=True)
+    ordered_count = Column(Integer, nullable=False, default=0)    # 注文数（キャンセルを含む）
+    ordered_amount = Column(Integer, nullable=False, default=0)   # 注文の数量（amount）の合計
+    canceled_count = Column(Integer, nullable=False, default=0)
+    canceled_amount = Column(Integer, nullable=False, default=0)
+    checked_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
+    # 主キーは注文日が先頭（管理者の全体集計）。店舗・会社の集計用（alembic: 9d41c2a7e6b8）
+    __table_args__ = (
+        Index("ix_daily_order_rollup_shop_name_order_date", "shop_name", "order_date"),
+        Index("ix_daily_order_rollup_company_id_order_date", "company_id", "order_date"),
+    )
+
+'''-------------------------------------------------------------'''
+# 作成
+@log_decorator
+async def create_daily_order_rollup_table():
+    """
+    daily_order_rollupテーブルを作成する（存在しなければ作成）
+    """
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(DailyOrderRollup.__table__.create, checkfirst=True)
+
+    except DatabaseError as e:
+        logger.error(f"SQL実行中にエラーが発生しました: {e}")
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+    else:
+        logger.info("daily_order_rollupテーブルの作成に成功しました（既に存在する場合は作成されません）。")
+
+'''-------------------------------------------------------------'''
+# 差分の反映
+# キーごとに (注文数, 数量, キャンセル数, キャンセル数量, チェック数) の増減をまとめ、1文（executemany）で upsert する。
+RollupKey = Tuple[date, str, int, int]
+ROLLUP_COUNTERS = ("ordered_count", "ordered_amount", "canceled_count", "canceled_amount", "checked_count")
+
+
+def rollup_key(created_at: datetime, shop_name: Optional[str], company_id: Optional[int], menu_id: Optional[int]) -> RollupKey:
+    return (created_at.date(), shop_name or "", company_id or 0, menu_id or 0)
+
+
+class RollupDeltas:
+    """
+    注文の行（created_at, shop_name, company_id, menu_id, amount, canceled, checked を持つもの）の
+    追加・削除を、集計キーごとの増減にまとめる。行の変更は add_order(変更前, -1) と add_order(変更後, +1)。
+    行（SQLAlchemy の Row）は書き換えられないため、変更した列はキーワード引数で渡す。
+    """
+
+    def __init__(self):
+        self._deltas: Dict[RollupKey, List[int]] = {}
+
+    def __bool__(self) -> bool:
+        return any(any(values) for values in self._deltas.values())
+
+    def add_order(self, order, sign: int = 1, **values) -> "RollupDeltas":
+        """order の各列を values で置き換えた行として数える（例：add_order(row, -1, canceled=False)）"""
+        get = lambda name: values[name] if name in values else getattr(order, name)
+        created_at = get("created_at")
+        if created_at is None:
+            return self
+        amount = get("amount") or 0
+        canceled = 1 if get("canceled") else 0
+        counters = self._deltas.setdefault(
+            rollup_key(created_at, get("shop_name"), get("company_id"), get("menu_id")), [0, 0, 0, 0, 0]
+        )
+        counters[0] += sign
+        counters[1] += sign * amount
+        counters[2] += sign * canceled
+        counters[3] += sign * canceled * amount
+        counters[4] += sign * (1 if get("checked") else 0)
+        return self
+
+    def change(self, before, after=None, **values) -> "RollupDeltas":
+        """before → after の変更。after を省略したときは before の列を values で置き換えたもの"""
+        if after is None:
+            return self.add_order(before, -1).add_order(before, **values)
+        return self.add_order(before, -1).add_order(after)
+
+    def rows(self, updated_at: datetime) -> List[dict]:
+        return [
+            {
+                "b_order_date": key[0], "b_shop_name": key[1], "b_company_id": key[2], "b_menu_id": key[3],
+                **{f"b_{name}": value for name, value in zip(ROLLUP_COUNTERS, values)},
+                "b_updated_at": updated_at,
+            }
+            for key, values in self._deltas.items() if any(values)
+        ]
+
+
+# INSERT INTO daily_order_rollup (...) VALUES (...)
+#  ON CONFLICT (order_date, shop_name, company_id, menu_id)
+#  DO UPDATE SET ordered_count = daily_order_rollup.ordered_count + excluded.ordered_count, ...
+# PostgreSQL / SQLite とも ON CONFLICT を持つ。方言ごとに1度だけ組み立てる
+_upsert_stmts: Dict[str, object] = {}
+
+def _rollup_upsert_stmt(dialect_name: str):
+    stmt = _upsert_stmts.get(dialect_name)
+    if stmt is not None:
+        return stmt
+
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    table = DailyOrderRollup.__table__
+    values = {
+        "order_date": bindparam("b_order_date", type_=Date),
+        "shop_name": bindparam("b_shop_name", type_=String),
+        "company_id": bindparam("b_company_id", type_=Integer),
+        "menu_id": bindparam("b_menu_id", type_=Integer),
+        **{name: bindparam(f"b_{name}", type_=Integer) for name in ROLLUP_COUNTERS},
+        "updated_at": bindparam("b_updated_at", type_=DateTime),
+    }
+    stmt = insert(table).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.order_date, table.c.shop_name, table.c.company_id, table.c.menu_id],
+        set_={
+            **{name: table.c[name] + stmt.excluded[name] for name in ROLLUP_COUNTERS},
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    _upsert_stmts[dialect_name] = stmt
+    return stmt
+
+
+async def apply_rollup_deltas(session: AsyncSession, deltas: RollupDeltas) -> int:
+    """
+    session（呼び出し側のトランザクション）で差分を反映する。コミットは呼び出し側で行う。
+    反映したキーの数を返す。
+    """
+    from utils.date_utils import get_naive_jst_now
+
+    rows = deltas.rows(get_naive_jst_now())
+    if not rows:
+        return 0
+    stmt = _rollup_upsert_stmt(session.get_bind().dialect.name)
+    await session.execute(stmt, rows)
+    return len(rows)
+
+'''-------------------------------------------------------------'''
+# 集計の取得
+@log_decorator
+async def select_rollup_summary(
+    begin_date: date,
+    end_date: date,
+    shop_name: Optional[str] = None,
+    company_id: Optional[int] = None
+) -> Dict[str, int]:
+    """
+    begin_date ~ end_date（両端を含む）の合計を返す。
+    total_orders はキャンセルを含む注文数（従来の select_order_summary と同じ）。
+    """
+    rollup = DailyOrderRollup
+    stmt = select(*(func.coalesce(func.sum(getattr(rollup, name)), 0) for name in ROLLUP_COUNTERS)).where(
+        rollup.order_date >= begin_date, rollup.order_date <= end_date
+    )
+    if shop_name is not None:
+        stmt = stmt.where(rollup.shop_name == shop_name)
+    if company_id is not None:
+        stmt = stmt.where(rollup.company_id == company_id)
+
+    async with AsyncSessionLocal() as session:
+        ordered, amount, canceled, canceled_amount, checked = (await session.execute(stmt)).one()
+
+    return {
+        "total_orders": int(ordered),
+        "canceled_orders": int(canceled),
+        "active_orders": int(ordered - canceled),
+        "checked_orders": int(checked),
+        "total_amount": int(amount - canceled_amount),  # キャンセル分を除いた数量
+    }
+
+'''-------------------------------------------------------------'''
+# 作り直し（初回の移行・ずれの修正）
+@log_decorator
+async def rebuild_daily_order_rollup(begin_date: Optional[date] = None, end_date: Optional[date] = None) -> int:
+    """
+    begin_date ~ end_date（省略時は全期間）の集計を Orders から作り直す（1トランザクション）。
+    INSERT ... SELECT ... GROUP BY で DB 内で集計する。作り直したキーの数を返す。失敗時は -1。
+    """
+    from models.order import Order
+    from utils.date_utils import get_naive_jst_now
+
+    rollup = DailyOrderRollup.__table__
+    # GROUP BY の式にバインドパラメータを含めない（SELECT 側と別のパラメータになり、PostgreSQL で一致しなくなる）
+    zero = literal_column("0")
+    order_date = func.date(Order.created_at)
+    company_id = func.coalesce(Order.company_id, zero)
+    menu_id = func.coalesce(Order.menu_id, zero)
+    shop_name = func.coalesce(Order.shop_name, literal_column("''"))
+    amount = func.coalesce(Order.amount, zero)
+    canceled = Order.canceled.is_(True)
+
+    grouped = (
+        select(
+            order_date, shop_name, company_id, menu_id,
+            func.count(),
+            func.sum(amount),
+            func.sum(case((canceled, literal_column("1")), else_=zero)),
+            func.sum(case((canceled, amount), else_=zero)),
+            func.sum(case((func.coalesce(Order.checked, zero) != zero, literal_column("1")), else_=zero)),
+            bindparam("b_updated_at", type_=DateTime),
+        )
+        .where(Order.created_at.isnot(None))
+        .group_by(order_date, shop_name, company_id, menu_id)
+    )
+    clear = delete(rollup)
+    if begin_date is not None:
+        grouped = grouped.where(Order.created_at >= datetime.combine(begin_date, datetime.min.time()))
+        clear = clear.where(rollup.c.order_date >= begin_date)
+    if end_date is not None:
+        grouped = grouped.where(Order.created_at < datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        clear = clear.where(rollup.c.order_date <= end_date)
+
+    insert_stmt = rollup.insert().from_select(
+        ["order_date", "shop_name", "company_id", "menu_id", *ROLLUP_COUNTERS, "updated_at"], grouped
+    )
+
+    try:
+        async with AsyncSessionLocal() as session:
+            await session.execute(clear)
+            result = await session.execute(insert_stmt, {"b_updated_at": get_naive_jst_now()})
+            await session.commit()
+
+    except (IntegrityError, OperationalError, DatabaseError) as e:
+        await session.rollback()
+        logger.error(f"rebuild_daily_order_rollup() - SQL実行中にエラーが発生しました: {e}")
+        return -1
+    except Exception as e:
+        await session.rollback()
+        logger.error(f"rebuild_daily_order_rollup() - Unexpected error: {e}")
+        return -1
+    else:
+        logger.info(f"rebuild_daily_order_rollup() - {begin_date or '最初'} ~ {end_date or '最後'}: {result.rowcount}件")
+        return result.rowcount
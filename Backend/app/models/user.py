@@ -8,18 +8,28 @@
     5. select_all_user() -> Optional[list[UserModel]]:
 
     6. get_hashed_password(password: str)-> str:
-    7. update_existing_passwords():
-
-    8. insert_user(username: str, password: str, name: str, company_id: int, shop_name: str, menu_id: int)-> bool:
-    9. insert_new_user(username: str, password: str, name: str = '')-> bool:
-    10. insert_shop(username: str, password: str, shop_name: str) -> None:
-
-    11. update_user(username: str, key: str, value):
-    12. delete_user(username: str):
-    13. delete_all_user():
-    14. execute_with_retry(session, stmt, retries=3, delay=1):
-    15. get_user(username: str) -> Optional[UserResponse]:
-    16. register_or_get_user(username: str, password: str, name: str) -> UserResponse:
+    7. update_existing_passwords(request: Request = None):
+    8. rehash_plain_passwords(batch_size: int = PASSWORD_REHASH_BATCH_SIZE, workers: int = None) -> dict:
+    9. start_password_rehash(batch_size: int = PASSWORD_REHASH_BATCH_SIZE, workers: int = None) -> dict:
+    10. get_password_rehash_progress() -> dict:
+
+    11. insert_user(username: str, password: str, name: str, company_id: int, shop_name: str, menu_id: int)-> bool:
+    12. insert_new_user(username: str, password: str, name: str = '')-> bool:
+    13. insert_shop(username: str, password: str, shop_name: str) -> None:
+
+    14. update_user(username: str, key: str, value):
+    15. delete_user(username: str):
+    16. delete_all_user():
+    17. execute_with_retry(session, stmt, retries=3, delay=1):
+    18. get_user(username: str) -> Optional[UserResponse]:
+    19. register_or_get_user(username: str, password: str, name: str) -> UserResponse:
+
+    # ユーザーキャッシュ（username / user_id → UserResponse）
+    20. get_cached_user(username: str = None, user_id: int = None) -> Optional[UserResponse]:
+    21. cache_user(user: UserResponse) -> None:
+    22. invalidate_user_cache(username: str = None, user_id: int = None) -> None:
+    23. clear_user_cache() -> None:
+    24. get_user_cache_stats() -> dict:
 '''
 from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, inspect, select, func
 from database.local_postgresql_database import Base
@@ -87,12 +97,66 @@ async def create_user_table():
 from sqlalchemy import select
 from typing import Optional, List
 from schemas.user_schemas import UserResponse
+from utils.cache import TTLCache
+
+# ユーザーキャッシュ
+# 1リクエストの中で同じユーザーを何度も引くため、username と user_id の両方で保持する。
+# ユーザーを書き換える関数（insert_* / update_user / delete_user）は必ず invalidate_user_cache() を呼ぶこと。
+USER_CACHE_TTL_SECONDS = 60
+USER_CACHE_MAXSIZE = 1024
+
+user_cache_by_name = TTLCache("user_by_name", USER_CACHE_MAXSIZE, USER_CACHE_TTL_SECONDS)
+user_cache_by_id = TTLCache("user_by_id", USER_CACHE_MAXSIZE, USER_CACHE_TTL_SECONDS)
+
+
+def get_cached_user(username: str = None, user_id: int = None) -> Optional[UserResponse]:
+    """キャッシュ済みのユーザーを返す。呼び出し元で変更されてもよいようにコピーを返す"""
+    if username is not None:
+        user = user_cache_by_name.get(username)
+    else:
+        user = user_cache_by_id.get(user_id)
+    return user.model_copy() if user is not None else None
+
+
+def cache_user(user: UserResponse) -> None:
+    cached = user.model_copy()
+    user_cache_by_name.set(cached.username, cached)
+    user_cache_by_id.set(cached.user_id, cached)
+
+
+def invalidate_user_cache(username: str = None, user_id: int = None) -> None:
+    """指定ユーザーのキャッシュを username / user_id の両方から削除する"""
+    if username is not None:
+        user_cache_by_name.pop(username)
+        user_cache_by_id.pop_where(lambda user: user.username == username)
+    if user_id is not None:
+        user_cache_by_id.pop(user_id)
+        user_cache_by_name.pop_where(lambda user: user.user_id == user_id)
+
+
+def clear_user_cache() -> None:
+    user_cache_by_name.clear()
+    user_cache_by_id.clear()
+
+
+def get_user_cache_stats() -> dict:
+    return {
+        "by_username": user_cache_by_name.stats(),
+        "by_user_id": user_cache_by_id.stats(),
+    }
+
+
 # 選択
 
 @log_decorator
 async def select_user(username: str) -> Optional[UserResponse]:
     try:
         sanitized_username = username.strip()
+
+        cached_user = get_cached_user(username=sanitized_username)
+        if cached_user is not None:
+            return cached_user
+
         async with AsyncSessionLocal() as session:
             stmt = select(User).where(User.username == sanitized_username)
             logger.debug(f"select_user() - SQLAlchemyクエリ: {stmt}")
@@ -110,6 +174,7 @@ async def select_user(username: str) -> Optional[UserResponse]:
             user_model = UserResponse(**user_dict)
             logger.debug(f"user_model: {user_model}")
 
+            cache_user(user_model)
             return user_model
 
     except IntegrityError as e:
@@ -129,6 +194,10 @@ async def select_user(username: str) -> Optional[UserResponse]:
 @log_decorator
 async def select_user_by_id(user_id: int) -> Optional[UserResponse]:
     try:
+        cached_user = get_cached_user(user_id=user_id)
+        if cached_user is not None:
+            return cached_user
+
         async with AsyncSessionLocal() as session:
             stmt = select(User).where(User.user_id == user_id)
             logger.debug(f"select_user_by_id() - SQLAlchemyクエリ: {stmt}")
@@ -146,6 +215,7 @@ async def select_user_by_id(user_id: int) -> Optional[UserResponse]:
             user_model = UserResponse(**user_dict)
             logger.debug(f"user_model: {user_model}")
 
+            cache_user(user_model)
             return user_model
 
     except IntegrityError as e:
@@ -211,19 +281,24 @@ async def select_all_users() -> Optional[List[UserResponse]]:
         logger.error(f"Unexpected error: {e}")
 
 
-import bcrypt
 from fastapi import HTTPException, status
+# bcrypt はイベントループを止めないよう、専用のスレッドプールで実行する
+from utils.password_hasher import PasswordHashBusy, hash_password
 
 async def get_hashed_password(password: str) -> str:
     """パスワードをハッシュ化する（例外処理付き）"""
     try:
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password.encode(), salt)
-        new_hashed_password = hashed_password.decode()  # バイト列を文字列に変換
+        new_hashed_password = await hash_password(password)
 
         logger.info("パスワードのハッシュ化に成功しました")
         return new_hashed_password
 
+    except PasswordHashBusy as e:
+        logger.warning(f"get_hashed_password() - {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="混み合っています。しばらくしてから再度お試しください。"
+        )
     except (ValueError, TypeError, UnicodeDecodeError) as e:
         logger.exception(f"パスワードのハッシュ化中にエラー: {str(e)}")
         raise HTTPException(
@@ -239,55 +314,178 @@ async def get_hashed_password(password: str) -> str:
 
 
 from fastapi import Request
-from pprint import pprint
 """新規登録したユーザーのパスワードをハッシュ化"""
 @log_decorator
-async def update_existing_passwords(request: Request):
-
+async def update_existing_passwords(request: Request = None):
+    """
+    bcrypt でハッシュ化されていないパスワードをすべてハッシュ化する（完了まで待つ）。
+    init_database() の初期データ用。管理画面からは start_password_rehash() でバックグラウンド実行する。
+    """
     from utils.helper import redirect_login_success, redirect_error # これを設置して循環参照が起こるため関数内に移動した
-    users = await select_all_users()  # すべてのユーザーを取得する関数が必要
-    pprint(users)
-    # セッションオブジェクトを非同期コンテキストマネージャで取得
     try:
-        # async with get_db() as session:
-            # anextに変更した
-            # 非同期ジェネレーターからセッションを1回だけ取り出す
-            # get_db() は FastAPI依存注入用の「非同期ジェネレーター」で yield session しています。
-            # そのため async with では使用できず、手動で取り出すには anext() が必要です。
-            session_gen = get_db()
-            session = await anext(session_gen)
-
-            for user in users:
-                username = user.get_username()
-                print(f"username: {username}")
-
-                # 非同期セッションの場合、クエリの実行もawaitが必要となる
-                result = await session.execute(select(User).filter_by(username=username))
-                db_user = result.scalars().first()
-
-                if db_user is None:
-                    continue  # 該当ユーザーが存在しない場合はスキップ
-
-                password = db_user.password  # 直接属性にアクセス可能
-                print(f"password: {password}")
-
-                if not password.startswith("$2b$"):  # bcryptのハッシュでない場合
-                    """パスワードをハッシュ化する"""
-                    salt = bcrypt.gensalt()
-                    plain_password = user.get_password()
-                    #password = user['password']
-                    hashed_password = bcrypt.hashpw(plain_password.encode(), salt)
-                    new_hashed_password = hashed_password.decode()
-
-                    await update_user(
-                        user.username, "password", new_hashed_password)
-
-            message = f"ユーザー {user.username} のパスワードをハッシュ化しました"
-            return redirect_login_success(request, message)
+        progress = await rehash_plain_passwords()
+        if progress["state"] == "failed":
+            raise RuntimeError(progress["error"])
 
     except Exception as e:
         message = f"update_existing_passwords() - 予期せぬエラーが発生しました"
+        if request is None:
+            logger.error(f"{message}: {e}")
+            return None
         return await redirect_error(request, message, e)
+    else:
+        message = f"{progress['updated']} 件のパスワードをハッシュ化しました"
+        if request is None:
+            logger.info(f"update_existing_passwords() - {message}")
+            return progress
+        return redirect_login_success(request, message)
+
+
+'''-------------------------------------------------------------'''
+# パスワードの一括再ハッシュ
+# 以前は全ユーザーを1件ずつ SELECT → ループ上で bcrypt → update_user（別セッション）していたため、
+# 大量のユーザーを取り込んだ後は数分かかり、その間サーバーが止まっていた。
+# ここでは bcrypt 形式でない行だけを user_id 順に batch_size 件ずつ読み、
+# プロセスプールでハッシュ化して、1バッチ1回の UPDATE（executemany）で書き戻す。
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import and_, bindparam, or_
+from utils.password_hasher import hash_passwords
+
+PASSWORD_REHASH_BATCH_SIZE = 200
+# これ以下の件数ならプロセスを起動せず、ログイン用のスレッドプールでハッシュ化する（初期データ等）
+PASSWORD_REHASH_PROCESS_THRESHOLD = 20
+
+# 読み込んだ時点から変わっていない行だけを書き換える
+_rehash_update_stmt = (
+    User.__table__.update()
+    .where(and_(
+        User.__table__.c.user_id == bindparam("b_user_id"),
+        User.__table__.c.password == bindparam("b_old_password")
+    ))
+    .values(password=bindparam("b_password"))
+)
+
+def _needs_rehash():
+    return and_(User.password.isnot(None), User.password != "", ~User.password.like("$2b$%"))
+
+password_rehash_progress = {
+    "state": "idle",  # idle / running / done / failed
+    "total": 0,
+    "processed": 0,
+    "updated": 0,
+    "failed": 0,
+    "batches": 0,
+    "started_at": None,
+    "finished_at": None,
+    "error": None,
+}
+_password_rehash_task: Optional[asyncio.Task] = None
+
+def get_password_rehash_progress() -> dict:
+    progress = dict(password_rehash_progress)
+    if progress["total"]:
+        progress["percent"] = round(progress["processed"] * 100 / progress["total"], 1)
+    return progress
+
+
+async def _hash_batch(executor, passwords: List[str], workers: int) -> List[str]:
+    if executor is None:
+        return list(await asyncio.gather(*(hash_password(password) for password in passwords)))
+    # ワーカー数に分けて並列に計算する
+    loop = asyncio.get_running_loop()
+    size = max(1, -(-len(passwords) // workers))
+    chunks = [passwords[i:i + size] for i in range(0, len(passwords), size)]
+    results = await asyncio.gather(*(loop.run_in_executor(executor, hash_passwords, chunk) for chunk in chunks))
+    return [hashed for chunk in results for hashed in chunk]
+
+
+@log_decorator
+async def rehash_plain_passwords(batch_size: int = PASSWORD_REHASH_BATCH_SIZE, workers: Optional[int] = None) -> dict:
+    """
+    bcrypt 形式でないパスワードをハッシュ化して書き戻す。進捗は password_rehash_progress に入れる。
+    workers はハッシュ計算のプロセス数（省略時は CPU 数 - 1。ログイン処理の分を残す）。
+    """
+    from datetime import datetime
+    workers = workers or max(1, (os.cpu_count() or 1) - 1)
+    password_rehash_progress.update(
+        state="running", total=0, processed=0, updated=0, failed=0, batches=0,
+        started_at=datetime.now().isoformat(timespec="seconds"), finished_at=None, error=None
+    )
+
+    executor = None
+    try:
+        async with AsyncSessionLocal() as session:
+            total = (await session.execute(select(func.count()).select_from(User).where(_needs_rehash()))).scalar_one()
+        password_rehash_progress["total"] = total
+        if total > PASSWORD_REHASH_PROCESS_THRESHOLD:
+            # 実行中のイベントループや DB 接続を子プロセスに持ち込まないよう spawn で起動する
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+        last_user_id = 0
+        while True:
+            async with AsyncSessionLocal() as session:
+                rows = (await session.execute(
+                    select(User.user_id, User.password)
+                    .where(_needs_rehash(), User.user_id > last_user_id)
+                    .order_by(User.user_id)
+                    .limit(batch_size)
+                )).all()
+            if not rows:
+                break
+            last_user_id = rows[-1].user_id
+
+            hashed = await _hash_batch(executor, [row.password for row in rows], workers)
+            params = [
+                {"b_user_id": row.user_id, "b_old_password": row.password, "b_password": new_password}
+                for row, new_password in zip(rows, hashed)
+            ]
+            try:
+                async with AsyncSessionLocal() as session:
+                    result = await session.execute(_rehash_update_stmt, params)
+                    await session.commit()
+            except (IntegrityError, OperationalError, DatabaseError) as e:
+                logger.error(f"rehash_plain_passwords() - 書き戻しに失敗しました user_id {rows[0].user_id}～{last_user_id}: {e}")
+                password_rehash_progress["failed"] += len(rows)
+            else:
+                # executemany の rowcount を返さないドライバーもあるので、その場合は送った件数とする
+                updated = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(rows)
+                password_rehash_progress["updated"] += updated
+                # 1件ずつ消すとキャッシュ全体を何度も走査するため、バッチごとにまとめて消す
+                clear_user_cache()
+
+            password_rehash_progress["processed"] += len(rows)
+            password_rehash_progress["batches"] += 1
+            logger.info(
+                f"rehash_plain_passwords() - {password_rehash_progress['processed']}/{total} 件"
+                f"（更新 {password_rehash_progress['updated']}・失敗 {password_rehash_progress['failed']}）"
+            )
+
+    except Exception as e:
+        logger.exception(f"rehash_plain_passwords() - 予期せぬエラーが発生しました: {e}")
+        password_rehash_progress.update(state="failed", error=str(e))
+    else:
+        password_rehash_progress["state"] = "done"
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        password_rehash_progress["finished_at"] = datetime.now().isoformat(timespec="seconds")
+
+    return get_password_rehash_progress()
+
+
+def start_password_rehash(batch_size: int = PASSWORD_REHASH_BATCH_SIZE, workers: Optional[int] = None) -> dict:
+    """
+    rehash_plain_passwords() をバックグラウンドのタスクとして開始する（リクエストの処理とは切り離す）。
+    実行中なら何もせず、現在の進捗を返す。
+    """
+    global _password_rehash_task
+    if _password_rehash_task is None or _password_rehash_task.done():
+        _password_rehash_task = asyncio.create_task(rehash_plain_passwords(batch_size, workers))
+        password_rehash_progress["state"] = "running"
+    return get_password_rehash_progress()
 
 
 # 追加
@@ -345,6 +543,7 @@ async def insert_user(
             await session.rollback()
             logger.exception(f"Unexpected error: {e}")
         else:
+            invalidate_user_cache(username=username)
             logger.debug(f"insert_user() - ユーザー挿入: company_id: {company_id}, shop_name: {shop_name}, menu_id: {menu_id}")
             logger.info(f"ユーザー {username} の追加に成功しました。")
 
@@ -422,6 +621,7 @@ async def insert_new_user(username: str, password: str, name: str = '') -> None:
             detail="予期せぬエラーが発生しました。"
         )
     else:
+        invalidate_user_cache(username=username)
         logger.info(f"ユーザー {username} の追加に成功しました。")
         logger.debug(
             f"insert_new_user() - 挿入実行: username: {username}, name: {name}, "
@@ -485,6 +685,7 @@ async def insert_shop(
         await session.rollback()
         logger.error(f"Unexpected error: {e}")
     else:
+        invalidate_user_cache(username=username)
         logger.debug(
             f"insert_shop() - 挿入実行: username: {username}, name: {shop_name}, "
             f"shop_name: {username}, menu_id: 1, permission: 10"
@@ -516,6 +717,10 @@ async def update_user(username: str, key: str, value):
         await session.rollback()
         logger.error(f"Unexpected error: {e}")
     else:
+        # パスワードの再ハッシュ（update_existing_passwords）もここを通る
+        invalidate_user_cache(username=username)
+        if key == "username":
+            invalidate_user_cache(username=value)
         logger.info(f"ユーザー {username} の {key} を {value} に更新しました。")
         logger.debug(f"update_user() - {stmt}")
 
@@ -546,6 +751,7 @@ async def delete_user(username: str):
         await session.rollback()
         logger.error(f"Unexpected error: {e}")
     else:
+        invalidate_user_cache(username=username)
         logger.info(f"ユーザー {username} の削除に成功しました。")
         logger.debug(f"delete_user() - {stmt}")
 
@@ -576,6 +782,7 @@ async def delete_all_user():
         await session.rollback()
         logger.error(f"Unexpected error: {e}")
     else:
+        clear_user_cache()
         logger.info("User テーブルの削除が完了しました。")
 
 
@@ -595,6 +802,10 @@ async def execute_with_retry(session, stmt, retries=3, delay=1):
 
 @log_decorator
 async def get_user(username: str) -> Optional[UserResponse]:
+    cached_user = get_cached_user(username=username)
+    if cached_user is not None:
+        return cached_user
+
     async with AsyncSessionLocal() as session:
         stmt = select(User).where(User.username == username)
         result = await execute_with_retry(session, stmt)
@@ -603,7 +814,7 @@ async def get_user(username: str) -> Optional[UserResponse]:
     if user_obj is None:
         return None
 
-    return UserResponse(
+    user = UserResponse(
         user_id=user_obj.user_id,
         username=user_obj.username,
         password=user_obj.password,
@@ -617,6 +828,8 @@ async def get_user(username: str) -> Optional[UserResponse]:
         is_modified=user_obj.is_modified,
         updated_at=user_obj.updated_at
     )
+    cache_user(user)
+    return user
 
 
 @log_decorator
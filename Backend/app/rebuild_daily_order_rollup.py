@@ -0,0 +1,35 @@
+# rebuild_daily_order_rollup.py
+# 日別の注文集計（daily_order_rollup）を Orders から作り直す
+# 導入時の初回作成（既存の注文の取り込み）と、集計がずれた場合の修正に使う。
+# 指定した期間の集計を消し、INSERT ... SELECT ... GROUP BY で DB 内で集計し直す（1トランザクション）。
+#
+# 入力例:
+# python rebuild_daily_order_rollup.py                                   # 全期間
+# python rebuild_daily_order_rollup.py --begin 2025-05-01                # 2025-05-01 以降
+# python rebuild_daily_order_rollup.py --begin 2025-05-01 --end 2025-05-31
+import argparse
+import asyncio
+from datetime import date
+
+from models.order_rollup import create_daily_order_rollup_table, rebuild_daily_order_rollup
+
+
+async def run(begin_date, end_date) -> int:
+    await create_daily_order_rollup_table()
+    return await rebuild_daily_order_rollup(begin_date, end_date)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日別の注文集計の作り直し")
+    parser.add_argument("--begin", type=date.fromisoformat, default=None, help="開始日 YYYY-MM-DD（省略時は最初から）")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="終了日 YYYY-MM-DD（省略時は最後まで）")
+    args = parser.parse_args()
+
+    rows = asyncio.run(run(args.begin, args.end))
+    if rows < 0:
+        raise SystemExit("→ 作り直しに失敗しました。ログを確認してください。")
+    print(f"→ {rows} 件の集計（日付・店舗・会社・メニュー）を作り直しました。")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,30 @@
 # routers/admin.py
 # ../admin/meになる
 '''
-    1. admin_view(request: Request): 
-    2. update_existing_passwords():
+     1. admin_view(request: Request): 
+     2. update_existing_passwords():
+     3. get_password_rehash_status(request: Request):
 
-    3. test_exception(request: Request):
+     4. test_exception(request: Request):
 
-    4. admin_logs_redirect():
-    5. admin_order_logs_redirect():
+     5. admin_logs_redirect():
+     6. admin_order_logs_redirect():
+
+     7. get_user_cache_status(request: Request):
+     8. get_function_timings_status(request: Request):
+     9. update_function_timings(request: Request, enabled: Optional[bool] = None, slow_ms: Optional[float] = None, reset: bool = False):
+
+    # メモリ調査（tracemalloc）
+    10. start_tracemalloc(request: Request, frames: int = 1):
+    11. stop_tracemalloc(request: Request):
+    12. get_tracemalloc_status(request: Request):
+    13. create_tracemalloc_snapshot(request: Request, name: str):
+    14. get_tracemalloc_diff(request: Request, base: str, target: str, top: int = 20, key_type: str = "lineno"):
 '''
-import bcrypt
 from fastapi import Request, APIRouter
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
-from models.user import update_user, select_all_users
+from models.user import get_password_rehash_progress, start_password_rehash
 
 from utils.helper import redirect_error, redirect_unauthorized
 from utils.decorator import log_decorator
@@ -66,31 +77,35 @@ async def admin_view(request: Request):
 @admin_router.get(
     "/me/update_existing_passwords",
     summary="ユーザーパスワードの暗号化：管理者ユーザー",
-    description="すべてのユーザーパスワードの暗号化する。",
+    description="bcrypt でハッシュ化されていないパスワードの一括ハッシュ化をバックグラウンドで開始する。進捗は /me/password_rehash で確認できる。",
     response_class=HTMLResponse,
     tags=["admin"])
 async def update_existing_passwords(request: Request):
-    """既存ユーザーの全パスワードをハッシュ化"""
+    """既存ユーザーの全パスワードをハッシュ化（リクエストでは開始するだけ）"""
     from utils.helper import redirect_login_success
     try:
-        users = await select_all_users()  # すべてのユーザーを取得する関数が必要
-        for user in users:
-            if not user.get_password().startswith("$2b$"):  # bcryptのハッシュでない場合
-
-                """パスワードをハッシュ化する"""
-                salt = bcrypt.gensalt()
-                password = user.get_password()
-                hashed_password = bcrypt.hashpw(password.encode(), salt)
-                new_hashed_password = hashed_password.decode()  # バイト列を文字列に変換
-
-                await update_user(
-                    user.username, "password", new_hashed_password)  # DB更新
+        if not (await check_permission(request, [99])):
+            return redirect_unauthorized(request, "管理者権限がありません。")
+        progress = start_password_rehash()
 
     except Exception as e:
         message = f"update_existing_passwords() - 予期せぬエラーが発生しました"
         return await redirect_error(request, message, e)
     else:
-        return redirect_login_success(request, f"ユーザー {user.username} のパスワードをハッシュ化しました")
+        return redirect_login_success(
+            request, f"パスワードのハッシュ化を開始しました（状態: {progress['state']}）。進捗は /admin/me/password_rehash で確認できます"
+        )
+
+# パスワード一括ハッシュ化の進捗
+@admin_router.get(
+    "/me/password_rehash",
+    summary="パスワード一括ハッシュ化の進捗：管理者ユーザー",
+    description="対象件数・処理済み件数・更新件数・失敗件数と状態（idle / running / done / failed）を返す。",
+    tags=["admin"])
+async def get_password_rehash_status(request: Request):
+    if not (await check_permission(request, [99])):
+            return redirect_unauthorized(request, "管理者権限がありません。")
+    return JSONResponse(get_password_rehash_progress())
 
 '''
 # 例外テスト
@@ -135,3 +150,148 @@ async def admin_order_logs_redirect(request: Request):
             return redirect_unauthorized(request, "管理者権限がありません。")
     return RedirectResponse(url="/api/v1/order_log_html")
 
+
+from fastapi.responses import JSONResponse
+from models.user import get_user_cache_stats
+
+# ユーザーキャッシュのヒット率確認
+@admin_router.get(
+    "/me/user_cache",
+    summary="ユーザーキャッシュ状況：管理者ユーザー",
+    description="username / user_id ごとのユーザーキャッシュの件数・ヒット数・ミス数を返す。",
+    tags=["admin"])
+async def get_user_cache_status(request: Request):
+    if not (await check_permission(request, [99])):
+            return redirect_unauthorized(request, "管理者権限がありません。")
+    return JSONResponse(get_user_cache_stats())
+
+
+from typing import Optional
+from fastapi import Query
+from utils.timing import (
+    get_function_timings, is_timing_enabled, reset_function_timings,
+    set_slow_threshold, set_timing_enabled, timing_state
+)
+
+# 関数ごとの実行時間（@log_decorator が記録したヒストグラム）
+@admin_router.get(
+    "/me/timings",
+    summary="関数ごとの実行時間：管理者ユーザー",
+    description="@log_decorator が記録した関数ごとの呼び出し回数・合計・p50/p95/p99（ms）を合計時間の大きい順に返す。",
+    tags=["admin"])
+async def get_function_timings_status(request: Request):
+    if not (await check_permission(request, [99])):
+            return redirect_unauthorized(request, "管理者権限がありません。")
+    return JSONResponse({
+        "enabled": is_timing_enabled(),
+        "slow_ms": timing_state.slow_threshold_ms,
+        "functions": get_function_timings()
+    })
+
+# 計測の切り替え（再起動不要）
+@admin_router.post(
+    "/me/timings",
+    summary="関数の実行時間計測の切り替え：管理者ユーザー",
+    description="enabled で計測の ON/OFF、slow_ms で遅い呼び出しをログに出すしきい値（ms、0 で出さない）、reset=true で集計を消去する。",
+    tags=["admin"])
+async def update_function_timings(
+    request: Request,
+    enabled: Optional[bool] = Query(None, description="計測する / しない"),
+    slow_ms: Optional[float] = Query(None, ge=0, description="これ以上かかった呼び出しをログに出す（ms）。0 で出さない"),
+    reset: bool = Query(False, description="集計を消去する")
+):
+    if not (await check_permission(request, [99])):
+            return redirect_unauthorized(request, "管理者権限がありません。")
+    if enabled is not None:
+        set_timing_enabled(enabled)
+    if slow_ms is not None:
+        set_slow_threshold(slow_ms or None)
+    if reset:
+        reset_function_timings()
+    return JSONResponse({"enabled": is_timing_enabled(), "slow_ms": timing_state.slow_threshold_ms})
+
+
+import asyncio
+from fastapi import HTTPException, status
+from utils.memory_trace import (
+    TRACEMALLOC_DEFAULT_FRAMES, TRACEMALLOC_MAX_FRAMES, TRACEMALLOC_KEY_TYPES,
+    diff_snapshots, get_tracing_status, start_tracing, stop_tracing, take_snapshot
+)
+
+# メモリ調査：追跡開始
+@admin_router.post(
+    "/me/tracemalloc/start",
+    summary="メモリ追跡の開始：管理者ユーザー",
+    description="tracemalloc を開始する。frames は記録するスタックの段数（多いほど詳しいが遅くなる）。",
+    tags=["admin"])
+async def start_tracemalloc(
+    request: Request,
+    frames: int = Query(TRACEMALLOC_DEFAULT_FRAMES, ge=1, le=TRACEMALLOC_MAX_FRAMES, description="スタックの段数")
+):
+    if not (await check_permission(request, [99])):
+            return redirect_unauthorized(request, "管理者権限がありません。")
+    return JSONResponse(start_tracing(frames))
+
+# メモリ調査：追跡停止（スナップショットも破棄）
+@admin_router.post(
+    "/me/tracemalloc/stop",
+    summary="メモリ追跡の停止：管理者ユーザー",
+    description="tracemalloc を停止し、保存しているスナップショットを破棄する。",
+    tags=["admin"])
+async def stop_tracemalloc(request: Request):
+    if not (await check_permission(request, [99])):
+            return redirect_unauthorized(request, "管理者権限がありません。")
+    return JSONResponse(stop_tracing())
+
+# メモリ調査：状態
+@admin_router.get(
+    "/me/tracemalloc",
+    summary="メモリ追跡の状態：管理者ユーザー",
+    description="追跡中かどうか、現在・ピークの追跡量、保存しているスナップショットの一覧を返す。",
+    tags=["admin"])
+async def get_tracemalloc_status(request: Request):
+    if not (await check_permission(request, [99])):
+            return redirect_unauthorized(request, "管理者権限がありません。")
+    return JSONResponse(get_tracing_status())
+
+# メモリ調査：スナップショット
+@admin_router.post(
+    "/me/tracemalloc/snapshots",
+    summary="メモリのスナップショット保存：管理者ユーザー",
+    description="現在のメモリ確保状況を name で保存する（同名は上書き、保持数には上限あり）。",
+    tags=["admin"])
+async def create_tracemalloc_snapshot(
+    request: Request,
+    name: str = Query(..., min_length=1, max_length=50, description="スナップショット名")
+):
+    if not (await check_permission(request, [99])):
+            return redirect_unauthorized(request, "管理者権限がありません。")
+    try:
+        # スナップショットは CPU を使うので、イベントループを止めないようスレッドで取る
+        result = await asyncio.to_thread(take_snapshot, name)
+    except RuntimeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="メモリ追跡が開始されていません")
+    return JSONResponse(result)
+
+# メモリ調査：2つのスナップショットの差分
+@admin_router.get(
+    "/me/tracemalloc/diff",
+    summary="メモリのスナップショット比較：管理者ユーザー",
+    description="base → target で確保量の増減が大きい順に top 件を返す。key_type は lineno / filename / traceback。",
+    tags=["admin"])
+async def get_tracemalloc_diff(
+    request: Request,
+    base: str = Query(..., description="比較元のスナップショット名"),
+    target: str = Query(..., description="比較先のスナップショット名"),
+    top: int = Query(20, ge=1, le=200, description="件数"),
+    key_type: str = Query("lineno", description=f"集計単位 {TRACEMALLOC_KEY_TYPES}")
+):
+    if not (await check_permission(request, [99])):
+            return redirect_unauthorized(request, "管理者権限がありません。")
+    if key_type not in TRACEMALLOC_KEY_TYPES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"key_type は {TRACEMALLOC_KEY_TYPES} のいずれかを指定してください")
+    try:
+        result = await asyncio.to_thread(diff_snapshots, base, target, top, key_type)
+    except KeyError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"スナップショットが見つかりません: {e.args[0]}")
+    return JSONResponse(result)
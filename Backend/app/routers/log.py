@@ -1,14 +1,60 @@
-from fastapi import APIRouter, HTTPException, Query, BackgroundTasks
-from fastapi.responses import HTMLResponse
+# routers/log.py
+'''
+    1. list_logs():
+    2. view_log(request: Request, filename: str, offset: int, limit: int, unit: str, tail: int):
+    3. list_combined_order_logs(shop: str):
+    4. view_combined_order_log(request: Request, filename: str, offset: int, limit: int, unit: str, tail: int):
+    5. view_filtered_order_log(request: Request, shop: str, username: str, order_id: int, date: str, offset: int, limit: int):
+    6. list_order_logs():
+    7. view_order_log(request: Request, filename: str, offset: int, limit: int, unit: str, tail: int):
+    8. filter_order_logs(shop: str):
+'''
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
 from urllib.parse import quote
+import asyncio
 import os
-import subprocess
+import re
 
 log_router = APIRouter(prefix="/api/v1", tags=["log"])
 
 LOG_DIR = "./logs"
 ORDER_LOG_DIR = "./order_logs"
 
+# ログ内容の表示は、ファイルを少しずつ読みながら返す（巨大なログでもメモリを使わない）
+from utils.log_reader import (
+    LOG_VIEW_DEFAULT_LINES, LOG_VIEW_MAX_TAIL, LOG_VIEW_UNITS,
+    iter_lines_html, iter_log_html, resolve_log_path
+)
+# 店舗ごとの注文ログは、ファイルに書き出さず索引から返す
+from utils.order_log_index import order_log_index
+
+# 結合ログのファイル名（combined_{店舗名}_{日付}.log）
+COMBINED_LOG_PATTERN = re.compile(r"^combined_(.+)_(\d{4}-\d{2}-\d{2})\.log$")
+
+OFFSET_QUERY = Query(0, ge=0, description="開始位置（unit=line なら行、unit=byte ならバイト）")
+LOG_LIMIT_QUERY = Query(None, ge=0, description="件数（unit=line なら行数、unit=byte ならバイト数）。0 で最後まで")
+UNIT_QUERY = Query("line", description=f"offset / limit の単位 {LOG_VIEW_UNITS}")
+TAIL_QUERY = Query(None, ge=1, le=LOG_VIEW_MAX_TAIL, description="末尾から N 行を表示する")
+
+def stream_log_html(request: Request, path: str, title: str, offset: int, limit: Optional[int], unit: str, tail: Optional[int]):
+    if unit not in LOG_VIEW_UNITS:
+        raise HTTPException(status_code=400, detail=f"unit は {LOG_VIEW_UNITS} のいずれかを指定してください")
+    return StreamingResponse(
+        iter_log_html(path, title, request.url.path, offset, limit, unit, tail),
+        media_type="text/html; charset=utf-8"
+    )
+
+def stream_indexed_lines_html(request: Request, title: str, positions: list, offset: int, limit: Optional[int], params: dict):
+    if not limit:
+        limit = LOG_VIEW_DEFAULT_LINES
+    page = positions[offset:offset + limit]
+    return StreamingResponse(
+        iter_lines_html(order_log_index.iter_lines(page), title, request.url.path, offset, limit, len(positions), params),
+        media_type="text/html; charset=utf-8"
+    )
+
 
 # 管理者ユーザー用：ログ一覧
 @log_router.get(
@@ -32,44 +78,54 @@ def list_logs():
 @log_router.get(
     "/log_html/{filename}",
     summary="一般ログ内容取得",
-    description="ファイル名を指定した一般ログの内容を取得します。",
+    description="ファイル名を指定した一般ログの内容を取得します。offset / limit（unit=line|byte）でページ送り、tail=N で末尾 N 行。",
     response_class=HTMLResponse,
     tags=["log: admin"]
 )
-def view_log(filename: str):
-    path = os.path.join(LOG_DIR, filename)
-    if not os.path.exists(path):
-        raise HTTPException(status_code=404, detail="指定されたログファイルが見つかりません")
-
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read().replace("\n", "<br>")
-        return HTMLResponse(content=f"<h1>{filename}</h1><pre>{content}</pre>")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"ファイル読み込み中にエラーが発生しました: {str(e)}")
+async def view_log(
+    request: Request,
+    filename: str,
+    offset: int = OFFSET_QUERY,
+    limit: Optional[int] = LOG_LIMIT_QUERY,
+    unit: str = UNIT_QUERY,
+    tail: Optional[int] = TAIL_QUERY
+):
+    path = resolve_log_path(LOG_DIR, filename)
+    return stream_log_html(request, path, filename, offset, limit, unit, tail)
 
 
 # 店舗ユーザー用：結合ログ一覧（静的ルートを先に！）
 @log_router.get(
     "/order_log_html/combined",
     summary="結合注文ログ一覧取得",
-    description="結合された注文ログの一覧を取得します。",
+    description="店舗・日付ごとの注文ログの一覧を取得します（注文ログの索引から作成）。",
     response_class=HTMLResponse,
     tags=["log: shop"]    
 )
-async def list_combined_order_logs():
+async def list_combined_order_logs(shop: Optional[str] = Query(None, description="対象店舗名（省略時はすべて）")):
     if not os.path.exists(ORDER_LOG_DIR):
         raise HTTPException(status_code=404, detail="注文ログディレクトリが存在しません")
 
-    log_files = sorted(
-        [f for f in os.listdir(ORDER_LOG_DIR) if f.startswith("combined_")],
-        reverse=True
+    await asyncio.to_thread(order_log_index.refresh)
+    shops = [shop] if shop else order_log_index.values("shop_name")
+    log_files = {
+        f"combined_{shop_name}_{date}.log"
+        for shop_name in shops
+        for date in order_log_index.dates("shop_name", shop_name)
+    }
+    # order_log_filter_config.py で書き出した結合ログも表示する
+    log_files.update(
+        f for f in os.listdir(ORDER_LOG_DIR)
+        if f.startswith("combined_") and (not shop or f.startswith(f"combined_{shop}_"))
     )
 
     if not log_files:
         return HTMLResponse("<h1>表示可能な結合ログがありません</h1>", status_code=200)
 
-    links = [f"<li><a href='/api/v1/order_log_html/{quote(file)}'>{file}</a></li>" for file in log_files]
+    links = [
+        f"<li><a href='/api/v1/order_log_html/combined/{quote(file)}'>{file}</a></li>"
+        for file in sorted(log_files, reverse=True)
+    ]
     return HTMLResponse(content=f"<h1>結合注文ログ一覧</h1><ul>{''.join(links)}</ul>")
 
 
@@ -78,20 +134,62 @@ async def list_combined_order_logs():
     "/order_log_html/combined/{filename}",
     response_class=HTMLResponse,
     summary="結合注文ログ内容取得",
-    description="結合された注文ログファイルの内容を取得します。",
+    description="結合された注文ログファイルの内容を取得します。offset / limit（unit=line|byte）でページ送り、tail=N で末尾 N 行。",
     tags=["log: shop"]
 )
-async def view_combined_order_log(filename: str):
-    log_path = os.path.join(ORDER_LOG_DIR, filename)
-    if not os.path.exists(log_path):
+async def view_combined_order_log(
+    request: Request,
+    filename: str,
+    offset: int = OFFSET_QUERY,
+    limit: Optional[int] = LOG_LIMIT_QUERY,
+    unit: str = UNIT_QUERY,
+    tail: Optional[int] = TAIL_QUERY
+):
+    match = COMBINED_LOG_PATTERN.match(filename)
+    if match is None or os.path.isfile(os.path.join(ORDER_LOG_DIR, filename)):
+        log_path = resolve_log_path(ORDER_LOG_DIR, filename)
+        return stream_log_html(request, log_path, filename, offset, limit, unit, tail)
+
+    # ファイルがなければ索引から返す（行単位のページ送りのみ）
+    shop_name, date = match.groups()
+    await asyncio.to_thread(order_log_index.refresh)
+    positions = order_log_index.find(shop_name=shop_name, date=date)
+    if not positions:
         raise HTTPException(status_code=404, detail="ログファイルが存在しません")
+    if tail:
+        offset, limit = max(0, len(positions) - tail), tail
+    return stream_indexed_lines_html(request, filename, positions, offset, limit, {})
 
-    try:
-        with open(log_path, "r", encoding="utf-8") as f:
-            content = f.read().replace("\n", "<br>")
-        return HTMLResponse(content=f"<h1>{filename}</h1><pre>{content}</pre>")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"ファイルの読み込み中にエラーが発生しました: {str(e)}")
+
+# 店舗ユーザー用：条件を指定した注文ログ表示
+@log_router.get(
+    "/order_log_html/filtered",
+    response_class=HTMLResponse,
+    summary="注文ログ抽出表示",
+    description="店舗名・ユーザー名・注文ID・日付で注文ログを抽出して表示します（すべて指定した条件に一致する行）。",
+    tags=["log: shop"]
+)
+async def view_filtered_order_log(
+    request: Request,
+    shop: Optional[str] = Query(None, description="店舗名"),
+    username: Optional[str] = Query(None, description="ユーザー名"),
+    order_id: Optional[int] = Query(None, ge=1, description="注文ID"),
+    date: Optional[str] = Query(None, description="日付（YYYY-MM-DD）"),
+    offset: int = Query(0, ge=0, description="開始行"),
+    limit: Optional[int] = Query(None, ge=0, description="行数")
+):
+    if shop is None and username is None and order_id is None:
+        raise HTTPException(status_code=400, detail="店舗名・ユーザー名・注文IDのいずれかを指定してください")
+
+    await asyncio.to_thread(order_log_index.refresh)
+    positions = order_log_index.find(shop_name=shop, username=username, order_id=order_id, date=date)
+    params = {
+        key: value for key, value in
+        (("shop", shop), ("username", username), ("order_id", order_id), ("date", date))
+        if value is not None
+    }
+    title = "注文ログ: " + ", ".join(f"{key}={value}" for key, value in params.items())
+    return stream_indexed_lines_html(request, title, positions, offset, limit, params)
 
 
 # 管理者ユーザー用：注文ログファイル一覧
@@ -116,44 +214,42 @@ def list_order_logs():
 @log_router.get(
     "/order_log_html/{filename}",
     summary="注文ログ内容取得",
-    description="指定された注文ログファイルの内容を取得します。",
+    description="指定された注文ログファイルの内容を取得します。offset / limit（unit=line|byte）でページ送り、tail=N で末尾 N 行。",
     response_class=HTMLResponse,
     tags=["log: admin"]
 )
-def view_order_log(filename: str):
-    path = os.path.join(ORDER_LOG_DIR, filename)
-    print(f"🔍 試行ファイル名: {filename}")
-    print(f"📂 絶対パス: {os.path.abspath(path)}")
-    print(f"📂 存在する?: {os.path.exists(path)}")
-
-    if not os.path.exists(path):
-        raise HTTPException(status_code=404, detail="注文ログファイルが存在しません")
-
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            content = f.read().replace("\n", "<br>")
-        return HTMLResponse(content=f"<h1>{filename}</h1><pre>{content}</pre>")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"ファイルの読み込み中にエラーが発生しました: {str(e)}")
+async def view_order_log(
+    request: Request,
+    filename: str,
+    offset: int = OFFSET_QUERY,
+    limit: Optional[int] = LOG_LIMIT_QUERY,
+    unit: str = UNIT_QUERY,
+    tail: Optional[int] = TAIL_QUERY
+):
+    path = resolve_log_path(ORDER_LOG_DIR, filename)
+    return stream_log_html(request, path, filename, offset, limit, unit, tail)
 
 
 # 店舗ユーザー用：注文ログ抽出（バックグラウンド実行）
 @log_router.get(
     "/filter_order_logs",
     summary="注文ログの抽出処理（店舗名）",
-    description="指定した店舗名の注文ログを抽出する処理をバックグラウンドで実行します。",
+    description="注文ログの索引を更新し、指定した店舗名の日付ごとの件数を返します。ログは /order_log_html/combined から表示できます。",
     tags=["log: shop"]
 )
 async def filter_order_logs(
-    background_tasks: BackgroundTasks,
     shop: str = Query(..., description="対象店舗名")
 ):
-    def run_log_filter():
-        subprocess.run(
-            ["python", "order_log_filter_config.py", "order_logs", shop],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
-    
-    background_tasks.add_task(run_log_filter)
-    return {"message": "ログ抽出処理をバックグラウンドで開始しました"}
+    # 追記された分だけ読む（以前のように全ファイルを読み直したり、別プロセスを起動したりしない）
+    refreshed = await asyncio.to_thread(order_log_index.refresh)
+    dates = order_log_index.dates("shop_name", shop)
+    return {
+        "message": "注文ログを抽出しました",
+        "shop": shop,
+        "dates": dates,
+        "links": {
+            date: f"/api/v1/order_log_html/combined/{quote(f'combined_{shop}_{date}.log')}"
+            for date in dates
+        },
+        "indexed": refreshed,
+    }
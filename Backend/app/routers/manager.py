@@ -1,11 +1,11 @@
 # routers/manager.py
 '''
-    1. manager_view(request: Request, response: Response):
+    1. manager_view(request: Request, response: Response, manager_id: str, limit: int = Query(ORDER_PAGE_SIZE), cursor: str = Query(None)):
     2. get_manager_context(request: Request, orders):
     3. fax_order_sheet_view(request: Request):
     4. get_fax_sheet_context(request: Request):
 '''
-from fastapi import Request, Response, APIRouter, status, HTTPException
+from fastapi import Query, Request, Response, APIRouter, status, HTTPException
 from fastapi.responses import HTMLResponse
 from venv import logger
 
@@ -21,8 +21,8 @@ from utils.permission_helper import check_permission
 from utils.cookie_helper import get_all_cookies
 
 
-from services.order_view import order_table_view
-from models.order import select_orders_by_company_all
+from services.order_view import order_table_view, get_order_page
+from models.order import OrderFilter, ORDER_PAGE_SIZE, ORDER_PAGE_SIZE_MAX
 from database.local_postgresql_database import endpoint
 
 # 契約企業(お弁当担当者)画面
@@ -35,7 +35,13 @@ from database.local_postgresql_database import endpoint
     tags=["manager"]
 )
 @log_decorator
-async def manager_view(request: Request, response: Response, manager_id: str):
+async def manager_view(
+    request: Request,
+    response: Response,
+    manager_id: str,
+    limit: int = Query(ORDER_PAGE_SIZE, ge=1, le=ORDER_PAGE_SIZE_MAX, description="1ページの件数"),
+    cursor: str = Query(None, description="次ページのカーソル")
+):
     try:
         if await check_permission(request, [2]) == False:
             return redirect_unauthorized(request, "契約企業ユーザー権限がありません。")
@@ -48,12 +54,14 @@ async def manager_view(request: Request, response: Response, manager_id: str):
                 detail="Cookieが不正または取得できません"
             )
 
-        orders = await select_orders_by_company_all(company_id=1)
+        spec = OrderFilter("company", 1)
+        orders, page_context = await get_order_page(spec, limit, cursor)
         if not orders:
             logger.debug('manager_view - 注文なし')
             return HTMLResponse("<html><p>注文は0件です</p></html>")
 
         context = await get_manager_context(request, orders)
+        context.update(page_context)
 
         # CookieからユーザーID（manager_id）取得
         cookies = get_all_cookies(request)
@@ -70,7 +78,8 @@ async def manager_view(request: Request, response: Response, manager_id: str):
         logger.exception("manager_view - 予期せぬエラーが発生しました")
         return HTMLResponse("注文情報の取得中にエラーが発生しました", status_code=500)
     else:
-        return await order_table_view(request, response, orders, "manager.html", context)
+        # 弁当の個数（order_count）は表示中のページではなく全体の件数。SQL で集計する
+        return await order_table_view(request, response, orders, "manager.html", context, spec)
         # return templates.TemplateResponse("manager.html", context) # これでも動いた
 
 async def get_manager_context(request: Request, orders):
@@ -90,8 +99,7 @@ async def get_manager_context(request: Request, orders):
             "shop_name": "はーとあーす勝谷",
             "menu_name": "お昼のお弁当",
             "price": 500,
-            "order_count": 6,
-            "total_amount": 500 * 6,
+            # order_count（個数）は order_table_view() で全体の件数にする。合計金額は画面で 個数×単価 を計算する
             "facility_name": "テンシステム",
             "POC": "林"
         }
@@ -1,45 +1,93 @@
 # routers/order.py
 # 注文一覧API
 '''
+    ※ 一覧系APIは limit / cursor を指定するとキーセット方式でページ送りする（新しい順）。
+       次ページのカーソルは、日付指定では X-Next-Cursor ヘッダー、日付範囲では next_cursor で返す。
+
+    # ページ送り共通
+     1. parse_order_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+     2. get_orders_paged(response: Response, spec: OrderFilter, limit: Optional[int], cursor: Optional[Tuple[datetime, int]]):
     # 注文一覧（日付指定）
-     1. get_orders_date_by_admin(target_date: date):
-     2. get_orders_date_by_shop(shop_name: str, target_date: str):
-     3. get_orders_date_by_manager_company_date(user_id: int, company_id: int, begin: str = None, end: str = None):
-     4. get_orders_date_by_username(username: str, target_date: date):
+     3. get_orders_date_by_admin(target_date: date):
+     4. get_orders_date_by_shop(shop_name: str, target_date: str):
+     5. get_orders_date_by_manager_company_date(user_id: int, company_id: int, begin: str = None, end: str = None):
+     6. get_orders_date_by_username(username: str, target_date: date):
     # 注文一覧（日付範囲で取得）
-     5. get_orders_range_by_admin(begin: str = None, end: str = None):
-     6. get_orders_range_by_shop(shop_id: int, begin: str = None, end: str = None):
-     7. get_orders_range_by_manager_company(
-     8. get_orders_range_by_user(user_id: int, begin: date, end: date):
-     9. get_order_range_common(user_id=None, company_id=None, shop_id=None, is_admin=False, begin=None, end=None):
+     7. get_orders_range_by_admin(begin: str = None, end: str = None):
+     8. get_orders_range_by_shop(shop_id: int, begin: str = None, end: str = None):
+     9. get_orders_range_by_manager_company(
+    10. get_orders_range_by_user(user_id: int, begin: date, end: date):
+    11. get_order_range_common(user_id=None, company_id=None, shop_id=None, is_admin=False, begin=None, end=None, limit=None, cursor=None):
     # 注文概要（FAX送信用）
-    10. get_orders_summary_by_user(user_id: int):
-    11. get_orders_summary_by_manager_company(user_id: int, company_id: int):
-    12. get_orders_summary_by_shop(shop_id: int):
-    13. get_orders_summary_by_admin():
-    14. get_orders_summary_common(user_id=None, company_id=None, shop_id=None, is_admin=False):
+    12. get_orders_summary_by_user(user_id: int):
+    13. get_orders_summary_by_manager_company(user_id: int, company_id: int):
+    14. get_orders_summary_by_shop(shop_id: int):
+    15. get_orders_summary_by_admin():
+    16. get_orders_summary_common(user_id=None, company_id=None, shop_id=None, is_admin=False):
     # 注文キャンセル
-    15. set_order_cancel_by_user(payload: CancelOrderRequest):
+    17. set_order_cancel_by_user(payload: CancelOrderRequest):
 '''
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Response
 
 order_api_router = APIRouter(
     prefix="/api/v1/order",
     tags=["order"]
     )
 
-from datetime import date
-from typing import List
+from datetime import date, datetime, time
+from typing import List, Optional, Tuple
 from schemas.order_schemas import OrderModel  # ← Pydanticモデル
 
 from log_unified import logger
 '''-------------------------------------------------------------------'''
-# 注文一覧（日付指定）
+# ページ送り共通
 from models.order import (
-    select_orders_by_admin_at_date,
-    select_orders_by_shop_at_date
+    OrderFilter,
+    ORDER_PAGE_SIZE,
+    ORDER_PAGE_SIZE_MAX,
+    select_orders,
+    select_orders_page,
+    encode_order_cursor,
+    decode_order_cursor,
+    get_datetime_range_for_date
 )
 
+def parse_order_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """クエリパラメータの cursor を (created_at, order_id) に変換する。不正なら 400"""
+    if not cursor:
+        return None
+    try:
+        return decode_order_cursor(cursor)
+    except ValueError:
+        logger.warning(f"不正なカーソルが指定されました: {cursor}")
+        raise HTTPException(status_code=400, detail="cursor の値が不正です")
+
+
+async def get_orders_paged(response: Response, spec: OrderFilter, limit: Optional[int], cursor: Optional[Tuple[datetime, int]]):
+    """
+    limit も cursor も無ければ従来どおり全件を返す。
+    どちらかがあれば新しい順に1ページ分を返し、次ページがあれば X-Next-Cursor ヘッダーに載せる。
+    """
+    if limit is None and cursor is None:
+        return await select_orders(spec)
+
+    page = await select_orders_page(spec._replace(cursor=cursor), limit or ORDER_PAGE_SIZE)
+    if page is None:
+        return None
+
+    next_cursor = encode_order_cursor(page.next_cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page.orders
+
+
+# ページ送り用クエリパラメータ
+LIMIT_QUERY = Query(None, ge=1, le=ORDER_PAGE_SIZE_MAX, description="1ページの件数（指定すると新しい順）")
+CURSOR_QUERY = Query(None, description="次ページのカーソル（X-Next-Cursor / next_cursor の値）")
+
+'''-------------------------------------------------------------------'''
+# 注文一覧（日付指定）
+
 # 1. 管理者ユーザー
 @order_api_router.get(
     "/admin/orders",
@@ -49,10 +97,15 @@ from models.order import (
     tags=["order: single"]
 )
 async def get_orders_date_by_admin(
-    target_date: date = Query(..., description="注文日（YYYY-MM-DD形式）")
+    response: Response,
+    target_date: date = Query(..., description="注文日（YYYY-MM-DD形式）"),
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY
 ):
+    cursor_key = parse_order_cursor(cursor)
     try:
-        orders = await select_orders_by_admin_at_date(target_date)
+        start_dt, end_dt = get_datetime_range_for_date(target_date)
+        orders = await get_orders_paged(response, OrderFilter(start=start_dt, end=end_dt), limit, cursor_key)
     except Exception as e:
         logger.exception("注文取得中にサーバーエラー")
         raise HTTPException(status_code=500, detail="注文の取得に失敗しました")
@@ -63,7 +116,6 @@ async def get_orders_date_by_admin(
     return orders
 
 
-from models.order import select_orders_by_shop_at_date
 # 2. 店舗ユーザー
 @order_api_router.get(
     "/shop/orders",
@@ -73,11 +125,16 @@ from models.order import select_orders_by_shop_at_date
     tags=["order: single"]
 )
 async def get_orders_date_by_shop(
+    response: Response,
     shop_name: str = Query(..., description="店舗名（例: shop01）"),
-    target_date: date = Query(..., description="注文日（YYYY-MM-DD形式）")
+    target_date: date = Query(..., description="注文日（YYYY-MM-DD形式）"),
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY
 ):
+    cursor_key = parse_order_cursor(cursor)
     try:
-        orders = await select_orders_by_shop_at_date(shop_name, target_date)
+        start_dt, end_dt = get_datetime_range_for_date(target_date)
+        orders = await get_orders_paged(response, OrderFilter("shop", shop_name, start_dt, end_dt), limit, cursor_key)
     except Exception as e:
         logger.exception("注文取得中にサーバーエラーが発生しました")
         raise HTTPException(status_code=500, detail="注文の取得中にエラーが発生しました")
@@ -86,7 +143,6 @@ async def get_orders_date_by_shop(
     return orders
 
 
-from models.order import select_orders_by_company_at_date
 # 3. 契約企業ユーザー
 @order_api_router.get(
     "/manager/{company_id}/orders",
@@ -96,11 +152,16 @@ from models.order import select_orders_by_company_at_date
     tags=["order: single"]
 )
 async def get_orders_date_by_manager_company_date(
+    response: Response,
     company_id: int,
-    target_date: date = Query(..., description="注文日（YYYY-MM-DD形式）")
+    target_date: date = Query(..., description="注文日（YYYY-MM-DD形式）"),
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY
 ):
+    cursor_key = parse_order_cursor(cursor)
     try:
-        orders = await select_orders_by_company_at_date(company_id, target_date)
+        start_dt, end_dt = get_datetime_range_for_date(target_date)
+        orders = await get_orders_paged(response, OrderFilter("company", company_id, start_dt, end_dt), limit, cursor_key)
     except Exception as e:
         logger.exception("契約企業の注文取得中にサーバーエラーが発生しました")
         raise HTTPException(status_code=500, detail="注文の取得中にエラーが発生しました")
@@ -108,7 +169,6 @@ async def get_orders_date_by_manager_company_date(
     return orders  # 空リストも200で返却（自然なREST挙動）
 
 
-from models.order import select_orders_by_user_at_date
 # 4. 一般ユーザー
 # 注意：ここは{user_id}に書き直す必要がある。
 @order_api_router.get(
@@ -119,11 +179,16 @@ from models.order import select_orders_by_user_at_date
     tags=["order: single"]
 )
 async def get_orders_date_by_username(
+    response: Response,
     username: str,
-    target_date: date = Query(..., description="注文日（YYYY-MM-DD形式）")
+    target_date: date = Query(..., description="注文日（YYYY-MM-DD形式）"),
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY
 ):
+    cursor_key = parse_order_cursor(cursor)
     try:
-        orders = await select_orders_by_user_at_date(username, target_date)
+        start_dt, end_dt = get_datetime_range_for_date(target_date)
+        orders = await get_orders_paged(response, OrderFilter("user", username, start_dt, end_dt), limit, cursor_key)
     except Exception as e:
         logger.exception("ユーザーの注文取得中にサーバーエラーが発生しました")
         raise HTTPException(status_code=500, detail="注文の取得中にエラーが発生しました")
@@ -137,6 +202,7 @@ from pydantic import BaseModel
 
 class OrderListResponse(BaseModel):
     orders: List[OrderModel]
+    next_cursor: Optional[str] = None  # limit / cursor 指定時のみ。None なら最終ページ
 
 # 1. 管理者ユーザー
 @order_api_router.get(
@@ -148,9 +214,11 @@ class OrderListResponse(BaseModel):
 )
 async def get_orders_range_by_admin(
     begin: date = Query(None, description="開始日（YYYY-MM-DD）"),
-    end: date = Query(None, description="終了日（YYYY-MM-DD）")
+    end: date = Query(None, description="終了日（YYYY-MM-DD）"),
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY
 ):
-    return await get_order_range_common(is_admin=True, begin=begin, end=end)
+    return await get_order_range_common(is_admin=True, begin=begin, end=end, limit=limit, cursor=cursor)
 
 # 2. 店舗ユーザー
 @order_api_router.get(
@@ -163,9 +231,11 @@ async def get_orders_range_by_admin(
 async def get_orders_range_by_shop(
     shop_id: int,
     begin: date = Query(None, description="開始日（YYYY-MM-DD）"),
-    end: date = Query(None, description="終了日（YYYY-MM-DD）")
+    end: date = Query(None, description="終了日（YYYY-MM-DD）"),
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY
 ):
-    return await get_order_range_common(shop_id=shop_id, begin=begin, end=end)
+    return await get_order_range_common(shop_id=shop_id, begin=begin, end=end, limit=limit, cursor=cursor)
 
 # 3. 契約企業ユーザー
 @order_api_router.get(
@@ -179,9 +249,11 @@ async def get_orders_range_by_manager_company(
     user_id: int,
     company_id: int,
     begin: date = Query(None, description="開始日（YYYY-MM-DD）"),
-    end: date = Query(None, description="終了日（YYYY-MM-DD）")
+    end: date = Query(None, description="終了日（YYYY-MM-DD）"),
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY
 ):
-    return await get_order_range_common(user_id=user_id, company_id=company_id, begin=begin, end=end)
+    return await get_order_range_common(user_id=user_id, company_id=company_id, begin=begin, end=end, limit=limit, cursor=cursor)
 
 # 4. 一般ユーザー
 @order_api_router.get(
@@ -194,73 +266,84 @@ async def get_orders_range_by_manager_company(
 async def get_orders_range_by_user(
     user_id: int,
     begin: date = Query(None, description="開始日（YYYY-MM-DD）"),
-    end: date = Query(None, description="終了日（YYYY-MM-DD）")
+    end: date = Query(None, description="終了日（YYYY-MM-DD）"),
+    limit: Optional[int] = LIMIT_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY
 ):
-    return await get_order_range_common(user_id=user_id, begin=begin, end=end)
+    return await get_order_range_common(user_id=user_id, begin=begin, end=end, limit=limit, cursor=cursor)
 
 
 # 5. 共通：パラメータによる注文一覧取得
-async def get_order_range_common(user_id=None, company_id=None, shop_id=None, is_admin=False, begin=None, end=None):
-    import datetime
-
-    today = datetime.date.today()
+async def get_order_range_common(user_id=None, company_id=None, shop_id=None, is_admin=False, begin=None, end=None, limit=None, cursor=None):
+    today = date.today()
 
     # begin の型チェックと変換
-    if isinstance(begin, datetime.date):
+    if isinstance(begin, date):
         begin_date = begin
     elif isinstance(begin, str):
-        begin_date = datetime.datetime.strptime(begin, "%Y-%m-%d").date()
+        begin_date = datetime.strptime(begin, "%Y-%m-%d").date()
     else:
         begin_date = today
 
     # end の型チェックと変換
-    if isinstance(end, datetime.date):
+    if isinstance(end, date):
         end_date = end
     elif isinstance(end, str):
-        end_date = datetime.datetime.strptime(end, "%Y-%m-%d").date()
+        end_date = datetime.strptime(end, "%Y-%m-%d").date()
     else:
         end_date = today
 
     # 検索期間ログ出力
-    print(f"[DEBUG] 検索期間: begin={begin_date}, end={end_date}")
+    logger.debug(f"get_order_range_common - 検索期間: begin={begin_date}, end={end_date}")
+
+    cursor_key = parse_order_cursor(cursor)
+    start_dt = datetime.combine(begin_date, time.min)
+    end_dt = datetime.combine(end_date, time.max)
 
-    # 日数差を計算（shop や is_admin 用）
-    days_ago = (end_date - begin_date).days
-    print(f"{days_ago=}")
     # 実行分岐
     if is_admin:
-        from models.order import select_orders_by_admin_at_date_range
-        orders = await select_orders_by_admin_at_date_range(begin_date, end_date)
-
+        spec = OrderFilter(start=start_dt, end=end_dt)
 
     elif user_id and not company_id and not shop_id:
         from models.user import select_user_by_id
-        from models.order import select_orders_by_user_at_date_range
 
         user = await select_user_by_id(user_id)
-        print(f"[DEBUG] username resolved to: {user.username}")
         if not user:
-            print(f"if not user: {user}")
+            logger.warning(f"get_order_range_common - ユーザーが見つかりません user_id: {user_id}")
             return {"orders": []}
 
-        print(user.username, begin_date, end_date)
-        orders = await select_orders_by_user_at_date_range(user.username, begin_date, end_date)
+        logger.debug(f"get_order_range_common - username resolved to: {user.username}")
+        spec = OrderFilter("user", user.username, start_dt, end_dt)
 
     elif user_id and company_id and not shop_id:
-        from models.order import select_orders_by_company_at_date_range
-        orders = await select_orders_by_company_at_date_range(company_id, begin_date, end_date)
+        spec = OrderFilter("company", company_id, start_dt, end_dt)
 
     elif shop_id:
-        from models.order import select_orders_by_shop_ago
-        orders = await select_orders_by_shop_ago(shop_id, days_ago)
+        from models.user import select_user_by_id
+
+        # shop_id は店舗ユーザーのID。注文の shop_name はそのユーザー名
+        shop = await select_user_by_id(shop_id)
+        if not shop:
+            logger.warning(f"get_order_range_common - 店舗ユーザーが見つかりません shop_id: {shop_id}")
+            return {"orders": []}
+
+        spec = OrderFilter("shop", shop.username, start_dt, end_dt)
+
+    else:
+        return {"orders": []}
 
+    next_cursor = None
+    if limit is None and cursor_key is None:
+        orders = await select_orders(spec)
     else:
-        orders = []
+        page = await select_orders_page(spec._replace(cursor=cursor_key), limit or ORDER_PAGE_SIZE)
+        orders = page.orders if page else None
+        next_cursor = encode_order_cursor(page.next_cursor) if page else None
 
     # モデルを辞書に変換
     order_dicts = [order.model_dump() for order in orders] if orders else []
 
-    return {"orders": order_dicts}
+    return {"orders": order_dicts, "next_cursor": next_cursor}
 
 
 '''-------------------------------------------------------------------'''
@@ -318,18 +401,32 @@ async def get_orders_summary_by_user(user_id: int):
 
 
 # 5. 共通処理　注文概要
+# 店舗・契約企業・管理者は日別集計（daily_order_rollup）から読む
 from models.order import select_order_summary
+from models.user import select_user_by_id
+from utils.date_utils import get_naive_jst_now
 
 async def get_orders_summary_common(user_id=None, company_id=None, shop_id=None, is_admin=False):
-    today = datetime.date.today().strftime("%Y-%m-%d")
+    today = get_naive_jst_now().date()  # 注文日時は JST で保存している
     conditions = {
-        "user_id": user_id,
         "company_id": company_id,
-        "shop_id": shop_id,
         "is_admin": is_admin,
         "begin_date": today,
         "end_date": today
     }
+    if shop_id is not None:
+        # 注文は店舗名（shop01）で持つため、店舗ユーザーの ID から引く
+        shop_user = await select_user_by_id(shop_id)
+        if shop_user is None:
+            raise HTTPException(status_code=404, detail="店舗ユーザーが見つかりません")
+        conditions["shop_name"] = shop_user.username
+    elif user_id is not None and company_id is None:
+        # 一般ユーザー（契約企業の担当者は自社全体の概要）
+        user = await select_user_by_id(user_id)
+        if user is None:
+            raise HTTPException(status_code=404, detail="ユーザーが見つかりません")
+        conditions["username"] = user.username
+
     summary_data = await select_order_summary(conditions)
     return {"summary": summary_data}
 
@@ -8,6 +8,7 @@
 
     6. get_holiday(date: str):
     7. get_delivery_date(date_str: str):
+    8. get_delivery_date_range(begin: date, end: date):
 '''
 from fastapi import APIRouter, Request, HTTPException, Query
 from fastapi.responses import JSONResponse
@@ -132,6 +133,7 @@ async def get_account_by_id_or_404_response(user_id: int):
 '''--------------------------------------------------------------------------'''
 from fastapi.responses import JSONResponse
 from config.config_loader import load_holiday_map
+from utils.decorator import log_decorator
 
 @account_router.get(
     "/v1/check_holiday",
@@ -151,21 +153,9 @@ async def get_holiday(date: str):
     return JSONResponse(content={"holiday_name": holiday_name or ""})
 
 
-# 配達可能曜日決定辞書 
-# １店のみなのでconfigファイルにしなかった
-delivery_mapping = {
-    0: 1, # 月 -> 火
-    1: 2, # 火 -> 水
-    2: 4, # 水 -> 金
-    3: 4, # 木 -> 金
-    4: 5, # 金 -> 土
-    5: 0, # 土 -> 月
-    6: 0 # 日 -> 月
-}
-
-from datetime import datetime
-from utils.decorator import log_decorator
-from config.config_loader import search_delivery_date
+# 配達可能曜日決定辞書（config_loader と共通）
+from datetime import date, datetime
+from config.config_loader import delivery_mapping, search_delivery_date, get_delivery_dates
 
 @account_router.get(
     "/v1/delivery_date/{date_str}",
@@ -199,3 +189,38 @@ async def get_delivery_date(date_str: str):
         "delivery_day": delivery_day
     }
 
+
+# 一度に取得できる日数の上限（店舗カレンダーは最大1年分）
+DELIVERY_DATE_RANGE_MAX_DAYS = 366
+
+@account_router.get(
+    "/v1/delivery_dates",
+    summary="配達予定日の一括取得：共通",
+    description="begin～end（YYYY-MM-DD）の各注文日について配達予定日を返すAPI（店舗カレンダー用） 例: /api/v1/delivery_dates?begin=2025-06-01&end=2025-06-30",
+    tags=["util"]
+)
+@log_decorator
+async def get_delivery_date_range(
+    begin: date = Query(..., description="開始日（YYYY-MM-DD）"),
+    end: date = Query(..., description="終了日（YYYY-MM-DD）")
+):
+    """
+    指定期間の注文日ごとの配達予定日を返すAPI。前計算したカレンダーを引くだけなので1回の呼び出しで済む。
+    """
+    if end < begin:
+        raise HTTPException(status_code=400, detail="end は begin 以降の日付を指定してください")
+    if (end - begin).days + 1 > DELIVERY_DATE_RANGE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"期間は{DELIVERY_DATE_RANGE_MAX_DAYS}日以内で指定してください")
+
+    return {
+        "begin": begin.strftime("%Y-%m-%d"),
+        "end": end.strftime("%Y-%m-%d"),
+        "dates": [
+            {
+                "order_date": order_date.strftime("%Y-%m-%d"),
+                "delivery_date": delivery_date.strftime("%Y-%m-%d"),
+                "delivery_weekday": delivery_date.weekday()  # 0: 月曜日 ～ 6: 日曜日
+            }
+            for order_date, delivery_date in get_delivery_dates(begin, end)
+        ]
+    }
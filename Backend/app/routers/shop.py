@@ -2,11 +2,13 @@
 # ../shop/4になる
 # 引数が固定順(パスパラメータが無い順)に並べている
 '''
-    1. order_json_me(request: Request, days_ago: str = Query("0")):
-    2. order_json_by_id(request: Request, shop_id: str, days_ago: str = Query("0")):
-    3. shop_view(request: Request, response: Response, shop_id: int):
+    1. order_json_me(request: Request, days_ago: str = Query("0"), format: str = Query("json"), stream: bool = Query(False)):
+    2. order_json_by_id(request: Request, shop_id: str, days_ago: str = Query("0"), format: str = Query("json"), stream: bool = Query(False)):
+    3. shop_view(request: Request, response: Response, shop_id: int, limit: int = Query(ORDER_PAGE_SIZE), cursor: str = Query(None)):
     4. get_shop_context(request: Request, orders):
     5. shop_summary_bridge(shop_id: int):
+    6. order_event_stream(request: Request, shop_id: int):  ※Server-Sent Events
+    7. order_check_socket(websocket: WebSocket, shop_id: int):  ※WebSocket
 '''
 from fastapi import HTTPException, Query, Request, Response, APIRouter, status
 from fastapi.responses import HTMLResponse
@@ -16,7 +18,7 @@ from utils.helper import redirect_login_failure, redirect_unauthorized
 from utils.decorator import log_decorator
 from utils.permission_helper import check_permission
 
-from models.order import select_orders_by_shop_all
+from models.order import OrderFilter, ORDER_PAGE_SIZE, ORDER_PAGE_SIZE_MAX
 
 from database.local_postgresql_database import endpoint, default_shop_name
 
@@ -43,27 +45,38 @@ from models.user import select_user_by_id
     include_in_schema=False
 )
 @log_decorator
-async def order_json_me(request: Request, days_ago: str = Query("0")):
-    return await get_order_json(request, days_ago)
+async def order_json_me(
+    request: Request,
+    days_ago: str = Query("0"),
+    format: str = Query("json", description="json または ndjson（1行1注文）"),
+    stream: bool = Query(False, description="True の場合、サーバーサイドカーソルで読みながら返す")
+):
+    return await get_order_json(request, days_ago, format=format, stream=stream)
 
 
 # JSON注文情報を取得する
 @shop_router.get(
     "/{shop_id:int}/order_json",
     summary="JSON注文情報を取得する：指定店舗ユーザー",
-    description="shop_idとdays_agoに基づいて注文情報をJSON形式で返す。",
+    description="shop_idとdays_agoに基づいて注文情報をJSON形式で返す。format=ndjson または stream=true の場合は、created_atの降順でストリーミング応答する。",
     response_class=HTMLResponse,
     tags=["shop"]
 )
 @log_decorator
-async def order_json_by_id(request: Request, shop_id: int, days_ago: str = Query("0")):
+async def order_json_by_id(
+    request: Request,
+    shop_id: int,
+    days_ago: str = Query("0"),
+    format: str = Query("json", description="json または ndjson（1行1注文）"),
+    stream: bool = Query(False, description="True の場合、サーバーサイドカーソルで読みながら返す")
+):
     try:
         # user_info = await select_user_by_id(int(shop_id))
         user_info = await select_user_by_id(shop_id)
         if user_info is None:
             raise HTTPException(status_code=404, detail="店舗ユーザーが見つかりません")
 
-        return await get_order_json(request, days_ago, shop_code=user_info.username)
+        return await get_order_json(request, days_ago, shop_code=user_info.username, format=format, stream=stream)
 
     except HTTPException as e:
         logger.exception(f"order_json - HTTPException: {e.detail}")
@@ -77,17 +90,23 @@ async def order_json_by_id(request: Request, shop_id: int, days_ago: str = Query
 
 
 from models.user import select_user_by_id
-from services.order_view import order_table_view
+from services.order_view import order_table_view, get_order_page
 
 # 店舗メイン画面
 @shop_router.get(
     "/{shop_id:int}",
     summary="メイン画面：店舗ユーザー",
-    description="shop_id設定よりorder_table_view()を表示する。",
+    description="shop_id設定よりorder_table_view()を表示する。注文は新しい順に limit 件ずつ、cursor でページ送りする。",
     response_class=HTMLResponse,
     tags=["shop"])
 @log_decorator
-async def shop_view(request: Request, response: Response, shop_id: int):
+async def shop_view(
+    request: Request,
+    response: Response,
+    shop_id: int,
+    limit: int = Query(ORDER_PAGE_SIZE, ge=1, le=ORDER_PAGE_SIZE_MAX, description="1ページの件数"),
+    cursor: str = Query(None, description="次ページのカーソル")
+):
     try:
         # 🚨 不正なID防御（Noneや非数値チェック）
         if not shop_id:
@@ -107,20 +126,23 @@ async def shop_view(request: Request, response: Response, shop_id: int):
         # username（shop01）を取得
         shop_code = user_info.username
 
-        orders = await select_orders_by_shop_all(shop_code)
+        spec = OrderFilter("shop", shop_code)
+        orders, page_context = await get_order_page(spec, limit, cursor)
         if orders is None:
             logger.debug('shop_view - 注文がありません')
             return HTMLResponse("<html><p>注文は0件です</p></html>")
 
 
         shop_context = await get_shop_context(request, orders)
+        shop_context.update(page_context)
 
         # username（shop01）を取得
         shop_code = user_info.username
 
         shop_context.update({"username": shop_code, "shop_id": shop_id})
 
-        return await order_table_view(request, response, orders, "shop.html", shop_context)
+        # 会社別・チェック済みの件数は、ページ送りの全体を SQL で集計する（行は表示する分だけ取得）
+        return await order_table_view(request, response, orders, "shop.html", shop_context, spec)
 
     except HTTPException as e:
         logger.exception(f"HTTPException: {e.detail}")
@@ -174,3 +196,88 @@ from routers.order import get_orders_summary_by_shop
 async def shop_summary_bridge(shop_id: int):
     # 注意：ここは更にリダイレクトしている
     return await get_orders_summary_by_shop(shop_id)
+
+
+from utils.order_events import OrderEventStreamResponse, OrderStreamBusy, order_event_bus
+
+# 注文のリアルタイム配信（Server-Sent Events）
+@shop_router.get(
+    "/{shop_id:int}/orders/stream",
+    summary="注文のリアルタイム配信：店舗ユーザー",
+    description="店舗の注文の追加(order_created)・キャンセル(order_canceled)・チェック(order_checked)を text/event-stream で配信する。"
+                "再接続時は Last-Event-ID 以降を再送し、再送できない場合は resync を送る。",
+    tags=["shop"]
+)
+async def order_event_stream(request: Request, shop_id: int):
+    # 注意：接続中ずっと続くため @log_decorator は付けない。DB は最初の店舗確認でのみ使う
+    if await check_permission(request, [10]) == False:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="店舗ユーザー権限がありません。")
+
+    user_info = await select_user_by_id(shop_id)
+    if user_info is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="店舗ユーザーが見つかりません")
+
+    # 応答ヘッダー（200）を送る前に購読する。上限ならここで 503 を返す（解除は応答の終了時）
+    try:
+        subscription = order_event_bus.subscribe(user_info.username, request.headers.get("last-event-id"))
+    except OrderStreamBusy:
+        logger.warning(f"order_event_stream - 接続数が上限です shop_id: {shop_id}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="接続が混み合っています。しばらくしてから再度お試しください。"
+        )
+
+    return OrderEventStreamResponse(subscription)
+
+
+import asyncio
+import json
+from fastapi import WebSocket, WebSocketDisconnect
+from utils.check_coalescer import check_coalescer
+
+# 注文チェックの即時保存（WebSocket）
+# 受信: {"order_id": 1, "checked": true, "seq": 12}
+# 送信: {"type": "ack", "order_id": 1, "ok": true, "checked": true, "seq": 12}（書き込み後に、確定した状態を返す）
+@shop_router.websocket("/{shop_id:int}/orders/checks")
+async def order_check_socket(websocket: WebSocket, shop_id: int):
+    try:
+        if await check_permission(websocket, [10]) == False:
+            await websocket.close(code=1008)
+            return
+        user_info = await select_user_by_id(shop_id)
+    except HTTPException as e:
+        logger.warning(f"order_check_socket - {e.detail}")
+        await websocket.close(code=1008)
+        return
+    if user_info is None:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    shop_code = user_info.username
+    # ack は書き込みのタイミングで届くため、送信は1つのタスクにまとめる
+    replies: asyncio.Queue = asyncio.Queue()
+
+    async def send_replies():
+        while True:
+            await websocket.send_json(await replies.get())
+
+    sender = asyncio.create_task(send_replies())
+    try:
+        while True:
+            text = await websocket.receive_text()
+            message = None
+            try:
+                message = json.loads(text)
+                order_id, checked = message["order_id"], message["checked"]
+                if not isinstance(order_id, int) or not isinstance(checked, bool):
+                    raise ValueError
+            except (ValueError, KeyError, TypeError):
+                seq = message.get("seq") if isinstance(message, dict) else None
+                replies.put_nowait({"type": "error", "error": "order_id（整数）と checked（true/false）が必要です", "seq": seq})
+                continue
+            check_coalescer.submit(shop_code, order_id, checked, replies, message.get("seq"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
@@ -6,7 +6,7 @@
     3. show_order_cancel_form(request: Request, user_id: int):
     4. submit_order_cancel_form(request: Request, user_id: int, order_ids: str = Form(...)):
     5. cancel_complete(request: Request, response: Response, user_id: str):
-    6. view_my_order_history(request: Request, user_id: int, db: AsyncSession = Depends(get_db)):
+    6. view_my_order_history(request: Request, user_id: int, limit: int = Query(ORDER_PAGE_SIZE), cursor: str = Query(None), db: AsyncSession = Depends(get_db)):
     7. redirect_to_order_history(request: Request):
 '''
 from fastapi import Request, Response, APIRouter
@@ -77,6 +77,8 @@ async def regist_complete(request: Request, response: Response, user_id: str):
         set_last_order(response, last_order_date)  # ここで注文の重複を防止
 
         user_context = await get_user_context(request, orders, int(user.get_id()))
+        # 表示は新しい順（ページ送りの一覧は SQL で並べ替え済み）
+        orders.sort(key=lambda x: x.order_id, reverse=True)
 
         return await order_table_view(request, response, orders, "order_complete.html", user_context)
 
@@ -273,9 +275,11 @@ async def cancel_complete(request: Request, response: Response, user_id: str):
 
 from database.local_postgresql_database import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
-from models.order import select_orders_by_user_all
+from fastapi import Query
+from models.order import OrderFilter, ORDER_PAGE_SIZE, ORDER_PAGE_SIZE_MAX
 from models.user import select_user
-from core.security import decode_jwt_token
+from services.order_view import get_order_page
+from utils.token_cache import decode_jwt_token_cached
 from utils.helper import redirect_login_failure
 
 from fastapi import Response
@@ -289,7 +293,11 @@ from fastapi import Response
     tags=["user : order history"])
 @log_decorator
 async def view_my_order_history(
-    request: Request, user_id: int, db: AsyncSession = Depends(get_db)):
+    request: Request,
+    user_id: int,
+    limit: int = Query(ORDER_PAGE_SIZE, ge=1, le=ORDER_PAGE_SIZE_MAX, description="1ページの件数"),
+    cursor: str = Query(None, description="次ページのカーソル"),
+    db: AsyncSession = Depends(get_db)):
     # https://localhost:8000/user/1/order/history
     try:
         logger.debug("=== view_my_order_history 開始 ===")
@@ -297,7 +305,7 @@ async def view_my_order_history(
         if not token:
             return redirect_login_failure(request, "ログインが必要です")
         logger.debug("token 取得成功")
-        payload = decode_jwt_token(token)
+        payload = decode_jwt_token_cached(token)
         username = payload["sub"]
         logger.debug("username 取得成功")
 
@@ -305,7 +313,7 @@ async def view_my_order_history(
         if user is None:
             return redirect_login_failure(request, "ユーザー情報が取得できません")
 
-        orders = await select_orders_by_user_all(username)
+        orders, page_context = await get_order_page(OrderFilter("user", username), limit, cursor)
         if not orders:
             logger.info("注文履歴がありません")
             return templates.TemplateResponse("no_orders.html", {
@@ -326,6 +334,7 @@ async def view_my_order_history(
         from routers.user import get_user_context
         user_context = await get_user_context(request, orders, user.get_id())
         user_context['name'] = user.get_name()
+        user_context.update(page_context)
         
         logger.info(f"user_contextの取得に成功しました{user_context=}")
 
@@ -352,7 +361,7 @@ async def redirect_to_order_history(request: Request):
         if not token:
             return redirect_login_failure(request, "ログインが必要です")
 
-        payload = decode_jwt_token(token)
+        payload = decode_jwt_token_cached(token)
         username = payload["sub"]
         logger.debug(f"username取得成功: {username}")
 
@@ -1,8 +1,10 @@
 # services/order_view.py
 '''
-    1. order_table_view(request: Request, response: Response):
-    2. get_order_json(request: Request, days_ago: str = Query(None)):
-    3. batch_update_orders(updates: list[dict]):
+    1. order_table_view(request: Request, response: Response, orders, redirect_url: str, context: dict, spec: Optional[OrderFilter] = None):
+    2. get_order_page(spec: OrderFilter, limit: int, cursor: Optional[str]):
+    3. get_order_json(request: Request, days_ago: str = Query(None), shop_code: str = None, format: str = "json", stream: bool = False):
+    4. stream_order_json(shop_name: str, days_ago: int, format: str) -> Response:
+    5. batch_update_orders(updates: list[dict]):
 '''
 from fastapi import HTTPException, APIRouter, Query, Request, Response, status
 from utils.cookie_helper import get_all_cookies
@@ -17,26 +19,32 @@ templates = Jinja2Templates(directory="templates")
 
 from venv import logger
 
-from collections import Counter
+from typing import Optional
+from models.order import OrderFilter, select_order_counts
 
 # 注文一覧テーブル表示
+# orders は表示する行（select_orders_page() の1ページ分。新しい順）。
+# spec を渡すと、会社別の件数・チェック済みの件数を、ページ送りの全体について SQL の GROUP BY で集計する。
 @log_decorator
-async def order_table_view(request: Request, response: Response, orders, redirect_url: str, context: dict):
+async def order_table_view(request: Request, response: Response, orders, redirect_url: str, context: dict,
+                           spec: Optional[OrderFilter] = None):
     try:
         # デバッグ出力追加
         # req_in_context = context.get("request", None)
         # print(f"context['request']: {req_in_context}")
         # print(f"type(context['request']): {type(req_in_context)}")
 
-        # ordersリストをin-placeで降順にソート
-        orders.sort(key=lambda x: x.order_id, reverse=True)
-
-        # チェック済み注文の件数をカウント
-        checked_count = sum(1 for order in orders if order.checked)
-
-        # 会社別注文件数を集計
-        company_counts = Counter(order.company_name for order in orders)
-        aggregated_orders = [[company, count] for company, count in company_counts.items()]
+        if spec is not None:
+            counts = await select_order_counts(spec)
+            if counts is None:
+                logger.warning(f"order_table_view - 件数の集計に失敗しました: {spec}")
+            else:
+                # 件数はページ送りの全体（order_count も表示中の件数ではなく全体にそろえる）
+                context.update({
+                    'order_count': counts.order_count,
+                    'checked_count': counts.checked_count,
+                    'aggregated_orders': [[company, count] for company, count in counts.by_company],
+                })
 
         # logger.debug(f"orders.model_dump(): {orders[0].model_dump()=}")
         if orders:
@@ -53,11 +61,8 @@ async def order_table_view(request: Request, response: Response, orders, redirec
             context.update({'username': current_username})
         # ★ ここまで追加修正
 
-        # コンテキスト更新
-        context.update({
-            'checked_count': checked_count,
-            'aggregated_orders': aggregated_orders,
-        })
+        context.setdefault('checked_count', 0)
+        context.setdefault('aggregated_orders', [])
         context["request"] = request
         
         # テンプレート応答作成
@@ -80,6 +85,39 @@ async def order_table_view(request: Request, response: Response, orders, redirec
 
 
 
+from models.order import (
+    select_orders_page,
+    encode_order_cursor, decode_order_cursor
+)
+
+# 注文一覧のページ取得（HTML画面用）
+@log_decorator
+async def get_order_page(spec: OrderFilter, limit: int, cursor: Optional[str]):
+    """
+    spec に該当する注文を新しい順に1ページ分取得し、
+    (orders, ページ送り用コンテキスト) を返します。
+    cursor が不正な場合は先頭ページを返します。DBエラー時の orders は None です。
+    """
+    cursor_key = None
+    if cursor:
+        try:
+            cursor_key = decode_order_cursor(cursor)
+        except ValueError:
+            logger.warning(f"get_order_page - 不正なカーソルのため先頭ページを表示します: {cursor}")
+            cursor = None
+
+    page = await select_orders_page(spec._replace(cursor=cursor_key), limit)
+    if page is None:
+        return None, {}
+
+    page_context = {
+        "page_limit": limit,
+        "cursor": cursor,
+        "next_cursor": encode_order_cursor(page.next_cursor),
+    }
+    return page.orders, page_context
+
+
 import json
 from fastapi.responses import JSONResponse
 from models.order import select_orders_by_shop_ago
@@ -87,7 +125,12 @@ from models.user import select_user
 from database.local_postgresql_database import AsyncSessionLocal
 
 @log_decorator
-async def get_order_json(request: Request, days_ago: str = Query(None), shop_code: str = None):
+async def get_order_json(request: Request, days_ago: str = Query(None), shop_code: str = None,
+                         format: str = "json", stream: bool = False):
+    """
+    店舗の注文を created_at の降順でJSONとして返します。
+    format="ndjson" または stream=True の場合は stream_order_json() でストリーミング応答します。
+    """
     try:
         # shop_code が指定されていればそれを使う（管理者・店舗ユーザーからのアクセス想定）
         if shop_code:
@@ -119,6 +162,13 @@ async def get_order_json(request: Request, days_ago: str = Query(None), shop_cod
             logger.debug(f"---days_ago: {days_ago_int=}")
         # -----------------------------------
 
+        if format not in ORDER_JSON_FORMATS:
+            logger.debug(f"format の値が無効です: {format}")
+            return JSONResponse({"error": "format の値が無効です"}, status_code=400)
+
+        if stream or format == "ndjson":
+            return await stream_order_json(shop_name, days_ago_int, format)
+
         # 履歴取得処理
         orders = await select_orders_by_shop_ago(shop_name, days_ago_int)
 
@@ -135,6 +185,58 @@ async def get_order_json(request: Request, days_ago: str = Query(None), shop_cod
     else:
         return JSONResponse(content=orders_json, media_type="application/json; charset=utf-8")
 
+
+from datetime import datetime, time, timedelta
+from fastapi.responses import StreamingResponse
+from models.order import stream_orders
+
+ORDER_JSON_FORMATS = ("json", "ndjson")
+
+@log_decorator
+async def stream_order_json(shop_name: str, days_ago: int, format: str):
+    """
+    店舗の days_ago 日前から本日までの注文を、サーバーサイドカーソルで読みながら
+    created_at の降順でストリーミング応答します。
+    format="ndjson" は1行1注文、format="json" はチャンク転送のJSON配列です。
+    全件をメモリに載せないため、期間が長くてもメモリ使用量は一定です。
+    送信開始後にDBエラーが起きた場合は、閉じ括弧を送らずに応答を中断します（途中までの結果を完全な応答に見せない）。
+    """
+    today = datetime.now().date()
+    spec = OrderFilter(
+        "shop", shop_name,
+        datetime.combine(today - timedelta(days=days_ago), time.min),
+        datetime.combine(today, time.max),
+        newest_first=True
+    )
+    orders = stream_orders(spec)
+
+    # 先頭の1件で0件かどうか・DBエラーかを判定する（ヘッダー送信後はステータスを変えられないため）
+    try:
+        first = await anext(orders, None)
+    except Exception as e:
+        logger.warning(f"stream_order_json Error: {str(e)=}")
+        return JSONResponse({"error": f"エラーが発生しました: {str(e)}"}, status_code=500)
+    if first is None:
+        await orders.aclose()
+        logger.info("No orders found.")
+        return JSONResponse({"message": "注文が見つかりません。"}, status_code=404)
+
+    if format == "ndjson":
+        async def body():
+            yield first.model_dump_json() + "\n"
+            async for order in orders:
+                yield order.model_dump_json() + "\n"
+
+        return StreamingResponse(body(), media_type="application/x-ndjson; charset=utf-8")
+
+    async def body():
+        yield "[" + first.model_dump_json()
+        async for order in orders:
+            yield "," + order.model_dump_json()
+        yield "]"
+
+    return StreamingResponse(body(), media_type="application/json; charset=utf-8")
+
 # @log_decorator
 # async def get_order_json(request: Request, days_ago: str = Query(None)):
 #     try:
@@ -184,46 +286,18 @@ async def get_order_json(request: Request, days_ago: str = Query(None), shop_cod
 #         # return JSONResponse(content=json.loads(orders_json), media_type="application/json; charset=utf-8")
 #         return JSONResponse(content=orders_json, media_type="application/json; charset=utf-8")
 
-from sqlalchemy import update
-from sqlalchemy.exc import IntegrityError, OperationalError, SQLAlchemyError
-from models.order import Order
 from fastapi import HTTPException, status
+from models.order import update_orders_checked
 
 @log_decorator
 async def batch_update_orders(updates: list[dict]):
     """
-    複数の注文キャンセル状態を一括更新。
-    失敗した注文も記録しつつ、処理を継続します。
+    複数の注文のチェック状態を一括更新（checked の値ごとに1文の UPDATE）。
+    失敗した注文（存在しない order_id を含む）も記録しつつ、処理を継続します。
+    更新できた注文は、update_orders_checked() が店舗の注文ストリーム（order_checked）へ配信します。
     """
-    failed_updates = []
-
     try:
-        async with AsyncSessionLocal() as session:
-            for update_data in updates:
-                stmt = (
-                    update(Order)
-                    .where(Order.order_id == update_data["order_id"])
-                    .values(checked=update_data["checked"])
-                )
-                try:
-                    await session.execute(stmt)
-
-                except (IntegrityError, OperationalError, SQLAlchemyError) as db_err:
-                    logger.exception(f"注文ID {update_data['order_id']} の更新失敗: {db_err}")
-                    failed_updates.append(update_data['order_id'])
-                except Exception as ex:
-                    logger.exception(f"注文ID {update_data['order_id']} で予期せぬエラー: {ex}")
-                    failed_updates.append(update_data['order_id'])
-
-            try:
-                await session.commit()
-            except Exception as commit_err:
-                await session.rollback()
-                logger.exception(f"コミット失敗: {commit_err}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"コミット処理中にエラーが発生しました: {str(commit_err)}"
-                )
+        _, failed_updates = await update_orders_checked(updates)
 
         if failed_updates:
             logger.warning(f"一部注文の更新に失敗しました: {failed_updates}")
@@ -0,0 +1,91 @@
+# tests/test_check_coalescer.py
+# 実行方法
+# pytest -s tests/test_check_coalescer.py
+
+import asyncio
+
+from utils.check_coalescer import CheckCoalescer
+
+
+class FakeWriter:
+    """models.order.set_orders_checked の代わり。呼ばれた内容を記録し、known の注文だけコミットしたことにする"""
+
+    def __init__(self, known=(1, 2, 3), fail=False, delay=0.0):
+        self.known = set(known)
+        self.fail = fail
+        self.delay = delay
+        self.calls = []
+
+    async def __call__(self, shop_name, checked_by_id):
+        self.calls.append((shop_name, dict(checked_by_id)))
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            return None
+        return {oid: checked for oid, checked in checked_by_id.items() if oid in self.known}
+
+
+def drain(queue: asyncio.Queue) -> list:
+    return [queue.get_nowait() for _ in range(queue.qsize())]
+
+
+# ----------------------------------------------------------
+# 📌 同じ注文の付け外しは最後の状態だけを、店舗ごとに1回で書き込み、ack を返すこと
+# ----------------------------------------------------------
+def test_toggles_are_coalesced_into_one_write():
+    async def run():
+        writer = FakeWriter()
+        coalescer = CheckCoalescer(writer, flush_ms=20)
+        replies = asyncio.Queue()
+
+        coalescer.submit("shop01", 1, True, replies, seq=1)
+        coalescer.submit("shop01", 1, False, replies, seq=2)
+        coalescer.submit("shop01", 1, True, replies, seq=3)
+        coalescer.submit("shop01", 2, True, replies, seq=4)
+        coalescer.submit("shop01", 99, True, replies, seq=5)
+        assert writer.calls == []  # まだ書き込まない
+
+        await asyncio.sleep(0.05)
+        assert writer.calls == [("shop01", {1: True, 2: True, 99: True})]
+
+        acks = drain(replies)
+        assert [(a["order_id"], a["seq"], a["ok"]) for a in acks] == [(1, 1, True), (1, 2, True), (1, 3, True), (2, 4, True), (99, 5, False)]
+        assert acks[2]["checked"] is True  # 途中の変更にも、確定した状態を返す
+        assert coalescer.stats()["coalesced"] == 2 and coalescer.stats()["pending"] == 0
+
+    asyncio.run(run())
+
+
+# ----------------------------------------------------------
+# 📌 書き込み中に来た変更は、前の書き込みが終わってから次の1回で書くこと
+# ----------------------------------------------------------
+def test_writes_are_serialized():
+    async def run():
+        writer = FakeWriter(delay=0.05)
+        coalescer = CheckCoalescer(writer, flush_ms=10)
+        replies = asyncio.Queue()
+
+        coalescer.submit("shop01", 1, True, replies, seq=1)
+        await asyncio.sleep(0.03)  # 1回目の書き込み中
+        coalescer.submit("shop01", 1, False, replies, seq=2)
+        coalescer.submit("shop02", 3, True, replies, seq=3)
+        await asyncio.sleep(0.15)
+
+        assert writer.calls == [("shop01", {1: True}), ("shop01", {1: False}), ("shop02", {3: True})]
+        assert [a["checked"] for a in drain(replies)] == [True, False, True]
+
+    asyncio.run(run())
+
+
+# ----------------------------------------------------------
+# 📌 書き込みに失敗したら ok=False の ack を返すこと
+# ----------------------------------------------------------
+def test_failed_write_is_acked():
+    async def run():
+        coalescer = CheckCoalescer(FakeWriter(fail=True), flush_ms=10)
+        replies = asyncio.Queue()
+        coalescer.submit("shop01", 1, True, replies, seq=1)
+        await coalescer.flush()
+        assert drain(replies) == [{"type": "ack", "order_id": 1, "ok": False, "error": "保存に失敗しました", "seq": 1}]
+        assert coalescer.stats()["failed"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,78 @@
+# tests/test_delivery_calendar.py
+# 実行方法
+# pytest -s tests/test_delivery_calendar.py
+
+from datetime import date, timedelta
+
+from config.config_loader import (
+    build_delivery_calendar, walk_delivery_date,
+    get_delivery_date, get_delivery_dates
+)
+
+
+# 2025年6月：2日(月) 3日(火) 4日(水) 5日(木) 6日(金) 7日(土) 8日(日) 9日(月)
+NO_HOLIDAYS_2025 = {"2025/1/1": "元日"}
+
+
+# ----------------------------------------------------------
+# 📌 曜日ごとの配達予定日（月→火、火→水、水・木→金、金→土、土・日→月）
+# ----------------------------------------------------------
+def test_weekday_mapping():
+    build_delivery_calendar(NO_HOLIDAYS_2025)
+    try:
+        assert get_delivery_date(date(2025, 6, 2)) == date(2025, 6, 3)
+        assert get_delivery_date(date(2025, 6, 3)) == date(2025, 6, 4)
+        assert get_delivery_date(date(2025, 6, 4)) == date(2025, 6, 6)
+        assert get_delivery_date(date(2025, 6, 5)) == date(2025, 6, 6)
+        assert get_delivery_date(date(2025, 6, 6)) == date(2025, 6, 7)
+        assert get_delivery_date(date(2025, 6, 7)) == date(2025, 6, 9)
+        assert get_delivery_date(date(2025, 6, 8)) == date(2025, 6, 9)
+    finally:
+        build_delivery_calendar()
+
+
+# ----------------------------------------------------------
+# 📌 配達予定日が祝日なら、翌日の曜日から求め直すこと（渡した祝日マップを使う）
+# ----------------------------------------------------------
+def test_holiday_on_delivery_day():
+    build_delivery_calendar({"2025/6/3": "臨時休業"})
+    try:
+        # 火(祝) → 翌日の水から → 金
+        assert get_delivery_date(date(2025, 6, 2)) == date(2025, 6, 6)
+        # 祝日でない日は曜日どおり
+        assert get_delivery_date(date(2025, 6, 5)) == date(2025, 6, 6)
+    finally:
+        build_delivery_calendar()
+
+
+# ----------------------------------------------------------
+# 📌 祝日が続く場合（2025年の大型連休 5/3(土)～5/6(火)）
+# ----------------------------------------------------------
+def test_consecutive_holidays():
+    holidays = {"2025/5/3": "憲法記念日", "2025/5/4": "みどりの日", "2025/5/5": "こどもの日", "2025/5/6": "休日"}
+    build_delivery_calendar(holidays)
+    try:
+        # 金 → 土(祝) → 日から → 月(祝) → 火(祝)から → 水
+        assert get_delivery_date(date(2025, 5, 2)) == date(2025, 5, 7)
+        assert get_delivery_date(date(2025, 5, 4)) == date(2025, 5, 7)
+        assert walk_delivery_date(date(2025, 5, 2), holidays) == date(2025, 5, 7)
+    finally:
+        build_delivery_calendar()
+
+
+def test_calendar_falls_back_outside_range():
+    calendar = build_delivery_calendar()
+    outside = calendar.last_date + timedelta(days=30)
+    assert get_delivery_date(outside) == walk_delivery_date(outside)
+
+
+# ----------------------------------------------------------
+# 📌 範囲取得：begin～end の全日付を順に返すこと
+# ----------------------------------------------------------
+def test_get_delivery_dates_range():
+    begin, end = date(2025, 6, 1), date(2025, 6, 30)
+    pairs = get_delivery_dates(begin, end)
+
+    assert len(pairs) == 30
+    assert pairs[0][0] == begin and pairs[-1][0] == end
+    assert all(delivery == get_delivery_date(order) for order, delivery in pairs)
@@ -0,0 +1,49 @@
+# tests/test_log_queue.py
+# 実行方法
+# pytest -s tests/test_log_queue.py
+
+import logging
+import queue
+
+import pytest
+
+from log_unified import BoundedQueueHandler
+
+
+def make_record(msg: str) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 0, msg, None, None)
+
+
+def drain(log_queue: queue.Queue) -> list:
+    messages = []
+    while not log_queue.empty():
+        messages.append(log_queue.get_nowait().getMessage())
+    return messages
+
+
+# ----------------------------------------------------------
+# 📌 キューがあふれたときの方針
+# ----------------------------------------------------------
+def test_drop_new_keeps_oldest():
+    log_queue = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(log_queue, "drop_new")
+    for i in range(4):
+        handler.handle(make_record(f"m{i}"))
+
+    assert drain(log_queue) == ["m0", "m1"]
+    assert handler.dropped == 2
+
+
+def test_drop_old_keeps_newest():
+    log_queue = queue.Queue(maxsize=2)
+    handler = BoundedQueueHandler(log_queue, "drop_old")
+    for i in range(4):
+        handler.handle(make_record(f"m{i}"))
+
+    assert drain(log_queue) == ["m2", "m3"]
+    assert handler.dropped == 2
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        BoundedQueueHandler(queue.Queue(maxsize=1), "ignore")
@@ -0,0 +1,63 @@
+# tests/test_log_reader.py
+# 実行方法
+# pytest -s tests/test_log_reader.py
+
+import pytest
+from fastapi import HTTPException
+
+from utils.log_reader import find_tail_offset, iter_log_html, resolve_log_path
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_bytes("".join(f"line {i} <b>\n" for i in range(100)).encode("utf-8"))
+    return path
+
+
+def render(path, **kwargs) -> str:
+    return "".join(iter_log_html(str(path), "app.log", "/api/v1/log_html/app.log", **kwargs))
+
+
+# ----------------------------------------------------------
+# 📌 末尾 N 行の開始位置（ブロックをまたいでも数えられること）
+# ----------------------------------------------------------
+def test_find_tail_offset(log_file, monkeypatch):
+    monkeypatch.setattr("utils.log_reader.LOG_VIEW_CHUNK_BYTES", 7)
+    with open(log_file, "rb") as f:
+        f.seek(find_tail_offset(f, 3))
+        assert f.read().decode().splitlines() == ["line 97 <b>", "line 98 <b>", "line 99 <b>"]
+        assert find_tail_offset(f, 1000) == 0
+
+
+# ----------------------------------------------------------
+# 📌 行単位・バイト単位のページ送りとエスケープ
+# ----------------------------------------------------------
+def test_line_paging_and_escape(log_file):
+    body = render(log_file, offset=10, limit=2)
+    assert "line 10 &lt;b&gt;\nline 11 &lt;b&gt;\n</pre>" in body
+    assert "line 9 " not in body and "line 12 " not in body
+    assert "offset=12&amp;limit=2&amp;unit=line" in body
+
+
+def test_byte_paging_keeps_whole_lines(log_file):
+    body = render(log_file, offset=5, limit=20, unit="byte")
+    # offset=5 は1行目の途中なので2行目から、20バイトを超えた行の終わりまで
+    assert "<pre>line 1 &lt;b&gt;\nline 2 &lt;b&gt;\n</pre>" in body
+
+
+def test_tail(log_file):
+    body = render(log_file, tail=2)
+    assert "<pre>line 98 &lt;b&gt;\nline 99 &lt;b&gt;\n</pre>" in body
+    assert "次へ" not in body
+
+
+# ----------------------------------------------------------
+# 📌 ディレクトリ外のファイルは 404
+# ----------------------------------------------------------
+def test_resolve_log_path_rejects_traversal(log_file):
+    assert resolve_log_path(str(log_file.parent), "app.log") == str(log_file)
+    for name in ("../app.log", "..", "missing.log"):
+        with pytest.raises(HTTPException) as e:
+            resolve_log_path(str(log_file.parent), name)
+        assert e.value.status_code == 404
@@ -0,0 +1,54 @@
+# tests/test_memory_trace.py
+# 実行方法
+# pytest -s tests/test_memory_trace.py
+
+import tracemalloc
+
+import pytest
+
+from utils.memory_trace import (
+    diff_snapshots, get_tracing_status, start_tracing, stop_tracing, take_snapshot
+)
+
+
+@pytest.fixture(autouse=True)
+def stop_after_test():
+    yield
+    stop_tracing()
+
+
+# ----------------------------------------------------------
+# 📌 開始 → スナップショット2つ → 差分に確保した行が出ること
+# ----------------------------------------------------------
+def test_snapshot_diff_finds_growth():
+    assert not tracemalloc.is_tracing()
+    start_tracing(frames=5)
+    take_snapshot("before")
+    retained = [bytearray(1024) for _ in range(2000)]  # 約2MB
+    take_snapshot("after")
+
+    diff = diff_snapshots("before", "after", top=5, key_type="traceback")
+    assert diff["total_diff_kib"] > 1500
+    assert __file__ in diff["top"][0]["location"]
+    assert diff["top"][0]["traceback"]
+    assert [s["name"] for s in get_tracing_status()["snapshots"]] == ["before", "after"]
+    del retained
+
+
+def test_errors():
+    with pytest.raises(RuntimeError):
+        take_snapshot("not_started")
+
+    start_tracing()
+    with pytest.raises(KeyError):
+        diff_snapshots("missing", "missing")
+    with pytest.raises(ValueError):
+        start_tracing(frames=0)
+
+
+def test_stop_clears_snapshots():
+    start_tracing()
+    take_snapshot("one")
+    status = stop_tracing()
+    assert status["tracing"] is False
+    assert status["snapshots"] == []
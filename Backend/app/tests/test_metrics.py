@@ -0,0 +1,44 @@
+# tests/test_metrics.py
+# 実行方法
+# pytest -s tests/test_metrics.py
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from utils.metrics import MetricsMiddleware, ORDERS_INSERTED, instrument_pool, render_metrics
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        return {"item_id": item_id}
+
+    return app
+
+
+# ----------------------------------------------------------
+# 📌 ルートはパステンプレートで集計され、カウンターが出力されること
+# ----------------------------------------------------------
+@pytest.mark.asyncio
+async def test_metrics_by_route_template():
+    engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=2)
+    instrument_pool(engine)
+    ORDERS_INSERTED.inc()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=make_app()), base_url="http://test") as client:
+        for item_id in range(3):
+            assert (await client.get(f"/items/{item_id}")).status_code == 200
+        assert (await client.get("/missing")).status_code == 404
+
+    text = render_metrics(engine)
+    assert 'obento_http_request_duration_seconds_count{method="GET",route="/items/{item_id}"} 3' in text
+    assert 'obento_http_requests_total{method="GET",route="unmatched",status="404"} 1' in text
+    assert 'route="/items/0"' not in text
+    assert "obento_db_pool_size 2" in text
+    assert f"obento_orders_inserted_total {ORDERS_INSERTED.value}" in text
@@ -0,0 +1,38 @@
+# tests/test_order_counts.py
+# 実行方法
+# pytest -s tests/test_order_counts.py
+
+from datetime import datetime
+
+from models.order import OrderFilter, get_order_counts_stmt, get_order_stmt
+
+CURSOR = (datetime(2025, 6, 1, 12, 0, 0), 120)
+
+
+# ----------------------------------------------------------
+# 📌 集計は一覧と同じ絞り込みで、会社ごとの GROUP BY 1文になること（LIMIT・カーソルなし）
+# ----------------------------------------------------------
+def test_counts_stmt_groups_by_company_without_paging():
+    spec = OrderFilter("shop", "shop01", limit=101, cursor=CURSOR)
+    stmt, params = get_order_counts_stmt(spec)
+    sql = str(stmt).upper()
+
+    assert "GROUP BY" in sql and "COUNT(*)" in sql
+    assert "LIMIT" not in sql and "CURSOR_ORDER_ID" not in sql
+    assert params == {"key": "shop01"}
+
+    # 一覧の WHERE（店舗）と同じ条件で集計する
+    page_stmt, page_params = get_order_stmt(spec)
+    assert page_params["key"] == params["key"] and "LIMIT" in str(page_stmt).upper()
+
+
+# ----------------------------------------------------------
+# 📌 ページが変わっても、集計の SELECT は同じもの（キャッシュ）を使うこと
+# ----------------------------------------------------------
+def test_counts_stmt_is_shared_across_pages():
+    first, _ = get_order_counts_stmt(OrderFilter("shop", "shop01", limit=101))
+    second, _ = get_order_counts_stmt(OrderFilter("shop", "shop02", limit=51, cursor=CURSOR))
+    assert first is second
+
+    with_checked, _ = get_order_counts_stmt(OrderFilter("shop", "shop01", checked=False))
+    assert with_checked is not first
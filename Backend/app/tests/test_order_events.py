@@ -0,0 +1,123 @@
+# tests/test_order_events.py
+# 実行方法
+# pytest -s tests/test_order_events.py
+
+import asyncio
+import json
+
+import pytest
+from starlette.requests import ClientDisconnect
+
+from utils.order_events import OrderEventBus, OrderEventStreamResponse, iter_order_event_stream
+
+
+def parse(message: str) -> dict:
+    """SSE の1イベント分を {"id", "event", "data"} にする"""
+    fields = dict(line.split(": ", 1) for line in message.strip().split("\n"))
+    fields["data"] = json.loads(fields["data"])
+    return fields
+
+
+# ----------------------------------------------------------
+# 📌 購読中の店舗にだけ届き、再接続時は Last-Event-ID 以降を再送すること
+# ----------------------------------------------------------
+def test_publish_and_replay():
+    async def run():
+        bus = OrderEventBus(queue_size=10, buffer_size=10)
+        shop01 = bus.subscribe("shop01")
+        shop02 = bus.subscribe("shop02")
+
+        first = bus.publish("shop01", "order_created", {"order_id": 1})
+        bus.publish("shop02", "order_created", {"order_id": 2})
+        bus.publish("shop01", "order_checked", {"order_id": 1, "checked": True})
+
+        assert shop01.queue.qsize() == 2 and shop02.queue.qsize() == 1
+        event = parse(shop01.queue.get_nowait().message)
+        assert event["event"] == "order_created" and event["data"] == {"order_id": 1}
+
+        # 1件目まで受け取った接続が切れて、つなぎ直した
+        bus.unsubscribe(shop01)
+        again = bus.subscribe("shop01", last_event_id=event["id"])
+        replayed = [again.queue.get_nowait() for _ in range(again.queue.qsize())]
+        assert [e.type for e in replayed] == ["order_checked"]
+        assert replayed[0].seq > first.seq
+
+        # 別プロセス（再起動前）の ID は再送できない
+        stale = bus.subscribe("shop01", last_event_id="0:1")
+        assert stale.queue.get_nowait().type == "resync"
+        assert bus.stats()["subscribers"] == 3
+
+    asyncio.run(run())
+
+
+# ----------------------------------------------------------
+# 📌 読み出しが追いつかない接続は、溜まった分を捨てて resync になること
+# ----------------------------------------------------------
+def test_slow_subscriber_gets_resync():
+    async def run():
+        bus = OrderEventBus(queue_size=3, buffer_size=3)
+        slow = bus.subscribe("shop01")
+        for order_id in range(5):
+            bus.publish("shop01", "order_created", {"order_id": order_id})
+
+        events = [slow.queue.get_nowait() for _ in range(slow.queue.qsize())]
+        assert events[0].type == "resync" and len(events) <= 3
+
+        # 保持数（3件）を超えて捨てたイベントより前からは再送できない
+        boot_id = parse(events[-1].message)["id"].split(":")[0]
+        late = bus.subscribe("shop01", last_event_id=f"{boot_id}:1")
+        assert late.queue.get_nowait().type == "resync"
+        recent = bus.subscribe("shop01", last_event_id=f"{boot_id}:3")
+        assert [recent.queue.get_nowait().seq for _ in range(recent.queue.qsize())] == [4, 5]
+
+    asyncio.run(run())
+
+
+# ----------------------------------------------------------
+# 📌 ストリーム：retry → イベント → ハートビート、閉じたら購読が外れること
+# ----------------------------------------------------------
+def test_event_stream():
+    async def run():
+        bus = OrderEventBus()
+        stream = iter_order_event_stream(bus.subscribe("shop01"), heartbeat=0.05, max_seconds=0.5, bus=bus)
+        assert bus.stats()["subscribers"] == 1
+        assert (await stream.__anext__()).startswith("retry: ")
+
+        bus.publish("shop01", "order_canceled", {"order_id": 7, "canceled": True})
+        assert parse(await stream.__anext__())["data"] == {"order_id": 7, "canceled": True}
+        assert await stream.__anext__() == ": ping\n\n"
+
+        await stream.aclose()
+        assert bus.stats()["subscribers"] == 0
+
+    asyncio.run(run())
+
+
+# ----------------------------------------------------------
+# 📌 一度も取り出されずに終わった応答でも、購読が外れること
+# ----------------------------------------------------------
+def test_response_unsubscribes_when_stream_never_starts():
+    async def run():
+        bus = OrderEventBus()
+
+        # ヘッダー送信で OSError（ASGI 2.4：切断）
+        async def broken_send(message):
+            raise OSError("connection reset")
+
+        response = OrderEventStreamResponse(bus.subscribe("shop01"), bus=bus)
+        with pytest.raises(ClientDisconnect):
+            await response({"type": "http", "asgi": {"spec_version": "2.4"}}, None, broken_send)
+        assert bus.stats()["subscribers"] == 0
+
+        # ヘッダー送信前に切断（ASGI 2.0：切断の検知でストリームが取り消される）
+        async def slow_send(message):
+            await asyncio.sleep(1)
+
+        async def disconnect():
+            return {"type": "http.disconnect"}
+
+        response = OrderEventStreamResponse(bus.subscribe("shop01"), bus=bus)
+        await response({"type": "http"}, disconnect, slow_send)
+        assert bus.stats()["subscribers"] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+# tests/test_order_log_extractor.py
+# 実行方法
+# pytest -s tests/test_order_log_extractor.py
+
+from utils.order_log_extractor import run_extraction
+
+ORDER = "{date} 10:00:00 - INFO     - ORDER : 注文完了 - order_id:{order_id:>4} - company_id:1, username:user1, shop_name:{shop}, menu_id:1, amount:1\n"
+CANCEL = "{date} 11:00:00 - INFO     - CANCEL: 注文取消 - order_id: {order_id} - username: user1\n"
+
+
+def write_day(tmp_path, date, *lines):
+    (tmp_path / f"{date}.log").write_text("".join(lines), encoding="utf-8")
+
+
+def combined(tmp_path, shop, date):
+    return (tmp_path / f"combined_{shop}_{date}.log").read_text(encoding="utf-8")
+
+
+# ----------------------------------------------------------
+# 📌 1回の読み込みで全店舗分を書き出し、取消行は注文の店舗に入ること
+# ----------------------------------------------------------
+def test_extracts_all_shops_in_one_pass(tmp_path):
+    write_day(tmp_path, "2025-05-01",
+              ORDER.format(date="2025-05-01", order_id=1, shop="shop01"),
+              ORDER.format(date="2025-05-01", order_id=2, shop="shop02"),
+              CANCEL.format(date="2025-05-01", order_id=1))
+    write_day(tmp_path, "2025-05-02", ORDER.format(date="2025-05-02", order_id=3, shop="shop02"))
+
+    result = run_extraction(str(tmp_path), workers=2)
+    assert result["processed_dates"] == ["2025-05-01", "2025-05-02"]
+    assert result["written_files"] == 3
+    assert combined(tmp_path, "shop01", "2025-05-01").splitlines()[1].endswith("order_id: 1 - username: user1")
+    assert "order_id:   3" in combined(tmp_path, "shop02", "2025-05-02")
+
+    # 店舗を指定すると、その店舗だけ
+    result = run_extraction(str(tmp_path), ["shop02"], workers=1)
+    assert result["written_files"] == 2
+
+
+# ----------------------------------------------------------
+# 📌 変更のない日付は読み直さず、変わった日付だけ書き直すこと
+# ----------------------------------------------------------
+def test_only_changed_dates_are_reprocessed(tmp_path):
+    write_day(tmp_path, "2025-05-01", ORDER.format(date="2025-05-01", order_id=1, shop="shop01"))
+    write_day(tmp_path, "2025-05-02", ORDER.format(date="2025-05-02", order_id=2, shop="shop01"))
+    run_extraction(str(tmp_path), workers=1)
+
+    unchanged = run_extraction(str(tmp_path), workers=1)
+    assert unchanged["processed_dates"] == [] and unchanged["read_bytes"] == 0
+
+    # 2025-05-02 の店舗が変わった → shop01 の結合ログは消え、shop03 ができる
+    write_day(tmp_path, "2025-05-02", ORDER.format(date="2025-05-02", order_id=2, shop="shop03") * 2)
+    changed = run_extraction(str(tmp_path), workers=1)
+    assert changed["processed_dates"] == ["2025-05-02"]
+    assert not (tmp_path / "combined_shop01_2025-05-02.log").exists()
+    assert combined(tmp_path, "shop03", "2025-05-02").count("\n") == 2
+    assert (tmp_path / "combined_shop01_2025-05-01.log").exists()
@@ -0,0 +1,58 @@
+# tests/test_order_log_index.py
+# 実行方法
+# pytest -s tests/test_order_log_index.py
+
+from utils.order_log_index import OrderLogIndex
+
+ORDER = "2025-05-08 10:00:00 - INFO     - ORDER : 注文完了 - order_id:{order_id:>4} - company_id:1, username:{username}, shop_name:{shop}, menu_id:1, amount:1\n"
+CANCEL = "2025-05-08 10:00:00 - INFO     - CANCEL: 注文取消 - order_id: {order_id} - username: {username}\n"
+
+
+def read(index, positions):
+    return [line.decode("utf-8") for line in index.iter_lines(positions)]
+
+
+# ----------------------------------------------------------
+# 📌 追記された行だけを読み、取消行も注文の店舗に含めること
+# ----------------------------------------------------------
+def test_incremental_refresh(tmp_path):
+    log = tmp_path / "2025-05-08.log"
+    log.write_text(ORDER.format(order_id=1, username="user1", shop="shop01"), encoding="utf-8")
+    index = OrderLogIndex(str(tmp_path))
+    first = index.refresh()
+
+    with open(log, "a", encoding="utf-8") as f:
+        f.write(ORDER.format(order_id=2, username="user2", shop="shop02"))
+        f.write(CANCEL.format(order_id=1, username="user1"))
+        f.write("2025-05-08 10:00:00 - INFO     - ORDER : 書きかけ")  # 改行なし
+    second = index.refresh()
+    # 2回目は追記した完全な2行だけ
+    appended = ORDER.format(order_id=2, username="user2", shop="shop02") + CANCEL.format(order_id=1, username="user1")
+    assert second == {"files": 1, "bytes": len(appended.encode("utf-8"))}
+    assert first["bytes"] + second["bytes"] < log.stat().st_size
+
+    lines = read(index, index.find(shop_name="shop01"))
+    assert len(lines) == 2 and "CANCEL" in lines[1]
+    assert read(index, index.find(username="user2", order_id=2)) == [ORDER.format(order_id=2, username="user2", shop="shop02")]
+    assert index.dates("shop_name", "shop01") == {"2025-05-08": 2}
+    assert index.stats()["lines"] == 3
+
+    # combined_* は対象外
+    (tmp_path / "combined_shop01_2025-05-08.log").write_text(ORDER.format(order_id=9, username="x", shop="shop01"), encoding="utf-8")
+    assert index.refresh() == {"files": 0, "bytes": 0}
+
+
+# ----------------------------------------------------------
+# 📌 ファイルが切り詰められたら、そのファイルだけ読み直すこと
+# ----------------------------------------------------------
+def test_truncated_file_is_reindexed(tmp_path):
+    log = tmp_path / "2025-05-08.log"
+    log.write_text(ORDER.format(order_id=1, username="user1", shop="shop01") * 3, encoding="utf-8")
+    index = OrderLogIndex(str(tmp_path))
+    index.refresh()
+    assert len(index.find(shop_name="shop01")) == 3
+
+    log.write_text(ORDER.format(order_id=2, username="user2", shop="shop02"), encoding="utf-8")
+    index.refresh()
+    assert index.find(shop_name="shop01") == []
+    assert len(index.find(shop_name="shop02", date="2025-05-08")) == 1
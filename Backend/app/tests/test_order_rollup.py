@@ -0,0 +1,69 @@
+# tests/test_order_rollup.py
+# 実行方法
+# pytest -s tests/test_order_rollup.py
+
+from collections import namedtuple
+from datetime import datetime
+
+from models.order_rollup import RollupDeltas
+
+Row = namedtuple("Row", "created_at shop_name company_id menu_id amount canceled checked")
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+def counters(deltas: RollupDeltas) -> dict:
+    return {
+        (row["b_order_date"].isoformat(), row["b_shop_name"], row["b_company_id"], row["b_menu_id"]): (
+            row["b_ordered_count"], row["b_ordered_amount"], row["b_canceled_count"], row["b_canceled_amount"], row["b_checked_count"]
+        )
+        for row in deltas.rows(NOW)
+    }
+
+
+# ----------------------------------------------------------
+# 📌 登録した注文は (注文日, 店舗, 会社, メニュー) ごとに件数・数量を加算すること
+# ----------------------------------------------------------
+def test_add_orders_by_key():
+    deltas = RollupDeltas()
+    deltas.add_order(Row(datetime(2025, 6, 1, 9, 0), "shop01", 1, 1, 2, False, False))
+    deltas.add_order(Row(datetime(2025, 6, 1, 23, 59), "shop01", 1, 1, 3, False, True))
+    deltas.add_order(Row(datetime(2025, 6, 2, 0, 0), "shop01", None, None, 1, True, False))
+
+    assert counters(deltas) == {
+        ("2025-06-01", "shop01", 1, 1): (2, 5, 0, 0, 1),
+        ("2025-06-02", "shop01", 0, 0): (1, 1, 1, 1, 0),  # NULL は 0 として数える
+    }
+    assert deltas.rows(NOW)[0]["b_updated_at"] == NOW
+
+
+# ----------------------------------------------------------
+# 📌 キャンセル・チェックの変更は差分だけになり、元に戻した変更は何も書かないこと
+# ----------------------------------------------------------
+def test_change_keeps_only_the_difference():
+    before = Row(datetime(2025, 6, 1, 9, 0), "shop01", 1, 1, 2, False, False)
+
+    canceled = RollupDeltas().change(before, before._replace(canceled=True))
+    assert counters(canceled) == {("2025-06-01", "shop01", 1, 1): (0, 0, 1, 2, 0)}
+    # 変更した列はキーワード引数でも渡せる（SQLAlchemy の Row は書き換えられない）
+    assert counters(RollupDeltas().change(before, canceled=True)) == counters(canceled)
+    assert counters(RollupDeltas().add_order(before, -1, canceled=True).add_order(before)) == {
+        ("2025-06-01", "shop01", 1, 1): (0, 0, -1, -2, 0)
+    }
+
+    restored = RollupDeltas().change(before, before._replace(checked=True)).change(before._replace(checked=True), before)
+    assert not restored
+    assert restored.rows(NOW) == []
+
+
+# ----------------------------------------------------------
+# 📌 削除は加算を打ち消し、created_at のない行は数えないこと
+# ----------------------------------------------------------
+def test_delete_and_missing_created_at():
+    row = Row(datetime(2025, 6, 1, 9, 0), "shop01", 1, 1, 2, True, True)
+    deltas = RollupDeltas().add_order(row).add_order(row, -1)
+    deltas.add_order(Row(None, "shop01", 1, 1, 1, False, False))
+    assert not deltas
+
+    removed = RollupDeltas().add_order(row, -1)
+    assert counters(removed) == {("2025-06-01", "shop01", 1, 1): (-1, -2, -1, -2, -1)}
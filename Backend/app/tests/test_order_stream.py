@@ -0,0 +1,53 @@
+# tests/test_order_stream.py
+# 実行方法
+# pytest -s tests/test_order_stream.py
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+import services.order_view as order_view
+from models.order import order_model_from_row
+
+ROW = (1, "会社", 1, "user1", "shop01", "お弁当", 1, datetime(2025, 6, 2, 12, 0), None, 0)
+
+
+def failing_stream(rows_before_error: int):
+    """rows_before_error 件を返した後に DB エラーを送出する stream_orders の代わり"""
+    async def stream_orders(spec):
+        for _ in range(rows_before_error):
+            yield order_model_from_row(ROW)
+        raise OperationalError("SELECT", {}, Exception("connection lost"))
+    return stream_orders
+
+
+# ----------------------------------------------------------
+# 📌 先頭の取得で DB エラーなら、404 ではなく 500 を返すこと
+# ----------------------------------------------------------
+def test_error_before_first_row_returns_500(monkeypatch):
+    monkeypatch.setattr(order_view, "stream_orders", failing_stream(0))
+    response = asyncio.run(order_view.stream_order_json("shop01", 1, "json"))
+    assert response.status_code == 500
+
+
+# ----------------------------------------------------------
+# 📌 送信途中の DB エラーは、閉じ括弧を送らずに応答を中断すること
+# ----------------------------------------------------------
+@pytest.mark.parametrize("format", ["json", "ndjson"])
+def test_error_after_first_row_aborts_stream(monkeypatch, format):
+    monkeypatch.setattr(order_view, "stream_orders", failing_stream(2))
+
+    async def run():
+        response = await order_view.stream_order_json("shop01", 1, format)
+        assert response.status_code == 200
+        chunks = []
+        with pytest.raises(OperationalError):
+            async for chunk in response.body_iterator:
+                chunks.append(chunk)
+        return chunks
+
+    chunks = asyncio.run(run())
+    assert len(chunks) == 2
+    assert "]" not in chunks[-1]
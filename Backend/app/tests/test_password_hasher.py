@@ -0,0 +1,106 @@
+# tests/test_password_hasher.py
+# 実行方法
+# pytest -s tests/test_password_hasher.py
+
+import asyncio
+import time
+
+import bcrypt
+
+from utils.password_hasher import authenticate_user, get_password_hash_stats, hash_password, verify_password
+
+# 本番の rounds=12 より軽くして、テストの時間を抑える（1回数十ミリ秒）
+TEST_ROUNDS = 8
+
+
+class FakeUser:
+    def __init__(self, username: str, hashed: str):
+        self.username = username
+        self.hashed = hashed
+
+    def get_password(self) -> str:
+        return self.hashed
+
+
+async def measure_loop_lag(work) -> float:
+    """work を実行している間、10ms ごとに起きるタスクの遅れの最大値（ミリ秒）"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            expected = time.perf_counter() + 0.01
+            await asyncio.sleep(0.01)
+            lags.append((time.perf_counter() - expected) * 1000)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)  # ticker を先に動かしておく
+    try:
+        result = await work()
+    finally:
+        done.set()
+        await task
+    return max(lags), result
+
+
+# ----------------------------------------------------------
+# 📌 ハッシュ化・照合（bcrypt 形式でないハッシュは不一致）
+# ----------------------------------------------------------
+def test_hash_and_verify():
+    async def run():
+        hashed = await hash_password("secret")
+        assert hashed.startswith("$2b$")
+        assert await verify_password("secret", hashed)
+        assert not await verify_password("wrong", hashed)
+        assert not await verify_password("secret", "$2b$broken")
+
+    asyncio.run(run())
+
+
+# ----------------------------------------------------------
+# 📌 50 件同時のログイン中も、イベントループが止まらないこと
+# ----------------------------------------------------------
+def test_concurrent_logins_do_not_block_loop():
+    hashed = bcrypt.hashpw(b"secret", bcrypt.gensalt(TEST_ROUNDS)).decode()
+    users = [FakeUser(f"user{i}", hashed) for i in range(50)]
+
+    begin = time.perf_counter()
+    bcrypt.checkpw(b"secret", hashed.encode())
+    one_check_ms = (time.perf_counter() - begin) * 1000
+
+    async def inline_logins():
+        # 旧実装と同じく、ループ上で直接照合する
+        return [user if bcrypt.checkpw(b"secret", user.get_password().encode()) else None for user in users[:5]]
+
+    async def pooled_logins():
+        return await asyncio.gather(*(authenticate_user(user, "secret") for user in users))
+
+    async def run():
+        inline_lag, _ = await measure_loop_lag(inline_logins)
+        pooled_lag, results = await measure_loop_lag(pooled_logins)
+        return inline_lag, pooled_lag, results
+
+    completed_before = get_password_hash_stats()["completed"]
+    inline_lag, pooled_lag, results = asyncio.run(run())
+    print(f"\n照合1回 {one_check_ms:.1f} ms / ループの最大遅れ: ループ上 {inline_lag:.1f} ms, スレッドプール {pooled_lag:.1f} ms")
+
+    assert results == users
+    assert get_password_hash_stats()["completed"] - completed_before == 50
+    assert get_password_hash_stats()["queued"] == 0
+    # ループ上で照合すると1回分以上止まるが、スレッドプールなら1回分よりずっと短い
+    assert inline_lag >= one_check_ms * 0.8
+    assert pooled_lag < max(one_check_ms / 2, 20)
+
+
+# ----------------------------------------------------------
+# 📌 一括再ハッシュ用：spawn したプロセスでハッシュ化できること
+# ----------------------------------------------------------
+def test_hash_passwords_in_process_pool():
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from utils.password_hasher import hash_passwords
+
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        hashed = executor.submit(hash_passwords, ["pw1", "pw2"]).result(timeout=60)
+
+    assert [bcrypt.checkpw(p.encode(), h.encode()) for p, h in zip(["pw1", "pw2"], hashed)] == [True, True]
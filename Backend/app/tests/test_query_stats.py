@@ -0,0 +1,41 @@
+# tests/test_query_stats.py
+# 実行方法
+# pytest -s tests/test_query_stats.py
+
+from sqlalchemy import create_engine, text
+
+from utils.query_stats import RequestQueryStats, current_query_stats, instrument_engine
+
+
+# ----------------------------------------------------------
+# 📌 リクエスト中のクエリ数・同一 SQL の回数（N+1 の検出）
+# ----------------------------------------------------------
+def test_counts_queries_in_context():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    instrument_engine(engine)  # 二重登録しない
+
+    stats = RequestQueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        with engine.connect() as conn:
+            for i in range(5):
+                conn.execute(text("SELECT :value"), {"value": i})
+            conn.execute(text("SELECT 1"))
+    finally:
+        current_query_stats.reset(token)
+
+    assert stats.count == 6
+    assert stats.total_ms > 0
+    assert list(stats.repeated(threshold=5).values()) == [5]
+    assert stats.repeated(threshold=6) == {}
+
+
+def test_no_stats_outside_request():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert current_query_stats.get() is None
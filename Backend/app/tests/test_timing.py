@@ -0,0 +1,67 @@
+# tests/test_timing.py
+# 実行方法
+# pytest -s tests/test_timing.py
+
+import pytest
+
+from utils.decorator import log_decorator
+from utils.timing import (
+    LatencyHistogram, get_function_timings, reset_function_timings, set_timing_enabled
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_timings():
+    reset_function_timings()
+    set_timing_enabled(True)
+    yield
+    reset_function_timings()
+    set_timing_enabled(True)
+
+
+@log_decorator
+def add(a, b):
+    return a + b
+
+@log_decorator
+async def async_add(a, b):
+    return a + b
+
+NAME = f"{__name__}.add"
+
+
+# ----------------------------------------------------------
+# 📌 LatencyHistogram: バケットへの振り分けとパーセンタイル推定
+# ----------------------------------------------------------
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for ms in [0.5] * 90 + [30] * 9 + [700]:
+        histogram.observe(ms)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 100
+    assert snapshot["max_ms"] == 700
+    assert snapshot["p50_ms"] <= 1
+    assert 25 < snapshot["p95_ms"] <= 50
+    assert snapshot["buckets"]["1"] == 90
+
+
+# ----------------------------------------------------------
+# 📌 log_decorator: 有効時は記録し、無効時は記録しない
+# ----------------------------------------------------------
+def test_decorator_records_calls():
+    assert add(1, 2) == 3
+    assert add(2, 3) == 5
+    assert get_function_timings()[NAME]["count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_decorator_records_async_calls():
+    assert await async_add(1, 2) == 3
+    assert get_function_timings()[f"{__name__}.async_add"]["count"] == 1
+
+
+def test_decorator_passes_through_when_disabled():
+    set_timing_enabled(False)
+    assert add(1, 2) == 3
+    assert NAME not in get_function_timings()
@@ -0,0 +1,101 @@
+# tests/test_today_order_index.py
+# 実行方法
+# pytest -s tests/test_today_order_index.py
+
+import asyncio
+from datetime import date, datetime
+
+import models.order as order_module
+from models.order import TodayOrderIndex
+
+TODAY = date(2025, 6, 2)
+NOON = datetime(2025, 6, 2, 12, 0)
+
+
+# ----------------------------------------------------------
+# 📌 追加・キャンセル：有効な注文が残っている間だけ注文済みとなること
+# ----------------------------------------------------------
+def test_add_and_discard():
+    index = TodayOrderIndex()
+    index.reset(TODAY, [(1, "user1")])
+    index.add(2, "user1", NOON)
+    index.add(3, "user2", datetime(2025, 6, 1, 23, 59))  # 前日の注文は対象外
+
+    assert index.has_user("user1")
+    assert not index.has_user("user2")
+
+    index.discard(1)
+    assert index.has_user("user1")
+    index.discard(2)
+    assert not index.has_user("user1")
+
+
+# ----------------------------------------------------------
+# 📌 ウォーム中の更新：読み込み完了時に反映されること
+# ----------------------------------------------------------
+def test_changes_during_warm_are_replayed():
+    index = TodayOrderIndex()
+    index.begin_warm()
+    index.add(5, "user3", NOON)
+    index.discard(1)
+    index.reset(TODAY, [(1, "user1")])
+
+    assert index.has_user("user3")
+    assert not index.has_user("user1")
+
+
+def test_invalidate():
+    index = TodayOrderIndex()
+    index.reset(TODAY, [(1, "user1")])
+    index.invalidate()
+
+    assert not index.is_current(TODAY)
+
+
+class FakeSession:
+    """実行した時点の db_rows を返す（読み込みに delay 秒かかる）"""
+
+    def __init__(self, db_rows, delay):
+        self.db_rows = db_rows
+        self.delay = delay
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt):
+        snapshot = list(self.db_rows)
+        await asyncio.sleep(self.delay)
+        return type("Result", (), {"all": lambda _self: snapshot})()
+
+
+# ----------------------------------------------------------
+# 📌 ウォームが重なっても、その間に登録した注文が索引から消えないこと
+# ----------------------------------------------------------
+def test_concurrent_warms_keep_orders_added_in_between(monkeypatch):
+    db_rows = [(1, "user1")]
+    monkeypatch.setattr(order_module, "AsyncSessionLocal", lambda: FakeSession(db_rows, 0.05))
+    index = order_module.today_order_index
+    index.invalidate()
+
+    async def insert_order_during_warm():
+        await asyncio.sleep(0.01)
+        db_rows.append((7, "user9"))
+        index.add(7, "user9", NOON)
+
+    async def run():
+        # 起動直後のログインと 0 時の更新が同時にウォームする
+        await asyncio.gather(
+            order_module.warm_today_order_index(TODAY),
+            order_module.warm_today_order_index(TODAY),
+            insert_order_during_warm(),
+        )
+
+    asyncio.run(run())
+
+    assert index.is_current(TODAY)
+    assert index.has_user("user1")
+    assert index.has_user("user9")
+    index.invalidate()
@@ -0,0 +1,57 @@
+# tests/test_token_cache.py
+# 実行方法
+# pytest -s tests/test_token_cache.py
+
+import time
+
+import pytest
+
+import utils.token_cache as token_cache_module
+from utils.token_cache import decode_jwt_token_cached, evict_token, token_cache
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    """core.security.decode_jwt_token の代わりに、呼ばれた回数を数える"""
+    calls = []
+
+    def fake_decode(token):
+        calls.append(token)
+        sub, exp = token.split(":")
+        return {"sub": sub, "permission": 1, "exp": int(exp)}
+
+    monkeypatch.setattr(token_cache_module, "decode_jwt_token", fake_decode)
+    token_cache.clear()
+    yield calls
+    token_cache.clear()
+
+
+# ----------------------------------------------------------
+# 📌 2回目以降は検証せずキャッシュから返し、ログアウトで外れること
+# ----------------------------------------------------------
+def test_cache_hit_and_evict(decode_calls):
+    token = f"user1:{int(time.time()) + 3600}"
+    hits_before = token_cache.hits
+
+    first = decode_jwt_token_cached(token)
+    first["sub"] = "changed"  # 呼び出し側で書き換えてもキャッシュは変わらない
+    assert decode_jwt_token_cached(token)["sub"] == "user1"
+    assert len(decode_calls) == 1
+    assert token_cache.hits - hits_before == 1
+    assert token not in token_cache._data  # キーはトークンのハッシュ
+
+    assert evict_token(token)
+    assert not evict_token(token)
+    decode_jwt_token_cached(token)
+    assert len(decode_calls) == 2
+
+
+# ----------------------------------------------------------
+# 📌 exp を過ぎたトークンはキャッシュしない（毎回 core で検証する）
+# ----------------------------------------------------------
+def test_expired_token_is_not_cached(decode_calls):
+    token = f"user1:{int(time.time()) - 1}"
+    decode_jwt_token_cached(token)
+    decode_jwt_token_cached(token)
+    assert len(decode_calls) == 2
+    assert len(token_cache) == 0
@@ -0,0 +1,99 @@
+# tests/test_user_cache.py
+# 実行方法
+# pytest -s tests/test_user_cache.py
+
+import pytest
+
+from utils.cache import TTLCache
+from schemas.user_schemas import UserResponse
+from models.user import (
+    cache_user, get_cached_user, invalidate_user_cache,
+    clear_user_cache, get_user_cache_stats
+)
+
+
+def make_user(user_id: int = 1, username: str = "user1") -> UserResponse:
+    return UserResponse(user_id=user_id, username=username, password="$2b$dummy", name="テスト")
+
+
+@pytest.fixture(autouse=True)
+def empty_user_cache():
+    clear_user_cache()
+    yield
+    clear_user_cache()
+
+
+# ----------------------------------------------------------
+# 📌 TTLCache: ヒット/ミスの計数、TTL 失効、LRU による追い出し
+# ----------------------------------------------------------
+def test_ttl_cache_counts_hits_and_misses():
+    cache = TTLCache("test", maxsize=10, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache("test", maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=-1)  # すでに失効している
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache("test", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")        # a を最近使ったことにする
+    cache.set("c", 3)     # b が追い出される
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+# ----------------------------------------------------------
+# 📌 ユーザーキャッシュ: username / user_id の両方から無効化される
+# ----------------------------------------------------------
+def test_user_cache_by_name_and_id():
+    cache_user(make_user())
+
+    assert get_cached_user(username="user1").user_id == 1
+    assert get_cached_user(user_id=1).username == "user1"
+
+
+def test_user_cache_returns_copy():
+    cache_user(make_user())
+
+    user = get_cached_user(username="user1")
+    user.set_token("changed")
+    assert get_cached_user(username="user1").token is None
+
+
+@pytest.mark.parametrize("key", [{"username": "user1"}, {"user_id": 1}])
+def test_invalidate_user_cache_removes_both_keys(key):
+    cache_user(make_user())
+    cache_user(make_user(2, "user2"))
+
+    invalidate_user_cache(**key)
+
+    assert get_cached_user(username="user1") is None
+    assert get_cached_user(user_id=1) is None
+    assert get_cached_user(username="user2") is not None
+
+
+def test_user_cache_stats():
+    before = get_user_cache_stats()["by_username"]
+
+    cache_user(make_user())
+    get_cached_user(username="user1")
+    get_cached_user(username="nobody")
+
+    after = get_user_cache_stats()["by_username"]
+    assert after["hits"] - before["hits"] == 1
+    assert after["misses"] - before["misses"] == 1
@@ -0,0 +1,129 @@
+# utils/check_coalescer.py
+'''
+    注文チェックの書き込みをまとめる（WebSocket /shop/{shop_id}/orders/checks 用）
+    1. class CheckCoalescer:
+        submit(shop_name: str, order_id: int, checked: bool, reply: asyncio.Queue, seq: Any = None) -> None
+        flush() -> None
+        stats() -> dict
+    2. get_check_coalescer_stats() -> dict:
+'''
+# 店舗のタブレットでチェックを素早く付け外しすると、1回ごとに POST・DB セッション・コミットが発生し、
+# 到着順も入れ替わることがあった。
+# ここでは order_id ごとに最新の状態だけを保持し（付けて外した等は1件にまとまる）、
+# 最初の変更から CHECK_FLUSH_MS ミリ秒後に、店舗ごとに1文（models.order.set_orders_checked）で書き込む。
+# 書き込みは1つずつ順に行うため、後の変更が先にコミットされることはない。
+# コミット後、変更を送ってきた接続へ、確定した状態を ack として返す。
+# 備考：uvicorn 1ワーカー（1プロセス）前提。イベントループのスレッドからのみ呼ぶこと。
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from log_unified import logger
+
+# 最初の変更から書き込むまでの時間（ミリ秒）
+CHECK_FLUSH_MS = int(os.environ.get("CHECK_FLUSH_MS", "300"))
+# 保留中の件数がこれを超えたら、待たずに書き込む
+CHECK_FLUSH_MAX_PENDING = int(os.environ.get("CHECK_FLUSH_MAX_PENDING", "500"))
+
+
+class CheckCoalescer:
+    """
+    shop_name → {order_id: checked} を保留し、まとめて書き込む。
+    writer(shop_name, {order_id: checked}) はコミットした {order_id: checked} を返す（失敗時は None）。
+    """
+
+    def __init__(self, writer=None, flush_ms: int = CHECK_FLUSH_MS, max_pending: int = CHECK_FLUSH_MAX_PENDING):
+        self.writer = writer
+        self.flush_ms = flush_ms
+        self.max_pending = max_pending
+        self._pending: Dict[str, Dict[int, bool]] = {}
+        # ack の返し先：shop_name → order_id → [(接続のキュー, クライアントの連番)]
+        self._waiters: Dict[str, Dict[int, List[Tuple[asyncio.Queue, Any]]]] = {}
+        self._timer: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        self.submitted = 0
+        self.coalesced = 0  # 書き込む前に、後の変更で上書きされた数
+        self.flushes = 0
+        self.written = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return sum(len(pending) for pending in self._pending.values())
+
+    def submit(self, shop_name: str, order_id: int, checked: bool, reply: asyncio.Queue, seq: Any = None) -> None:
+        """変更を保留に加える。書き込み後、reply に ack（dict）が入る"""
+        pending = self._pending.setdefault(shop_name, {})
+        if order_id in pending:
+            self.coalesced += 1
+        pending[order_id] = checked
+        self._waiters.setdefault(shop_name, {}).setdefault(order_id, []).append((reply, seq))
+        self.submitted += 1
+
+        if len(self) >= self.max_pending:
+            self._schedule(0)
+        elif self._timer is None:
+            self._schedule(self.flush_ms / 1000)
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is not None:
+            if delay > 0:
+                return
+            self._timer.cancel()
+        self._timer = asyncio.create_task(self._flush_after(delay))
+
+    async def _flush_after(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self.flush()
+
+    async def flush(self) -> None:
+        """保留中の変更を書き込み、ack を返す。書き込みは前回の書き込みが終わってから行う"""
+        pending, waiters = self._pending, self._waiters
+        self._pending, self._waiters = {}, {}
+        self._timer = None
+        if not pending:
+            return
+
+        writer = self.writer
+        if writer is None:
+            # models.order は utils.metrics 経由でこのモジュールを読み込むため、使うときに import する
+            from models.order import set_orders_checked as writer
+
+        async with self._write_lock:
+            for shop_name, checked_by_id in pending.items():
+                try:
+                    committed = await writer(shop_name, checked_by_id)
+                except Exception as e:
+                    logger.error(f"CheckCoalescer.flush() - shop_name: {shop_name}: {e}")
+                    committed = None
+                self.flushes += 1
+                if committed is None:
+                    self.failed += len(checked_by_id)
+                else:
+                    self.written += len(committed)
+
+                for order_id, replies in waiters.get(shop_name, {}).items():
+                    if committed is None:
+                        ack = {"type": "ack", "order_id": order_id, "ok": False, "error": "保存に失敗しました"}
+                    elif order_id in committed:
+                        ack = {"type": "ack", "order_id": order_id, "ok": True, "checked": committed[order_id]}
+                    else:
+                        ack = {"type": "ack", "order_id": order_id, "ok": False, "error": "注文が見つかりません"}
+                    for reply, seq in replies:
+                        reply.put_nowait({**ack, "seq": seq})
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+
+check_coalescer = CheckCoalescer()
+
+
+def get_check_coalescer_stats() -> dict:
+    return check_coalescer.stats()
@@ -240,6 +240,11 @@ def get_token_expires(request: Request) -> str:
             logger.debug("get_token_expires() - Cookie header が存在しないため、expires の取得をスキップ")
             return None
 
+        # ブラウザが送る Cookie ヘッダーに expires が入ることはほぼない。
+        # expires がなければ結果は必ず None なので、パースを省く
+        if "expires" not in set_cookie_header.lower():
+            return None
+
         # Cookieパース
         cookie = SimpleCookie()
         try:
@@ -5,30 +5,49 @@
 '''
 
 # カスタムデコレーターを定義
-# @log_decoratorを関数の上に記述すると、関数の前後にログを出力する
+# @log_decoratorを関数の上に記述すると、関数の実行時間を関数ごとのヒストグラムに記録する
+# （以前は前後に print していた。計測結果は utils.timing.get_function_timings() で取得）
+# 計測を止めているときは、フラグを1回見て元の関数を呼ぶだけになる
 from functools import wraps
 import functools
 import inspect
+import time
 import warnings
 
+from utils.timing import FUNCTION_TIMING, record_timing, timing_state
+
 
 def log_decorator(func):
+    if FUNCTION_TIMING == "strip":
+        return func
+
+    name = f"{func.__module__}.{func.__qualname__}"
+
     @wraps(func)
     async def async_wrapper(*args, **kwargs):
-        print(f"- {func.__name__} 前")
-        result = await func(*args, **kwargs)
-        print(f"- {func.__name__} 後")
-        return result
+        if not timing_state.enabled:
+            return await func(*args, **kwargs)
+        begin = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            record_timing(name, time.perf_counter() - begin)
 
     @wraps(func)
     def sync_wrapper(*args, **kwargs):
-        print(f"- {func.__name__} 前")
-        result = func(*args, **kwargs)
-        print(f"- {func.__name__} 後")
-        return result
+        if not timing_state.enabled:
+            return func(*args, **kwargs)
+        begin = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record_timing(name, time.perf_counter() - begin)
 
     if inspect.iscoroutinefunction(func):
         return async_wrapper
+    elif inspect.isgeneratorfunction(func) or inspect.isasyncgenfunction(func):
+        # ジェネレーターは生成時間しか測れないため計測しない
+        return func
     else:
         return sync_wrapper
 
@@ -0,0 +1,192 @@
+# utils/log_reader.py
+'''
+    ログファイルを HTML として少しずつ返す（ログ閲覧画面用）
+    1. resolve_log_path(log_dir: str, filename: str) -> str:
+    2. find_tail_offset(f, lines: int) -> int:
+    3. iter_log_html(path: str, title: str, base_url: str, offset: int = 0, limit: int = None, unit: str = "line", tail: int = None) -> Iterator[str]:
+    4. iter_lines_html(lines: Iterable[bytes], title: str, base_url: str, offset: int, limit: int, total: int, params: dict) -> Iterator[str]:
+'''
+# ファイル全体を読み込まず、先頭から（または末尾から）必要な分だけ読みながら HTML エスケープして返す。
+# 同期ジェネレーターなので StreamingResponse に渡すとスレッドプールで読まれ、イベントループは止まらない。
+import html
+import os
+from typing import BinaryIO, Iterable, Iterator, Optional
+from urllib.parse import urlencode
+
+from fastapi import HTTPException
+
+LOG_VIEW_UNITS = ("line", "byte")
+LOG_VIEW_DEFAULT_LINES = 1000
+LOG_VIEW_DEFAULT_BYTES = 1024 * 1024
+LOG_VIEW_MAX_TAIL = 100000
+# この大きさごとにまとめて送る
+LOG_VIEW_CHUNK_BYTES = 64 * 1024
+
+
+def resolve_log_path(log_dir: str, filename: str) -> str:
+    """log_dir 直下のファイルのパスを返す。ディレクトリをまたぐ指定（../ など）や存在しないファイルは 404"""
+    if not filename or os.path.basename(filename) != filename or filename in (".", ".."):
+        raise HTTPException(status_code=404, detail="指定されたログファイルが見つかりません")
+    path = os.path.join(log_dir, filename)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="指定されたログファイルが見つかりません")
+    return path
+
+
+def find_tail_offset(f: BinaryIO, lines: int) -> int:
+    """末尾から lines 行分の先頭のバイト位置を返す（末尾からブロック単位で改行を数える）"""
+    f.seek(0, os.SEEK_END)
+    end = f.tell()
+    if lines <= 0 or end == 0:
+        return end
+
+    # ファイル末尾の改行は最終行の終わりなので数えない
+    f.seek(end - 1)
+    remaining = lines + (1 if f.read(1) == b"\n" else 0)
+
+    pos = end
+    while pos > 0:
+        size = min(LOG_VIEW_CHUNK_BYTES, pos)
+        pos -= size
+        f.seek(pos)
+        data = f.read(size)
+        index = len(data)
+        while True:
+            index = data.rfind(b"\n", 0, index)
+            if index < 0:
+                break
+            remaining -= 1
+            if remaining == 0:
+                return pos + index + 1
+    return 0
+
+
+def _skip_line(f: BinaryIO) -> bool:
+    """次の改行の直後まで進める（長い行もまとめて読み込まない）。ファイル末尾なら False"""
+    while True:
+        raw = f.readline(LOG_VIEW_CHUNK_BYTES)
+        if not raw:
+            return False
+        if raw.endswith(b"\n"):
+            return True
+
+
+def _page_link(base_url: str, label: str, **params) -> str:
+    return f"<a href='{html.escape(base_url)}?{html.escape(urlencode(params))}'>{label}</a>"
+
+
+def iter_log_html(
+    path: str,
+    title: str,
+    base_url: str,
+    offset: int = 0,
+    limit: Optional[int] = None,
+    unit: str = "line",
+    tail: Optional[int] = None
+) -> Iterator[str]:
+    """
+    ログファイルを HTML（<h1>title</h1><pre>...</pre> とページ送りのリンク）として少しずつ返す。
+        unit="line": offset 行目から limit 行
+        unit="byte": offset バイト目を含む行の次の行から、limit バイトを超えた行まで（行の途中では切らない）
+        tail=N     : 末尾の N 行（offset / limit / unit は無視）
+    limit=0 は最後まで。省略時は unit ごとの既定値。
+    """
+    if limit is None:
+        limit = LOG_VIEW_DEFAULT_BYTES if unit == "byte" else LOG_VIEW_DEFAULT_LINES
+
+    yield f"<h1>{html.escape(title)}</h1><pre>"
+
+    with open(path, "rb") as f:
+        file_size = os.fstat(f.fileno()).st_size
+
+        if tail:
+            f.seek(find_tail_offset(f, tail))
+            unit, limit = "line", 0
+        elif unit == "byte":
+            if 0 < offset < file_size:
+                # 行の途中から始めないよう、offset を含む行は飛ばす（offset が行頭ならそのまま）
+                f.seek(offset - 1)
+                if f.read(1) != b"\n":
+                    _skip_line(f)
+            else:
+                f.seek(min(offset, file_size))
+        else:
+            for _ in range(offset):
+                if not _skip_line(f):
+                    break
+
+        start = f.tell()
+        lines_read = 0
+        buffer = []
+        buffered = 0
+
+        while True:
+            raw = f.readline(LOG_VIEW_CHUNK_BYTES)
+            if not raw:
+                break
+            buffer.append(html.escape(raw.decode("utf-8", errors="replace")))
+            buffered += len(raw)
+            if raw.endswith(b"\n"):
+                lines_read += 1
+
+            if buffered >= LOG_VIEW_CHUNK_BYTES:
+                yield "".join(buffer)
+                buffer, buffered = [], 0
+
+            if limit and unit == "line" and lines_read >= limit:
+                break
+            if limit and unit == "byte" and f.tell() - start >= limit and raw.endswith(b"\n"):
+                break
+
+        if buffer:
+            yield "".join(buffer)
+        end = f.tell()
+
+    # ページ送り
+    nav = [f"{start:,}～{end:,} / {file_size:,} バイト"]
+    if unit == "line" and not tail:
+        nav.append(f"{offset + 1:,}～{offset + lines_read:,} 行目")
+    nav.append(_page_link(base_url, "先頭", offset=0, unit=unit))
+    if end < file_size:
+        if unit == "byte":
+            nav.append(_page_link(base_url, "次へ", offset=end, limit=limit, unit="byte"))
+        else:
+            nav.append(_page_link(base_url, "次へ", offset=offset + lines_read, limit=limit, unit="line"))
+    nav.append(_page_link(base_url, "末尾", tail=tail or LOG_VIEW_DEFAULT_LINES))
+    yield f"</pre><p>{' | '.join(nav)}</p>"
+
+
+def iter_lines_html(
+    lines: Iterable[bytes],
+    title: str,
+    base_url: str,
+    offset: int,
+    limit: int,
+    total: int,
+    params: dict
+) -> Iterator[str]:
+    """
+    抽出済みの行（total 件中 offset 件目から）を iter_log_html と同じ形の HTML で返す。
+    params はページ送りのリンクに引き継ぐ検索条件。
+    """
+    yield f"<h1>{html.escape(title)}</h1><pre>"
+
+    buffer = []
+    buffered = 0
+    count = 0
+    for raw in lines:
+        buffer.append(html.escape(raw.decode("utf-8", errors="replace")))
+        buffered += len(raw)
+        count += 1
+        if buffered >= LOG_VIEW_CHUNK_BYTES:
+            yield "".join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+    nav = [f"{offset + 1 if count else offset:,}～{offset + count:,} / {total:,} 行"]
+    nav.append(_page_link(base_url, "先頭", **params, offset=0, limit=limit))
+    if offset + count < total:
+        nav.append(_page_link(base_url, "次へ", **params, offset=offset + count, limit=limit))
+    nav.append(_page_link(base_url, "末尾", **params, offset=max(0, total - limit), limit=limit))
+    yield f"</pre><p>{' | '.join(nav)}</p>"
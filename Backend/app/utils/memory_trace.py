@@ -0,0 +1,127 @@
+# utils/memory_trace.py
+'''
+    tracemalloc によるメモリ調査（管理者 API から必要なときだけ使う）
+    1. start_tracing(frames: int = TRACEMALLOC_DEFAULT_FRAMES) -> dict:
+    2. stop_tracing() -> dict:
+    3. get_tracing_status() -> dict:
+    4. take_snapshot(name: str) -> dict:
+    5. diff_snapshots(base: str, target: str, top: int = 20, key_type: str = "lineno") -> dict:
+'''
+# 備考：tracemalloc は有効な間すべてのメモリ確保が遅くなるため、常時は動かさない。
+#       起動直後から追いたい場合は、環境変数 PYTHONTRACEMALLOC=<frames> で Python 自体に開始させる。
+import tracemalloc
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Tuple
+
+TRACEMALLOC_DEFAULT_FRAMES = 1
+TRACEMALLOC_MAX_FRAMES = 100
+# スナップショットは1つで数十MBになることもあるため、保持数に上限を設ける（古いものから捨てる）
+TRACEMALLOC_MAX_SNAPSHOTS = 10
+TRACEMALLOC_KEY_TYPES = ("lineno", "filename", "traceback")
+
+# 調査対象外（tracemalloc 自身と import 処理）
+_snapshot_filters = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+_snapshots: "OrderedDict[str, Tuple[datetime, tracemalloc.Snapshot]]" = OrderedDict()
+
+
+def start_tracing(frames: int = TRACEMALLOC_DEFAULT_FRAMES) -> dict:
+    """
+    frames 段のスタックを記録して追跡を開始する。すでに動いている場合、段数が違えば取り直す
+    （段数は開始時にしか指定できない。取り直すと以前のスナップショットとは比較できないので消す）。
+    """
+    if not 1 <= frames <= TRACEMALLOC_MAX_FRAMES:
+        raise ValueError(f"frames は 1～{TRACEMALLOC_MAX_FRAMES} で指定してください: {frames}")
+
+    if tracemalloc.is_tracing():
+        if tracemalloc.get_traceback_limit() == frames:
+            return get_tracing_status()
+        tracemalloc.stop()
+        _snapshots.clear()
+
+    tracemalloc.start(frames)
+    return get_tracing_status()
+
+
+def stop_tracing() -> dict:
+    """追跡を止め、保持しているスナップショットも破棄する"""
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _snapshots.clear()
+    return get_tracing_status()
+
+
+def get_tracing_status() -> dict:
+    tracing = tracemalloc.is_tracing()
+    current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+    return {
+        "tracing": tracing,
+        "frames": tracemalloc.get_traceback_limit() if tracing else 0,
+        "traced_kib": round(current / 1024, 1),
+        "peak_kib": round(peak / 1024, 1),
+        "tracemalloc_overhead_kib": round(tracemalloc.get_tracemalloc_memory() / 1024, 1) if tracing else 0,
+        "snapshots": [
+            {"name": name, "taken_at": taken_at.isoformat(timespec="seconds")}
+            for name, (taken_at, _) in _snapshots.items()
+        ],
+    }
+
+
+def take_snapshot(name: str) -> dict:
+    """
+    現在の確保状況を name で保存する（同名は上書き）。CPU を使うので、非同期処理からはスレッドで呼ぶこと。
+    """
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc が開始されていません")
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(_snapshot_filters)
+    _snapshots.pop(name, None)
+    _snapshots[name] = (datetime.now(), snapshot)
+    while len(_snapshots) > TRACEMALLOC_MAX_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+
+    stats = snapshot.statistics("filename")
+    return {
+        "name": name,
+        "total_kib": round(sum(stat.size for stat in stats) / 1024, 1),
+        "blocks": sum(stat.count for stat in stats),
+    }
+
+
+def diff_snapshots(base: str, target: str, top: int = 20, key_type: str = "lineno") -> Dict:
+    """
+    base → target で増減の大きい順に top 件を返す。CPU を使うので、非同期処理からはスレッドで呼ぶこと。
+    """
+    if key_type not in TRACEMALLOC_KEY_TYPES:
+        raise ValueError(f"key_type は {TRACEMALLOC_KEY_TYPES} のいずれかを指定してください: {key_type}")
+    for name in (base, target):
+        if name not in _snapshots:
+            raise KeyError(name)
+
+    base_taken_at, base_snapshot = _snapshots[base]
+    target_taken_at, target_snapshot = _snapshots[target]
+    stats = target_snapshot.compare_to(base_snapshot, key_type)
+
+    return {
+        "base": {"name": base, "taken_at": base_taken_at.isoformat(timespec="seconds")},
+        "target": {"name": target, "taken_at": target_taken_at.isoformat(timespec="seconds")},
+        "key_type": key_type,
+        "total_diff_kib": round(sum(stat.size_diff for stat in stats) / 1024, 1),
+        "top": [
+            {
+                "location": str(stat.traceback[-1]),  # 確保した箇所（Traceback は古いフレームから並ぶ）
+                "traceback": [str(frame) for frame in stat.traceback] if key_type == "traceback" else None,
+                "size_diff_kib": round(stat.size_diff / 1024, 1),
+                "size_kib": round(stat.size / 1024, 1),
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in stats[:top]
+        ],
+    }
@@ -0,0 +1,308 @@
+# utils/metrics.py
+'''
+    Prometheus テキスト形式のメトリクス（GET /metrics）。外部サービスは使わず、プロセス内で集計する。
+    1. class MetricCounter:
+    2. class MetricsMiddleware:  ※ルートごとの遅延ヒストグラム（ASGI ミドルウェア）
+    3. instrument_pool(engine) -> None:  ※接続プールの待ち時間・待ち数
+    4. get_pool_stats(engine) -> Dict[str, float]:
+    5. render_metrics(engine) -> str:
+'''
+import time
+from typing import Dict, List, Tuple
+
+from utils.timing import LatencyHistogram, get_function_timings
+from utils.query_stats import get_query_totals
+from utils.password_hasher import get_password_hash_stats
+from utils.token_cache import get_token_cache_stats
+from utils.order_events import get_order_event_stats
+from utils.check_coalescer import get_check_coalescer_stats
+
+METRIC_PREFIX = "obento"
+
+
+class MetricCounter:
+    """単調増加のカウンター"""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.help_text = help_text
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+# 注文まわりのカウンター（1分あたりの件数は Prometheus 側で rate() を取る）
+ORDERS_INSERTED = MetricCounter("orders_inserted_total", "insert_order() で登録した注文数")
+ORDERS_CANCELED = MetricCounter("orders_canceled_total", "キャンセルした注文数")
+DUPLICATE_ORDER_REJECTIONS = MetricCounter("duplicate_order_rejections_total", "二重注文として注文画面を表示しなかった回数")
+ORDER_COUNTERS = (ORDERS_INSERTED, ORDERS_CANCELED, DUPLICATE_ORDER_REJECTIONS)
+
+
+'''-------------------------------------------------------------'''
+# ルートごとの遅延
+_route_latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+_route_status: Dict[Tuple[str, str, str], int] = {}
+_in_flight = [0]
+
+def route_label(scope) -> str:
+    """
+    ルートのパステンプレート（例: /shop/{shop_id}/order_json）を返す。
+    実際のパスを使うとラベルの種類が際限なく増えるため、マッチしなかったものはまとめる。
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    if scope.get("path", "").startswith("/static/"):
+        return "/static"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    リクエストごとに所要時間を計り、(メソッド, ルート) ごとのヒストグラムとステータス別件数に記録する。
+    StreamingResponse は最後のチャンクを送り終えるまでを計る。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        begin = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        _in_flight[0] += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _in_flight[0] -= 1
+            elapsed_ms = (time.perf_counter() - begin) * 1000
+            key = (scope["method"], route_label(scope))
+            histogram = _route_latency.get(key)
+            if histogram is None:
+                histogram = _route_latency[key] = LatencyHistogram()
+            histogram.observe(elapsed_ms)
+            status_key = key + (str(status_code),)
+            _route_status[status_key] = _route_status.get(status_key, 0) + 1
+
+
+'''-------------------------------------------------------------'''
+# 接続プール
+# プールに空きがないとき checkout は待たされる。その待ち時間と待っている数を測るため、
+# QueuePool の _do_get（空きを待って接続を取り出す処理）を包む。
+_pool_wait = LatencyHistogram()
+_pool_waiting = [0]
+_pool_timeouts = [0]
+
+def instrument_pool(engine) -> None:
+    pool = engine.sync_engine.pool if hasattr(engine, "sync_engine") else engine.pool
+    if getattr(pool, "_metrics_instrumented", False):
+        return
+
+    from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+    do_get = pool._do_get
+
+    def timed_do_get():
+        _pool_waiting[0] += 1
+        begin = time.perf_counter()
+        try:
+            return do_get()
+        except PoolTimeoutError:
+            _pool_timeouts[0] += 1
+            raise
+        finally:
+            _pool_waiting[0] -= 1
+            _pool_wait.observe((time.perf_counter() - begin) * 1000)
+
+    pool._do_get = timed_do_get
+    pool._metrics_instrumented = True
+
+
+def get_pool_stats(engine) -> Dict[str, float]:
+    pool = engine.sync_engine.pool if hasattr(engine, "sync_engine") else engine.pool
+    stats = {"waiting": _pool_waiting[0], "timeouts": _pool_timeouts[0]}
+    # QueuePool 以外（NullPool / StaticPool 等）はこれらを持たない
+    for key, method in (("size", "size"), ("checked_out", "checkedout"), ("checked_in", "checkedin"), ("overflow", "overflow")):
+        if callable(getattr(pool, method, None)):
+            stats[key] = getattr(pool, method)()
+    if "overflow" in stats:
+        # overflow() は pool_size 未満のとき負の値になるので、使用中の追加接続数として 0 以上にそろえる
+        stats["overflow"] = max(0, stats["overflow"])
+    stats["max_overflow"] = getattr(pool, "_max_overflow", 0)
+    return stats
+
+
+'''-------------------------------------------------------------'''
+# テキスト形式への変換
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _format_bound(bound_ms: float) -> str:
+    return "+Inf" if bound_ms == float("inf") else repr(bound_ms / 1000)
+
+def _render_histogram(lines: List[str], name: str, histogram: LatencyHistogram, **labels) -> None:
+    """ミリ秒のヒストグラムを秒単位の Prometheus histogram（累積バケット）として出力する"""
+    cumulative = 0
+    for bound_ms, bucket_count in zip(histogram.buckets_ms, histogram.counts):
+        cumulative += bucket_count
+        lines.append(f"{name}_bucket{_labels(**labels, le=_format_bound(bound_ms))} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {histogram.total_ms / 1000}")
+    lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+
+def _header(lines: List[str], name: str, metric_type: str, help_text: str) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+
+
+def render_metrics(engine) -> str:
+    lines: List[str] = []
+    routes = sorted(_route_latency.items())
+
+    name = f"{METRIC_PREFIX}_http_request_duration_seconds"
+    _header(lines, name, "histogram", "ルートごとのリクエスト処理時間")
+    for (method, route), histogram in routes:
+        _render_histogram(lines, name, histogram, method=method, route=route)
+
+    name = f"{METRIC_PREFIX}_http_request_duration_quantile_seconds"
+    _header(lines, name, "gauge", "ルートごとの処理時間の p50 / p95 / p99（ヒストグラムからの推定）")
+    for (method, route), histogram in routes:
+        for quantile in (50, 95, 99):
+            lines.append(f"{name}{_labels(method=method, route=route, quantile=quantile / 100)} "
+                         f"{histogram.percentile(quantile) / 1000}")
+
+    name = f"{METRIC_PREFIX}_http_requests_total"
+    _header(lines, name, "counter", "ルート・ステータスごとのリクエスト数")
+    for (method, route, status), count in sorted(_route_status.items()):
+        lines.append(f"{name}{_labels(method=method, route=route, status=status)} {count}")
+
+    name = f"{METRIC_PREFIX}_http_requests_in_flight"
+    _header(lines, name, "gauge", "処理中のリクエスト数")
+    lines.append(f"{name} {_in_flight[0]}")
+
+    # 接続プール
+    pool_stats = get_pool_stats(engine)
+    for key, help_text in (
+        ("size", "プールの接続数（pool_size）"),
+        ("checked_out", "使用中の接続数"),
+        ("checked_in", "空いている接続数"),
+        ("overflow", "使用中の追加接続数（max_overflow まで）"),
+        ("max_overflow", "追加接続の上限"),
+        ("waiting", "接続を取得中（空き待ちを含む）の数"),
+    ):
+        if key in pool_stats:
+            name = f"{METRIC_PREFIX}_db_pool_{key}"
+            _header(lines, name, "gauge", help_text)
+            lines.append(f"{name} {pool_stats[key]}")
+
+    name = f"{METRIC_PREFIX}_db_pool_timeouts_total"
+    _header(lines, name, "counter", "pool_timeout までに接続を取得できなかった回数")
+    lines.append(f"{name} {pool_stats['timeouts']}")
+
+    name = f"{METRIC_PREFIX}_db_pool_wait_seconds"
+    _header(lines, name, "histogram", "接続の取得にかかった時間")
+    _render_histogram(lines, name, _pool_wait)
+
+    # SQL（utils.query_stats のエンジンイベント）
+    query_totals = get_query_totals()
+    name = f"{METRIC_PREFIX}_db_query_duration_seconds"
+    _header(lines, name, "histogram", "SQL 1文ごとの実行時間")
+    _render_histogram(lines, name, query_totals["duration"])
+
+    name = f"{METRIC_PREFIX}_db_slow_queries_total"
+    _header(lines, name, "counter", "SQL_SLOW_MS 以上かかった SQL の数")
+    lines.append(f"{name} {query_totals['slow']}")
+
+    name = f"{METRIC_PREFIX}_db_n_plus_one_requests_total"
+    _header(lines, name, "counter", "同じ SQL を繰り返し実行した（N+1 の疑いがある）リクエストの数")
+    lines.append(f"{name} {query_totals['n_plus_one']}")
+
+    # パスワードのハッシュ化・照合（utils.password_hasher のスレッドプール）
+    hash_stats = get_password_hash_stats()
+    for key, metric_type, help_text in (
+        ("workers", "gauge", "ハッシュ計算のスレッド数（同時実行数の上限）"),
+        ("queued", "gauge", "実行待ちの数"),
+        ("running", "gauge", "計算中の数"),
+        ("completed", "counter", "計算した数"),
+        ("rejected", "counter", "待ち行列があふれて断った数"),
+    ):
+        name = f"{METRIC_PREFIX}_password_hash_{key}" + ("_total" if metric_type == "counter" else "")
+        _header(lines, name, metric_type, help_text)
+        lines.append(f"{name} {hash_stats[key]}")
+
+    name = f"{METRIC_PREFIX}_password_hash_wait_seconds"
+    _header(lines, name, "histogram", "スレッドが空くまでの待ち時間")
+    _render_histogram(lines, name, hash_stats["wait"])
+
+    name = f"{METRIC_PREFIX}_password_hash_duration_seconds"
+    _header(lines, name, "histogram", "bcrypt の計算時間")
+    _render_histogram(lines, name, hash_stats["duration"])
+
+    # デコード済み JWT のキャッシュ
+    cache_stats = get_token_cache_stats()
+    for key, metric_type, help_text in (
+        ("hits", "counter", "キャッシュから返した回数"),
+        ("misses", "counter", "署名を検証した回数"),
+        ("evictions", "counter", "件数上限で捨てた数"),
+        ("size", "gauge", "保持している件数"),
+        ("hit_rate", "gauge", "ヒット率（起動からの累計）"),
+    ):
+        name = f"{METRIC_PREFIX}_jwt_cache_{key}" + ("_total" if metric_type == "counter" else "")
+        _header(lines, name, metric_type, help_text)
+        lines.append(f"{name} {cache_stats[key]}")
+
+    # 注文
+    for counter in ORDER_COUNTERS:
+        _header(lines, counter.name, "counter", counter.help_text)
+        lines.append(f"{counter.name} {counter.value}")
+
+    # 注文のリアルタイム配信（SSE）
+    event_stats = get_order_event_stats()
+    for key, metric_type, help_text in (
+        ("subscribers", "gauge", "接続中のストリーム数"),
+        ("published", "counter", "配信した注文イベントの数"),
+        ("resyncs", "counter", "再送できず resync を送った回数"),
+    ):
+        name = f"{METRIC_PREFIX}_order_stream_{key}" + ("_total" if metric_type == "counter" else "")
+        _header(lines, name, metric_type, help_text)
+        lines.append(f"{name} {event_stats[key]}")
+
+    # 注文チェックの WebSocket（まとめ書き）
+    check_stats = get_check_coalescer_stats()
+    for key, metric_type, help_text in (
+        ("pending", "gauge", "書き込み待ちの注文数"),
+        ("submitted", "counter", "受け付けたチェックの変更数"),
+        ("coalesced", "counter", "書き込む前に後の変更で上書きされた数"),
+        ("flushes", "counter", "まとめて書き込んだ回数（店舗ごとに1文）"),
+        ("written", "counter", "書き込んだ注文数"),
+        ("failed", "counter", "書き込みに失敗した注文数"),
+    ):
+        name = f"{METRIC_PREFIX}_order_check_{key}" + ("_total" if metric_type == "counter" else "")
+        _header(lines, name, metric_type, help_text)
+        lines.append(f"{name} {check_stats[key]}")
+
+    # 関数ごとの実行時間（@log_decorator）
+    name = f"{METRIC_PREFIX}_function_duration_seconds"
+    _header(lines, name, "summary", "@log_decorator を付けた関数の実行時間")
+    for function, snapshot in sorted(get_function_timings().items()):
+        for quantile in (50, 95, 99):
+            lines.append(f"{name}{_labels(function=function, quantile=quantile / 100)} {snapshot[f'p{quantile}_ms'] / 1000}")
+        lines.append(f"{name}_sum{_labels(function=function)} {snapshot['sum_ms'] / 1000}")
+        lines.append(f"{name}_count{_labels(function=function)} {snapshot['count']}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,244 @@
+# utils/order_events.py
+'''
+    店舗ごとの注文イベント（プロセス内 pub/sub）と Server-Sent Events 形式への変換
+    1. class OrderEvent(NamedTuple):
+    2. class OrderStreamBusy(Exception):
+    3. class OrderSubscription:
+    4. class OrderEventBus:
+        is_full() -> bool
+        subscribe(shop_name: str, last_event_id: Optional[str] = None) -> OrderSubscription
+        unsubscribe(subscription: OrderSubscription) -> None
+        publish(shop_name: str, event_type: str, data: dict) -> OrderEvent
+        stats() -> dict
+    5. publish_order_event(shop_name: str, event_type: str, data: dict) -> None:
+    6. iter_order_event_stream(subscription: OrderSubscription) -> AsyncIterator[str]:
+    7. class OrderEventStreamResponse(StreamingResponse):
+    8. get_order_event_stats() -> dict:
+'''
+# 店舗のタブレットは、注文の追加・キャンセル・チェックを知るために画面ごと再読み込みしていた。
+# insert_order / cancel_orders / update_order / update_orders_checked がここへ発行し、
+# /shop/{shop_id}/orders/stream（SSE）の接続ごとのキューへ配る。
+# イベントは発行時に1度だけ SSE の文字列にしておき、購読者の数によらず使い回す。
+# 店舗ごとに直近のイベントを保持し、再接続時の Last-Event-ID 以降を再送する（保持分より古い場合は resync）。
+# 備考：uvicorn 1ワーカー（1プロセス）前提。イベントループのスレッドからのみ呼ぶこと。
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, NamedTuple, Optional, Set
+
+# 接続ごとのキューの長さ。あふれたら（読み出しが追いつかない）中身を捨てて resync を送る
+ORDER_EVENT_QUEUE_SIZE = int(os.environ.get("ORDER_EVENT_QUEUE_SIZE", "100"))
+# 再接続時の再送用に、店舗ごとに保持するイベント数
+ORDER_EVENT_BUFFER_SIZE = int(os.environ.get("ORDER_EVENT_BUFFER_SIZE", "200"))
+# 同時接続数の上限（全店舗の合計）
+ORDER_STREAM_MAX_SUBSCRIBERS = int(os.environ.get("ORDER_STREAM_MAX_SUBSCRIBERS", "200"))
+# イベントがないときに送るコメント行の間隔（プロキシのタイムアウト・切断の検知用）
+ORDER_STREAM_HEARTBEAT_SECONDS = float(os.environ.get("ORDER_STREAM_HEARTBEAT_SECONDS", "15"))
+# 1接続の最長時間。過ぎたら閉じ、ブラウザに Last-Event-ID つきで再接続させる
+# （SSE が開いたままだと、uvicorn の停止時に接続の終了を待ち続けるため）
+ORDER_STREAM_MAX_SECONDS = float(os.environ.get("ORDER_STREAM_MAX_SECONDS", "300"))
+# ブラウザが再接続するまでの待ち時間（ミリ秒）
+ORDER_STREAM_RETRY_MS = int(os.environ.get("ORDER_STREAM_RETRY_MS", "3000"))
+
+# 再起動をまたいだ Last-Event-ID を見分けるため、イベント ID の先頭にプロセスの起動時刻を付ける
+_BOOT_ID = format(int(time.time() * 1000), "x")
+
+
+class OrderEvent(NamedTuple):
+    seq: int
+    type: str
+    message: str  # SSE の1イベント分の文字列
+
+
+class OrderStreamBusy(Exception):
+    """同時接続数が上限に達している"""
+
+
+class OrderSubscription:
+    def __init__(self, shop_name: str, queue_size: int = ORDER_EVENT_QUEUE_SIZE):
+        self.shop_name = shop_name
+        self.queue: "asyncio.Queue[OrderEvent]" = asyncio.Queue(maxsize=queue_size)
+
+
+def format_sse(event_id: str, event_type: str, data: dict) -> str:
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+class OrderEventBus:
+    """
+    店舗名 → 購読中の接続 の pub/sub。
+    publish はキューに入れるだけで待たない（遅い接続があっても注文処理は止まらない）。
+    """
+
+    def __init__(self, queue_size: int = ORDER_EVENT_QUEUE_SIZE, buffer_size: int = ORDER_EVENT_BUFFER_SIZE):
+        self.queue_size = queue_size
+        self.buffer_size = buffer_size
+        self._subscribers: Dict[str, Set[OrderSubscription]] = {}
+        self._buffers: Dict[str, Deque[OrderEvent]] = {}
+        # 店舗ごとに、保持数を超えて捨てた最後のイベントの番号（これより前からの再送はできない）
+        self._evicted: Dict[str, int] = {}
+        self._seq = 0
+        self.published = 0
+        self.resyncs = 0
+
+    def __len__(self) -> int:
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def _resync_event(self) -> OrderEvent:
+        self.resyncs += 1
+        # 再接続後に同じ位置から再送されないよう、現在の ID を付ける
+        return OrderEvent(self._seq, "resync", format_sse(f"{_BOOT_ID}:{self._seq}", "resync", {}))
+
+    def _parse_last_event_id(self, last_event_id: str) -> Optional[int]:
+        boot_id, _, seq = last_event_id.partition(":")
+        if boot_id != _BOOT_ID or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def is_full(self) -> bool:
+        return len(self) >= ORDER_STREAM_MAX_SUBSCRIBERS
+
+    def subscribe(self, shop_name: str, last_event_id: Optional[str] = None) -> OrderSubscription:
+        """
+        接続を登録する。last_event_id（ブラウザの Last-Event-ID）があれば、それより後のイベントを先にキューへ入れる。
+        保持分より古い・別プロセスの ID なら resync を入れる（画面側で再読み込みする）。
+        """
+        if self.is_full():
+            raise OrderStreamBusy(f"注文ストリームの接続数が上限（{ORDER_STREAM_MAX_SUBSCRIBERS}）に達しています")
+
+        subscription = OrderSubscription(shop_name, self.queue_size)
+        if last_event_id:
+            # 番号は全店舗で通し。この店舗の捨てたイベントより前の番号なら、取りこぼしがある
+            seq = self._parse_last_event_id(last_event_id)
+            if seq is None or seq > self._seq or seq < self._evicted.get(shop_name, 0):
+                subscription.queue.put_nowait(self._resync_event())
+            else:
+                missed = [event for event in self._buffers.get(shop_name, ()) if event.seq > seq]
+                if len(missed) > self.queue_size:
+                    subscription.queue.put_nowait(self._resync_event())
+                else:
+                    for event in missed:
+                        subscription.queue.put_nowait(event)
+
+        self._subscribers.setdefault(shop_name, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: OrderSubscription) -> None:
+        subs = self._subscribers.get(subscription.shop_name)
+        if subs is None:
+            return
+        subs.discard(subscription)
+        if not subs:
+            del self._subscribers[subscription.shop_name]
+
+    def publish(self, shop_name: str, event_type: str, data: dict) -> OrderEvent:
+        self._seq += 1
+        event = OrderEvent(self._seq, event_type, format_sse(f"{_BOOT_ID}:{self._seq}", event_type, data))
+        buffer = self._buffers.get(shop_name)
+        if buffer is None:
+            buffer = self._buffers[shop_name] = deque(maxlen=self.buffer_size)
+        if len(buffer) == buffer.maxlen:
+            self._evicted[shop_name] = buffer[0].seq
+        buffer.append(event)
+        self.published += 1
+
+        for subscription in self._subscribers.get(shop_name, ()):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # 読み出しが追いつかない接続は、溜まった分を捨てて resync だけ送る
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(self._resync_event())
+        return event
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self),
+            "shops": len(self._subscribers),
+            "published": self.published,
+            "resyncs": self.resyncs,
+        }
+
+
+order_event_bus = OrderEventBus()
+
+
+def publish_order_event(shop_name: Optional[str], event_type: str, data: dict) -> None:
+    """
+    注文を書き換えた関数が、コミットの後に呼ぶ。
+    event_type: order_created / order_canceled / order_checked
+    配信の失敗で注文処理を失敗させないよう、例外はログに残すだけにする。
+    """
+    if not shop_name:
+        return
+    try:
+        order_event_bus.publish(shop_name, event_type, data)
+    except Exception as e:
+        from log_unified import logger
+        logger.error(f"publish_order_event() - {shop_name} {event_type}: {e}")
+
+
+async def iter_order_event_stream(
+    subscription: OrderSubscription,
+    heartbeat: float = ORDER_STREAM_HEARTBEAT_SECONDS,
+    max_seconds: float = ORDER_STREAM_MAX_SECONDS,
+    bus: OrderEventBus = order_event_bus
+) -> AsyncIterator[str]:
+    """
+    subscription（bus.subscribe() 済み）のイベントを SSE の文字列として返し続ける。
+    max_seconds を過ぎたら終了する（ブラウザの EventSource は retry 後に Last-Event-ID つきで再接続する）。
+    購読は呼び出し側で応答ヘッダーを送る前に登録し（上限なら 503 にできる）、
+    接続が切れてジェネレーターが閉じられたらここで解除する。
+    一度も取り出されずに終わった場合は finally が動かないため、OrderEventStreamResponse でも解除する。
+    """
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield f"retry: {ORDER_STREAM_RETRY_MS}\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield event.message
+    finally:
+        bus.unsubscribe(subscription)
+
+
+from starlette.responses import StreamingResponse
+
+class OrderEventStreamResponse(StreamingResponse):
+    """
+    subscription のイベントを送る SSE 応答。応答が終わったら（ジェネレーターが始まらなかった場合も）購読を解除する。
+    ヘッダー送信で OSError になった・送信前に切断された場合、ジェネレーターは一度も取り出されず finally が動かない。
+    """
+
+    def __init__(self, subscription: OrderSubscription, bus: OrderEventBus = order_event_bus, **kwargs):
+        super().__init__(
+            iter_order_event_stream(subscription, bus=bus, **kwargs),
+            media_type="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                # nginx 等のプロキシでバッファリングさせない
+                "X-Accel-Buffering": "no",
+            },
+        )
+        self.subscription = subscription
+        self.bus = bus
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.bus.unsubscribe(self.subscription)  # 2回目以降は何もしない
+
+
+def get_order_event_stats() -> dict:
+    return order_event_bus.stats()
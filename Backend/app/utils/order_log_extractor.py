@@ -0,0 +1,177 @@
+# utils/order_log_extractor.py
+'''
+    注文ログから店舗ごとの結合ログ（combined_{店舗名}_{日付}.log）をまとめて書き出す（月末の一括出力用）
+    1. group_log_files(log_dir: str) -> Dict[str, List[str]]:
+    2. extract_date_group(log_dir: str, date: str, names: List[str], shops: Optional[List[str]]) -> dict:
+    3. run_extraction(log_dir: str, shops: List[str] = None, workers: int = None, force: bool = False) -> dict:
+'''
+# 以前は1回の実行で1店舗だけを抽出していたため、全店舗分では「店舗数 × ファイル数」回ファイルを読んでいた。
+# ここでは各ログファイルを1回だけ読み、1行ずつ該当する店舗の出力に振り分ける。
+# 日付ごと（同じ日付のローテーション済みファイルを含む）にプロセスプールで並列に処理し、
+# 前回から mtime・サイズが変わっていない日付は読み直さない（状態は STATE_FILENAME に保存）。
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, List, Optional
+
+STATE_FILENAME = ".combined_state.json"
+EXTRACT_READ_BYTES = 1024 * 1024
+
+_shop_pattern = re.compile(rb"shop_name:\s*([^\s,]+)")
+_order_id_pattern = re.compile(rb"order_id:\s*(\d+)")
+
+
+def _file_date(name: str) -> str:
+    """ファイル名の日付部分（2025-05-08.log → 2025-05-08）"""
+    return name.split(".log", 1)[0]
+
+
+def group_log_files(log_dir: str) -> Dict[str, List[str]]:
+    """抽出対象のファイル名を日付ごとにまとめる（combined_* と隠しファイルは除く）"""
+    groups: Dict[str, List[str]] = {}
+    for name in sorted(os.listdir(log_dir)):
+        if name.startswith(("combined_", ".")) or not os.path.isfile(os.path.join(log_dir, name)):
+            continue
+        groups.setdefault(_file_date(name), []).append(name)
+    return groups
+
+
+def _file_signature(log_dir: str, names: List[str]) -> Dict[str, List[int]]:
+    signature = {}
+    for name in names:
+        stat = os.stat(os.path.join(log_dir, name))
+        signature[name] = [stat.st_mtime_ns, stat.st_size]
+    return signature
+
+
+def extract_date_group(log_dir: str, date: str, names: List[str], shops: Optional[List[str]]) -> dict:
+    """
+    names（同じ日付のファイル）を1回ずつ読み、店舗ごとに combined_{店舗名}_{date}.log を書き出す。
+    shops が None なら全店舗。CANCEL 行は同じ order_id の ORDER 行の店舗に含める。
+    プロセスプールから呼ぶため、モジュールの関数で、戻り値は書き出した店舗ごとの行数だけにする。
+    """
+    wanted = None if shops is None else {shop.encode("utf-8") for shop in shops}
+    # 店舗ごとの出力先。書きかけのファイルが見えないよう一時ファイルに書き、最後に置き換える
+    outputs: Dict[bytes, BinaryIO] = {}
+    output_paths: Dict[bytes, str] = {}
+    line_counts: Dict[bytes, int] = {}
+    shop_by_order: Dict[bytes, bytes] = {}
+    read_bytes = 0
+
+    try:
+        for name in names:
+            with open(os.path.join(log_dir, name), "rb", buffering=EXTRACT_READ_BYTES) as f:
+                for line in f:
+                    read_bytes += len(line)
+                    order_match = _order_id_pattern.search(line)
+                    match = _shop_pattern.search(line)
+                    if match:
+                        shop = match.group(1)
+                        if order_match:
+                            shop_by_order[order_match.group(1)] = shop
+                    elif order_match:
+                        shop = shop_by_order.get(order_match.group(1))
+                        if shop is None:
+                            continue
+                    else:
+                        continue
+                    if wanted is not None and shop not in wanted:
+                        continue
+
+                    out_f = outputs.get(shop)
+                    if out_f is None:
+                        shop_name = shop.decode("utf-8", errors="replace")
+                        output_paths[shop] = os.path.join(log_dir, f"combined_{shop_name}_{date}.log")
+                        out_f = outputs[shop] = open(f"{output_paths[shop]}.{os.getpid()}.tmp", "wb", buffering=EXTRACT_READ_BYTES)
+                        line_counts[shop] = 0
+                    out_f.write(line if line.endswith(b"\n") else line + b"\n")
+                    line_counts[shop] += 1
+    except BaseException:
+        for out_f in outputs.values():
+            out_f.close()
+            os.remove(out_f.name)
+        raise
+
+    for shop, out_f in outputs.items():
+        out_f.close()
+        os.replace(out_f.name, output_paths[shop])
+
+    written = {shop.decode("utf-8", errors="replace"): count for shop, count in line_counts.items()}
+    return {"date": date, "read_bytes": read_bytes, "written": written}
+
+
+def _load_state(log_dir: str) -> dict:
+    try:
+        with open(os.path.join(log_dir, STATE_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_state(log_dir: str, state: dict) -> None:
+    path = os.path.join(log_dir, STATE_FILENAME)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(f"{path}.tmp", path)
+
+
+def run_extraction(
+    log_dir: str,
+    shops: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    force: bool = False
+) -> dict:
+    """
+    変更のあった日付だけを抽出し直す。shops を省略すると全店舗。workers=1 ならプロセスを起動せずに処理する。
+    店舗の指定が前回と違う場合は、すべての日付を抽出し直す。
+    """
+    shops_key = None if shops is None else sorted(set(shops))
+    state = _load_state(log_dir)
+    if force or "dates" not in state or state.get("shops") != shops_key:
+        state = {"shops": shops_key, "dates": {}}
+
+    groups = group_log_files(log_dir)
+    changed = {}
+    for date, names in groups.items():
+        signature = _file_signature(log_dir, names)
+        if state["dates"].get(date, {}).get("files") != signature:
+            changed[date] = (names, signature)
+
+    # 元のログがなくなった日付は状態からも外す（書き出し済みの結合ログは残す）
+    for date in set(state["dates"]) - set(groups):
+        del state["dates"][date]
+
+    def finish(result: dict) -> None:
+        date = result["date"]
+        previous = state["dates"].get(date, {}).get("shops", [])
+        # 前回はあったが今回は行がなくなった店舗の結合ログを消す
+        for shop_name in set(previous) - set(result["written"]):
+            path = os.path.join(log_dir, f"combined_{shop_name}_{date}.log")
+            if os.path.exists(path):
+                os.remove(path)
+        state["dates"][date] = {"files": changed[date][1], "shops": sorted(result["written"])}
+
+    results = []
+    if workers == 1 or len(changed) <= 1:
+        for date, (names, _) in changed.items():
+            results.append(extract_date_group(log_dir, date, names, shops_key))
+            finish(results[-1])
+    elif changed:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(extract_date_group, log_dir, date, names, shops_key)
+                for date, (names, _) in changed.items()
+            ]
+            for future in futures:
+                results.append(future.result())
+                finish(results[-1])
+
+    _save_state(log_dir, state)
+    return {
+        "dates": len(groups),
+        "processed_dates": sorted(changed),
+        "skipped_dates": len(groups) - len(changed),
+        "read_bytes": sum(result["read_bytes"] for result in results),
+        "written_files": sum(len(result["written"]) for result in results),
+    }
@@ -0,0 +1,231 @@
+# utils/order_log_index.py
+'''
+    注文ログ（order_logs/）の索引。店舗名・ユーザー名・注文IDから行の位置（ファイル, バイト位置）を引く。
+    1. class OrderLogIndex:
+        1. refresh() -> dict:  ※追記された分だけ読む
+        2. find(shop_name: str = None, username: str = None, order_id: int = None, date: str = None) -> List[Tuple[str, int]]:
+        3. iter_lines(positions: List[Tuple[str, int]]) -> Iterator[bytes]:
+        4. dates(key: str, value: str) -> Dict[str, int]:
+        5. values(key: str) -> List[str]:
+        6. stats() -> dict:
+    2. order_log_index = OrderLogIndex("./order_logs")
+'''
+# 以前は /filter_order_logs のたびに order_log_filter_config.py を別プロセスで起動し、
+# 全ファイルを読み直して combined_* を書き直していた。
+# ここではファイルごとに「どこまで読んだか」を覚えておき、refresh() では追記された行だけを読む。
+# ファイルが小さくなった・別のファイルに置き換わった（ローテーション）ときは、そのファイルだけ読み直す。
+import os
+import re
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ORDER_LOG_INDEX_KEYS = ("shop_name", "username", "order_id")
+# 1回に読む大きさ
+ORDER_LOG_READ_BYTES = 1024 * 1024
+
+# log_order() の出力例
+#   ... - INFO     - ORDER : 注文完了 - order_id:   5 - company_id:1, username:user1, shop_name:shop01, menu_id:1, amount:1
+#   ... - INFO     - CANCEL: 注文取消 - order_id: 5 - username: user1
+_field_patterns = {
+    "order_id": re.compile(rb"order_id:\s*(\d+)"),
+    "username": re.compile(rb"username:\s*([^\s,]+)"),
+    "shop_name": re.compile(rb"shop_name:\s*([^\s,]+)"),
+}
+
+
+def _file_date(name: str) -> str:
+    """ファイル名の日付部分（2025-05-08.log → 2025-05-08）"""
+    return name.split(".log", 1)[0]
+
+
+class _IndexedFile:
+    __slots__ = ("name", "date", "inode", "position", "lines")
+
+    def __init__(self, name: str, inode: int):
+        self.name = name
+        self.date = _file_date(name)
+        self.inode = inode
+        self.position = 0  # ここまで読んだ（行の途中では止めない）
+        self.lines = 0
+
+
+class OrderLogIndex:
+    """
+    shop_name / username / order_id ごとに、その値を含む行の (ファイル名, 行頭のバイト位置) を持つ。
+    CANCEL 行には店舗名がないため、同じ order_id の ORDER 行の店舗に含める。
+    refresh() はスレッドから呼ばれるため、ロックで守る。
+    """
+
+    def __init__(self, log_dir: str):
+        self.log_dir = log_dir
+        self._files: Dict[str, _IndexedFile] = {}
+        self._positions: Dict[str, Dict[str, List[Tuple[str, int]]]] = {key: {} for key in ORDER_LOG_INDEX_KEYS}
+        self._shop_by_order: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _log_files(self) -> List[str]:
+        if not os.path.isdir(self.log_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.log_dir)
+            if not name.startswith(("combined_", ".")) and os.path.isfile(os.path.join(self.log_dir, name))
+        )
+
+    def _forget(self, name: str) -> None:
+        """name の行を索引から外す（読み直す前に使う）"""
+        for positions_by_value in self._positions.values():
+            for value in list(positions_by_value):
+                kept = [position for position in positions_by_value[value] if position[0] != name]
+                if kept:
+                    positions_by_value[value] = kept
+                else:
+                    del positions_by_value[value]
+        self._files.pop(name, None)
+
+    def _add_line(self, name: str, offset: int, line: bytes) -> None:
+        fields = {}
+        for key, pattern in _field_patterns.items():
+            match = pattern.search(line)
+            if match:
+                fields[key] = match.group(1).decode("utf-8", errors="replace")
+
+        order_id = fields.get("order_id")
+        if order_id is not None:
+            if "shop_name" in fields:
+                self._shop_by_order[order_id] = fields["shop_name"]
+            elif order_id in self._shop_by_order:
+                fields["shop_name"] = self._shop_by_order[order_id]
+
+        for key, value in fields.items():
+            self._positions[key].setdefault(value, []).append((name, offset))
+
+    def _read_new_lines(self, indexed: _IndexedFile, size: int) -> None:
+        with open(os.path.join(self.log_dir, indexed.name), "rb") as f:
+            f.seek(indexed.position)
+            pending = b""
+            pending_offset = indexed.position
+            remaining = size - indexed.position
+            while remaining > 0:
+                chunk = f.read(min(ORDER_LOG_READ_BYTES, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                data = pending + chunk
+                start = 0
+                while True:
+                    end = data.find(b"\n", start)
+                    if end < 0:
+                        break
+                    self._add_line(indexed.name, pending_offset + start, data[start:end])
+                    indexed.lines += 1
+                    start = end + 1
+                pending = data[start:]
+                pending_offset += start
+            # 書きかけの最後の行は次回に読む
+            indexed.position = pending_offset
+
+    def refresh(self) -> dict:
+        """追記された行を索引に加える。戻り値は今回読んだファイル数・バイト数"""
+        with self._lock:
+            names = self._log_files()
+            for name in set(self._files) - set(names):
+                self._forget(name)
+
+            read_files = 0
+            read_bytes = 0
+            for name in names:
+                try:
+                    stat = os.stat(os.path.join(self.log_dir, name))
+                except FileNotFoundError:
+                    self._forget(name)
+                    continue
+
+                indexed = self._files.get(name)
+                if indexed is not None and (indexed.inode != stat.st_ino or stat.st_size < indexed.position):
+                    # ローテーション・切り詰め
+                    self._forget(name)
+                    indexed = None
+                if indexed is None:
+                    indexed = self._files[name] = _IndexedFile(name, stat.st_ino)
+                if stat.st_size == indexed.position:
+                    continue
+
+                before = indexed.position
+                self._read_new_lines(indexed, stat.st_size)
+                if indexed.position != before:
+                    read_files += 1
+                    read_bytes += indexed.position - before
+
+            return {"files": read_files, "bytes": read_bytes}
+
+    def find(
+        self,
+        shop_name: Optional[str] = None,
+        username: Optional[str] = None,
+        order_id: Optional[int] = None,
+        date: Optional[str] = None
+    ) -> List[Tuple[str, int]]:
+        """条件をすべて満たす行の位置（ファイル名・位置の順）。条件がなければ空"""
+        conditions = [
+            (key, str(value)) for key, value in zip(ORDER_LOG_INDEX_KEYS, (shop_name, username, order_id))
+            if value is not None
+        ]
+        if not conditions:
+            return []
+
+        with self._lock:
+            candidates = [self._positions[key].get(value, []) for key, value in conditions]
+            candidates.sort(key=len)
+            result = set(candidates[0])
+            for positions in candidates[1:]:
+                result.intersection_update(positions)
+            if date is not None:
+                result = {position for position in result if self._files[position[0]].date == date}
+        return sorted(result)
+
+    def iter_lines(self, positions: List[Tuple[str, int]]) -> Iterator[bytes]:
+        """位置の行を順に読む（改行つき）。ファイルごとに1回だけ開く"""
+        current_name = None
+        f = None
+        try:
+            for name, offset in positions:
+                if name != current_name:
+                    if f is not None:
+                        f.close()
+                    current_name = name
+                    try:
+                        f = open(os.path.join(self.log_dir, name), "rb")
+                    except FileNotFoundError:
+                        f = None
+                if f is None:
+                    continue
+                f.seek(offset)
+                yield f.readline()
+        finally:
+            if f is not None:
+                f.close()
+
+    def dates(self, key: str, value: str) -> Dict[str, int]:
+        """value を含む行の日付ごとの件数（新しい日付から）"""
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for name, _ in self._positions[key].get(value, []):
+                date = self._files[name].date
+                counts[date] = counts.get(date, 0) + 1
+        return dict(sorted(counts.items(), reverse=True))
+
+    def values(self, key: str) -> List[str]:
+        with self._lock:
+            return sorted(self._positions[key])
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "files": len(self._files),
+                "lines": sum(indexed.lines for indexed in self._files.values()),
+                "bytes": sum(indexed.position for indexed in self._files.values()),
+                **{key: len(positions_by_value) for key, positions_by_value in self._positions.items()},
+            }
+
+
+order_log_index = OrderLogIndex("./order_logs")
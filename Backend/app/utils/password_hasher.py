@@ -0,0 +1,144 @@
+# utils/password_hasher.py
+'''
+    bcrypt によるパスワードのハッシュ化・照合（専用のスレッドプールで実行する）
+    1. class PasswordHashBusy(Exception):
+    2. hash_password(password: str) -> str:
+    3. verify_password(password: str, hashed: str) -> bool:
+    4. authenticate_user(user, password: str):
+    5. get_password_hash_stats() -> dict:
+    6. shutdown_password_hasher() -> None:
+    7. hash_passwords(passwords: List[str]) -> List[str]:  ※一括再ハッシュ用（プロセスプールで実行する）
+'''
+# bcrypt は1回で数百ミリ秒かかる。イベントループ上で直接呼ぶと、その間すべてのリクエストが止まる。
+# bcrypt は計算中に GIL を手放すため、スレッドで実行すればループは止まらない。
+# ログインが集中したときに CPU を使い切らないよう、スレッド数（同時実行数）と待ち行列の長さに上限を設ける。
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import bcrypt
+from fastapi import HTTPException, status
+
+from utils.timing import LatencyHistogram
+
+# 同時にハッシュ計算するスレッド数
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# 待ち行列（実行待ち）の上限。超えた分は PasswordHashBusy
+PASSWORD_HASH_MAX_QUEUE = int(os.environ.get("PASSWORD_HASH_MAX_QUEUE", "200"))
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password_hash")
+# 件数はループとワーカースレッドの両方から更新するのでロックする
+_stats_lock = threading.Lock()
+_stats = {"queued": 0, "running": 0, "completed": 0, "rejected": 0}
+_wait = LatencyHistogram()      # 実行待ちの時間
+_duration = LatencyHistogram()  # bcrypt の計算時間
+
+
+class PasswordHashBusy(Exception):
+    """待ち行列が上限に達している"""
+
+
+def _run_job(func, args, submitted: float, job: dict):
+    started = time.perf_counter()
+    with _stats_lock:
+        if job["started"]:
+            # 待っている間に呼び出し元がキャンセルされた
+            return None
+        job["started"] = True
+        _stats["queued"] -= 1
+        _stats["running"] += 1
+        _wait.observe((started - submitted) * 1000)
+    try:
+        return func(*args)
+    finally:
+        with _stats_lock:
+            _stats["running"] -= 1
+            _stats["completed"] += 1
+            _duration.observe((time.perf_counter() - started) * 1000)
+
+
+async def _submit(func, *args):
+    with _stats_lock:
+        if _stats["queued"] >= PASSWORD_HASH_MAX_QUEUE:
+            _stats["rejected"] += 1
+            raise PasswordHashBusy(f"パスワード処理の待ちが上限（{PASSWORD_HASH_MAX_QUEUE}件）に達しています")
+        _stats["queued"] += 1
+    job = {"started": False}
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_executor, _run_job, func, args, time.perf_counter(), job)
+    except asyncio.CancelledError:
+        # 実行前にキャンセルされた（接続が切れた等）場合は、待ち行列から外す
+        with _stats_lock:
+            if not job["started"]:
+                job["started"] = True
+                _stats["queued"] -= 1
+        raise
+
+
+def _hashpw(password: str) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+
+
+def _checkpw(password: str, hashed: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode(), hashed.encode())
+    except ValueError:
+        # bcrypt の形式でないハッシュ
+        return False
+
+
+async def hash_password(password: str) -> str:
+    return await _submit(_hashpw, password)
+
+
+async def verify_password(password: str, hashed: str) -> bool:
+    return await _submit(_checkpw, password, hashed)
+
+
+async def authenticate_user(user, password: str):
+    """
+    core.security.authenticate_user と同じく、照合に成功すれば user、失敗すれば None を返す。
+    bcrypt の照合はスレッドプールで行う。ハッシュ化されていない（移行前の）パスワードは core に任せる。
+    """
+    hashed = user.get_password()
+    if not hashed or not hashed.startswith("$2"):
+        from core.security import authenticate_user as core_authenticate_user
+        return await core_authenticate_user(user, password)
+
+    try:
+        matched = await verify_password(password, hashed)
+    except PasswordHashBusy as e:
+        from log_unified import logger
+        logger.warning(f"authenticate_user() - {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="ログインが混み合っています。しばらくしてから再度お試しください。"
+        )
+    return user if matched else None
+
+
+def get_password_hash_stats() -> dict:
+    with _stats_lock:
+        return {
+            "workers": PASSWORD_HASH_WORKERS,
+            "max_queue": PASSWORD_HASH_MAX_QUEUE,
+            **_stats,
+            "wait": _wait,
+            "duration": _duration,
+        }
+
+
+def shutdown_password_hasher() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """
+    複数のパスワードをまとめてハッシュ化する（models.user.rehash_plain_passwords がプロセスプールから呼ぶ）。
+    大量のユーザーを移行するときにログイン用のスレッドプールを占有しないよう、別プロセスで計算する。
+    """
+    return [_hashpw(password) for password in passwords]
@@ -14,6 +14,8 @@ from utils.cookie_helper import delete_all_cookies
 
 from core.constants import ERROR_FORBIDDEN_SECOND_ORDER
 from models.order import select_orders_by_user_at_date
+from models.order import OrderFilter, select_orders, get_datetime_range_for_date, has_ordered_today
+from utils.metrics import DUPLICATE_ORDER_REJECTIONS
 from database.local_postgresql_database import endpoint
 
 from fastapi.templating import Jinja2Templates
@@ -173,28 +175,37 @@ async def get_last_order_simple(request: Request):
                 detail="認証情報が不正です。"
             )
 
-        from models.user import select_user
-        user = await select_user(username)
-        
-        import pytz
-        from datetime import datetime
-        tz = pytz.timezone("Asia/Tokyo")
-        current_time = datetime.now(tz)
-        today = current_time.date()
-        logger.debug(f"検索対象日: {today} (型: {type(today)})")
-
-        today_orders = await select_orders_by_user_at_date(username, today)
-        logger.debug(f"検索結果: {today_orders}")
+        # 本日の注文有無はメモリ上のインデックスで判定する（DB へは問い合わせない）
+        if not await has_ordered_today(username):
+            today_orders = None
+        else:
+            # 二重注文の場合のみ、画面表示用に注文（新しい順）とユーザーを取得する
+            import pytz
+            from datetime import datetime
+            tz = pytz.timezone("Asia/Tokyo")
+            current_time = datetime.now(tz)
+            today = current_time.date()
+            logger.debug(f"検索対象日: {today} (型: {type(today)})")
+
+            start_dt, end_dt = get_datetime_range_for_date(today)
+            today_orders = await select_orders(
+                OrderFilter("user", username, start_dt, end_dt, canceled=False, newest_first=True)
+            )
+            logger.debug(f"検索結果: {today_orders}")
         logger.info(f"取得した注文数: {len(today_orders) if today_orders else 0}")
 
         # 注文が存在する場合
         if today_orders:
             logger.warning(f"=== 二重注文検出！ ===")
+            DUPLICATE_ORDER_REJECTIONS.inc()
             for i, order in enumerate(today_orders):
                 logger.warning(f"注文{i+1}: {order}")
 
             last_order = today_orders[0]
             logger.warning(f"- 既に注文が存在します: {last_order}")
+
+            from models.user import select_user
+            user = await select_user(username)
             return templates.TemplateResponse(
                 "duplicate_order.html",
                 {
@@ -0,0 +1,142 @@
+# utils/query_stats.py
+'''
+    SQL の計測（SQLAlchemy のエンジンイベント）
+    1. class RequestQueryStats:  ※1リクエスト分のクエリ数・DB 時間・同一 SQL の回数
+    2. instrument_engine(engine) -> None:  ※before/after_cursor_execute を登録
+    3. class QueryStatsMiddleware:  ※リクエストごとに集計し、N+1 を検出する
+    4. get_query_totals() -> dict:
+'''
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+from utils.timing import LatencyHistogram
+
+# しきい値（ミリ秒）以上かかった SQL を、パラメータつきでログに出す。0 で出さない
+SQL_SLOW_MS = float(os.environ.get("SQL_SLOW_MS", "200"))
+# 1リクエストの中で同じ SQL がこの回数以上実行されたら N+1 の疑いとしてログに出す
+SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+# ログに出す SQL・パラメータの最大文字数
+SQL_LOG_MAX_CHARS = 1000
+
+
+class RequestQueryStats:
+    """1リクエストの間に実行した SQL の件数・合計時間と、SQL 文ごとの実行回数"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold: int = SQL_N_PLUS_ONE_THRESHOLD) -> Dict[str, int]:
+        """threshold 回以上実行された SQL 文（N+1 の疑い）"""
+        return {statement: n for statement, n in self.statements.items() if n >= threshold}
+
+
+# リクエスト処理中だけ RequestQueryStats が入る（それ以外のタスクでは None）
+current_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("current_query_stats", default=None)
+
+# プロセス全体の累計（/metrics 用）
+_query_duration = LatencyHistogram()
+_query_totals = {"slow": 0, "n_plus_one": 0}
+
+
+def _truncate(value) -> str:
+    text = str(value)
+    return text if len(text) <= SQL_LOG_MAX_CHARS else text[:SQL_LOG_MAX_CHARS] + "..."
+
+
+def instrument_engine(engine) -> None:
+    """
+    エンジンに before_cursor_execute / after_cursor_execute を登録する。
+    AsyncEngine の場合は sync_engine に登録する（イベントは同期側で発火する）。
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_time")
+    if not start_times:
+        return
+    elapsed_ms = (time.perf_counter() - start_times.pop()) * 1000
+    _query_duration.observe(elapsed_ms)
+
+    stats = current_query_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+
+    if SQL_SLOW_MS and elapsed_ms >= SQL_SLOW_MS:
+        _query_totals["slow"] += 1
+        from log_unified import logger
+        logger.warning(
+            f"遅いSQL: {elapsed_ms:.1f} ms（しきい値 {SQL_SLOW_MS} ms）"
+            f"{' executemany' if executemany else ''}\n"
+            f"  SQL: {_truncate(statement)}\n"
+            f"  parameters: {_truncate(parameters)}"
+        )
+
+
+class QueryStatsMiddleware:
+    """
+    リクエストごとに RequestQueryStats を用意し、終了時に N+1 の疑いをログに出す。
+    レスポンスには Server-Timing ヘッダー（db;dur=合計ms;desc="N queries"）を付ける。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = current_query_stats.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries"'.encode("latin-1")
+                ))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_query_stats.reset(token)
+            repeated = stats.repeated()
+            if repeated:
+                _query_totals["n_plus_one"] += 1
+                from log_unified import logger
+                for statement, n in repeated.items():
+                    logger.warning(
+                        f"N+1 の疑い: {scope['method']} {scope['path']} で同じ SQL を {n} 回実行しました"
+                        f"（合計 {stats.count} 件・{stats.total_ms:.1f} ms）\n  SQL: {_truncate(statement)}"
+                    )
+
+
+def get_query_totals() -> dict:
+    return {
+        "duration": _query_duration,
+        "slow": _query_totals["slow"],
+        "n_plus_one": _query_totals["n_plus_one"],
+    }
@@ -0,0 +1,124 @@
+# utils/timing.py
+'''
+    関数ごとの実行時間の計測（@log_decorator から使う）
+    1. class LatencyHistogram:
+    2. set_timing_enabled(enabled: bool) -> None: / is_timing_enabled() -> bool:
+    3. set_slow_threshold(threshold_ms: Optional[float]) -> None:
+    4. record_timing(name: str, elapsed: float) -> None:
+    5. get_function_timings() -> Dict[str, dict]:
+    6. reset_function_timings() -> None:
+'''
+import os
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+# バケット上限（ミリ秒）。最後は上限なし
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+# FUNCTION_TIMING（起動時の設定）
+#   on   : 計測する（既定）。実行中に set_timing_enabled() で切り替え可
+#   off  : 計測しない。実行中に set_timing_enabled(True) で有効にできる
+#   strip: デコレーターが元の関数をそのまま返す（オーバーヘッドなし。実行中の切り替え不可）
+FUNCTION_TIMING = os.environ.get("FUNCTION_TIMING", "on")
+# 指定すると、これより遅い呼び出しだけをログに出す（ミリ秒）
+_slow_env = os.environ.get("FUNCTION_SLOW_MS")
+
+
+class LatencyHistogram:
+    """
+    固定バケットの遅延ヒストグラム。件数・合計・最大と、バケットから推定した p50 / p95 / p99 を返す。
+    """
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.counts: List[int] = [0] * len(buckets_ms)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float) -> None:
+        self.counts[bisect_left(self.buckets_ms, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def percentile(self, p: float) -> float:
+        """バケット内を線形補間して p パーセンタイル（ミリ秒）を推定する"""
+        if self.count == 0:
+            return 0.0
+        rank = self.count * p / 100
+        seen = 0
+        lower = 0.0
+        for upper, bucket_count in zip(self.buckets_ms, self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                upper = min(upper, self.max_ms)
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return self.max_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": round(self.percentile(50), 3),
+            "p95_ms": round(self.percentile(95), 3),
+            "p99_ms": round(self.percentile(99), 3),
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): bucket_count
+                for bound, bucket_count in zip(self.buckets_ms, self.counts)
+            },
+        }
+
+
+# 計測の状態（@log_decorator のラッパーが毎回参照する）
+class _TimingState:
+    enabled = FUNCTION_TIMING == "on"
+    slow_threshold_ms: Optional[float] = float(_slow_env) if _slow_env else None
+
+timing_state = _TimingState()
+
+_function_timings: Dict[str, LatencyHistogram] = {}
+# 同期関数は run_in_threadpool（別スレッド）から呼ばれることもあるので、登録だけロックする
+_timings_lock = threading.Lock()
+
+
+def set_timing_enabled(enabled: bool) -> None:
+    timing_state.enabled = enabled
+
+def is_timing_enabled() -> bool:
+    return timing_state.enabled
+
+def set_slow_threshold(threshold_ms: Optional[float]) -> None:
+    """None で遅い呼び出しのログ出力をやめる"""
+    timing_state.slow_threshold_ms = threshold_ms
+
+
+def record_timing(name: str, elapsed: float) -> None:
+    """name の実行時間 elapsed（秒）を記録し、しきい値を超えていればログに出す"""
+    elapsed_ms = elapsed * 1000
+    histogram = _function_timings.get(name)
+    if histogram is None:
+        with _timings_lock:
+            histogram = _function_timings.setdefault(name, LatencyHistogram())
+    histogram.observe(elapsed_ms)
+
+    threshold_ms = timing_state.slow_threshold_ms
+    if threshold_ms is not None and elapsed_ms >= threshold_ms:
+        # log_unified → utils.date_utils → utils.decorator の循環を避けるため、ここで import する
+        from log_unified import logger
+        logger.warning(f"遅い呼び出し: {name} {elapsed_ms:.1f} ms（しきい値 {threshold_ms} ms）")
+
+
+def get_function_timings() -> Dict[str, dict]:
+    """関数ごとのヒストグラム（合計時間の大きい順）"""
+    snapshots = {name: histogram.snapshot() for name, histogram in list(_function_timings.items())}
+    return dict(sorted(snapshots.items(), key=lambda item: item[1]["sum_ms"], reverse=True))
+
+def reset_function_timings() -> None:
+    with _timings_lock:
+        _function_timings.clear()
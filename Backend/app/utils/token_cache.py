@@ -0,0 +1,59 @@
+# utils/token_cache.py
+'''
+    デコード済み JWT のキャッシュ（同じトークンの署名検証を繰り返さない）
+    1. decode_jwt_token_cached(token: str) -> dict:
+    2. evict_token(token: Optional[str]) -> bool:
+    3. get_token_cache_stats() -> dict:
+'''
+# 店舗のタブレットや NFC タグからのアクセスは、同じトークンで何度も来る。
+# トークンのハッシュ → デコード結果 を、トークンの exp まで保持する（exp を過ぎたら core で検証し直す＝期限切れの例外になる）。
+# キーにトークン自体は使わない（メモリ上にもトークンを並べて持たない）。
+import hashlib
+import os
+import time
+from typing import Optional
+
+from core.security import decode_jwt_token
+from utils.cache import TTLCache
+
+JWT_CACHE_MAXSIZE = int(os.environ.get("JWT_CACHE_MAXSIZE", "4096"))
+# exp のないトークンを保持する秒数
+JWT_CACHE_DEFAULT_TTL = float(os.environ.get("JWT_CACHE_DEFAULT_TTL", "300"))
+
+token_cache = TTLCache("decoded_jwt", maxsize=JWT_CACHE_MAXSIZE, ttl=JWT_CACHE_DEFAULT_TTL)
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def decode_jwt_token_cached(token: str) -> dict:
+    """
+    core.security.decode_jwt_token と同じ結果を返す。検証に失敗した場合の例外もそのまま（失敗はキャッシュしない）。
+    呼び出し側が書き換えてもキャッシュに影響しないよう、コピーを返す。
+    """
+    key = _token_key(token)
+    payload = token_cache.get(key)
+    if payload is not None:
+        return dict(payload)
+
+    payload = decode_jwt_token(token)
+    exp = payload.get("exp") if isinstance(payload, dict) else None
+    if exp is None:
+        token_cache.set(key, payload)
+    else:
+        ttl = float(exp) - time.time()
+        if ttl > 0:
+            token_cache.set(key, payload, ttl=ttl)
+    return dict(payload)
+
+
+def evict_token(token: Optional[str]) -> bool:
+    """ログアウト・Cookie 削除時にキャッシュから外す。外したら True"""
+    if not token:
+        return False
+    return token_cache.pop(_token_key(token)) is not None
+
+
+def get_token_cache_stats() -> dict:
+    return token_cache.stats()